@@ -16,3 +16,109 @@ PINECONE_HOST_URL = getenv("PINECONE_HOST_URL")
 ELEVENLABS_API_KEY = getenv("ELEVENLABS_API_KEY")
 NAMESPACE = "youtube_transcripts"
 DEFAULT_TIMEOUT_SECONDS = 43200  # 12 hours (12 * 60 * 60)
+
+# Embedding engine (shared, process-wide)
+EMBEDDING_MODEL_NAME = getenv("EMBEDDING_MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2")
+EMBEDDING_BATCH_SIZE = int(getenv("EMBEDDING_BATCH_SIZE", "32"))
+EMBEDDING_DEVICE = getenv("EMBEDDING_DEVICE", "cpu")
+EMBEDDING_NUM_THREADS = int(getenv("EMBEDDING_NUM_THREADS", "0"))  # 0 = library default
+QUERY_EMBEDDING_CACHE_SIZE = int(getenv("QUERY_EMBEDDING_CACHE_SIZE", "1024"))  # in-memory LRU of query vectors
+
+# Transcript fetching
+TRANSCRIPT_FETCH_WORKERS = int(getenv("TRANSCRIPT_FETCH_WORKERS", "4"))
+TRANSCRIPT_FETCH_TIMEOUT_SECONDS = float(getenv("TRANSCRIPT_FETCH_TIMEOUT_SECONDS", "120"))
+TRANSCRIPT_HTTP_TIMEOUT_SECONDS = float(getenv("TRANSCRIPT_HTTP_TIMEOUT_SECONDS", "30"))  # per YouTube HTTP request
+TRANSCRIPT_LANGUAGES = [lang.strip() for lang in getenv("TRANSCRIPT_LANGUAGES", "en").split(",") if lang.strip()]
+TRANSCRIPT_MODE = getenv("TRANSCRIPT_MODE", "direct")  # "direct" (YouTubeTranscriptApi) or "agent" (LLM tool call)
+
+# Local caches (shared across sessions and worker processes on the same host)
+CACHE_DIR = Path(getenv("CACHE_DIR", str(BASE_DIR / ".cache")))
+TRANSCRIPT_CACHE_ENABLED = getenv("TRANSCRIPT_CACHE_ENABLED", "true").lower() == "true"
+TRANSCRIPT_CACHE_PATH = Path(getenv("TRANSCRIPT_CACHE_PATH", str(CACHE_DIR / "transcripts.sqlite3")))
+TRANSCRIPT_CACHE_TTL_SECONDS = int(getenv("TRANSCRIPT_CACHE_TTL_SECONDS", "604800"))  # 7 days
+TRANSCRIPT_CACHE_MAX_BYTES = int(getenv("TRANSCRIPT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))  # 256 MB
+EMBEDDING_CACHE_ENABLED = getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+EMBEDDING_CACHE_PATH = Path(getenv("EMBEDDING_CACHE_PATH", str(CACHE_DIR / "embeddings.sqlite3")))
+EMBEDDING_CACHE_MAX_ENTRIES = int(getenv("EMBEDDING_CACHE_MAX_ENTRIES", "500000"))
+
+# Vector storage
+# "session": every session gets its own namespace; "shared": each video is stored once in
+# SHARED_CORPUS_NAMESPACE and sessions filter on video_id metadata.
+VECTOR_STORAGE_MODE = getenv("VECTOR_STORAGE_MODE", "session")
+SHARED_CORPUS_NAMESPACE = getenv("SHARED_CORPUS_NAMESPACE", "video_corpus")
+# "pinecone": remote Pinecone index; "local": in-process NumPy index persisted under LOCAL_VECTOR_INDEX_DIR
+# (single-node deployments and development only)
+VECTOR_INDEX_BACKEND = getenv("VECTOR_INDEX_BACKEND", "pinecone")
+LOCAL_VECTOR_INDEX_DIR = Path(getenv("LOCAL_VECTOR_INDEX_DIR", str(CACHE_DIR / "vectors")))
+
+# Pinecone upserts
+UPSERT_BATCH_SIZE = int(getenv("UPSERT_BATCH_SIZE", "100"))  # vectors per request
+UPSERT_MAX_BATCH_BYTES = int(getenv("UPSERT_MAX_BATCH_BYTES", str(2 * 1000 * 1000)))  # Pinecone request limit is 2 MB
+UPSERT_MAX_WORKERS = int(getenv("UPSERT_MAX_WORKERS", "4"))
+UPSERT_MAX_RETRIES = int(getenv("UPSERT_MAX_RETRIES", "3"))
+UPSERT_RETRY_BACKOFF_SECONDS = float(getenv("UPSERT_RETRY_BACKOFF_SECONDS", "0.5"))
+
+# Chunking
+# "pooled": chunk vectors are the mean of the sentence embeddings computed for breakpoint
+# detection (one embedding pass); "exact": chunks are re-embedded after splitting.
+CHUNK_EMBEDDING_MODE = getenv("CHUNK_EMBEDDING_MODE", "pooled")
+CHUNK_BREAKPOINT_PERCENTILE = float(getenv("CHUNK_BREAKPOINT_PERCENTILE", "95"))
+CHUNK_SENTENCE_BUFFER_SIZE = int(getenv("CHUNK_SENTENCE_BUFFER_SIZE", "1"))
+CHUNK_MAX_CHARS = int(getenv("CHUNK_MAX_CHARS", "1000"))  # ~MiniLM's 256-token input; far below Pinecone's 40 KB metadata limit
+INGEST_QUEUE_SIZE = int(getenv("INGEST_QUEUE_SIZE", "2"))  # videos buffered between pipeline stages
+
+# Pinecone client pool
+PINECONE_POOL_THREADS = int(getenv("PINECONE_POOL_THREADS", "8"))
+PINECONE_CONNECTION_POOL_MAXSIZE = int(getenv("PINECONE_CONNECTION_POOL_MAXSIZE", "16"))
+PINECONE_REQUEST_TIMEOUT_SECONDS = float(getenv("PINECONE_REQUEST_TIMEOUT_SECONDS", "30"))
+
+# Semantic answer cache for /query
+ANSWER_CACHE_ENABLED = getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_SIMILARITY_THRESHOLD = float(getenv("ANSWER_CACHE_SIMILARITY_THRESHOLD", "0.93"))
+ANSWER_CACHE_MAX_ENTRIES = int(getenv("ANSWER_CACHE_MAX_ENTRIES", "2000"))
+ANSWER_CACHE_TTL_SECONDS = int(getenv("ANSWER_CACHE_TTL_SECONDS", "3600"))
+
+# Retrieval
+HYBRID_SEARCH_ENABLED = getenv("HYBRID_SEARCH_ENABLED", "true").lower() == "true"  # BM25 + vector, fused by reciprocal rank
+HYBRID_CANDIDATES = int(getenv("HYBRID_CANDIDATES", "20"))  # hits taken from each retriever before fusion
+HYBRID_RRF_K = int(getenv("HYBRID_RRF_K", "60"))
+KEYWORD_INDEX_PATH = Path(getenv("KEYWORD_INDEX_PATH", str(CACHE_DIR / "keywords.sqlite3")))  # SQLite BM25 postings
+CONTEXT_TOP_K = int(getenv("CONTEXT_TOP_K", "8"))  # chunks retrieved before packing
+CONTEXT_TOKEN_BUDGET = int(getenv("CONTEXT_TOKEN_BUDGET", "1500"))  # max context tokens sent to the model
+CONTEXT_DEDUPE_THRESHOLD = float(getenv("CONTEXT_DEDUPE_THRESHOLD", "0.95"))  # cosine similarity; 1.0 disables
+
+# Sessions
+# "memory": sessions live in this process (single worker); "sqlite": shared by every worker
+# process on the host through SESSION_STORE_PATH
+SESSION_STORE_BACKEND = getenv("SESSION_STORE_BACKEND", "memory")
+SESSION_STORE_PATH = Path(getenv("SESSION_STORE_PATH", str(CACHE_DIR / "sessions.sqlite3")))
+
+# Vector deletion queue (expired sessions)
+DELETION_QUEUE_PATH = Path(getenv("DELETION_QUEUE_PATH", str(CACHE_DIR / "deletions.sqlite3")))
+DELETION_MAX_PARALLEL = int(getenv("DELETION_MAX_PARALLEL", "4"))
+DELETION_RETRY_BACKOFF_SECONDS = float(getenv("DELETION_RETRY_BACKOFF_SECONDS", "5"))
+DELETION_MAX_BACKOFF_SECONDS = float(getenv("DELETION_MAX_BACKOFF_SECONDS", "3600"))
+DELETION_MAX_ATTEMPTS = int(getenv("DELETION_MAX_ATTEMPTS", "10"))  # then the deletion is parked as dead for manual follow-up
+
+# Processing job scheduler (/upload/process)
+JOB_MAX_WORKERS = int(getenv("JOB_MAX_WORKERS", "2"))  # processing jobs running at once per process
+JOB_MAX_QUEUED = int(getenv("JOB_MAX_QUEUED", "50"))  # waiting jobs before /upload/process answers 429
+JOB_MAX_PER_SESSION = int(getenv("JOB_MAX_PER_SESSION", "1"))  # running jobs per session
+JOB_HISTORY_SIZE = int(getenv("JOB_HISTORY_SIZE", "500"))  # finished jobs kept for the status API
+JOB_CHECKPOINTS_ENABLED = getenv("JOB_CHECKPOINTS_ENABLED", "true").lower() == "true"  # resume jobs after restarts
+JOB_CHECKPOINT_PATH = Path(getenv("JOB_CHECKPOINT_PATH", str(CACHE_DIR / "jobs.sqlite3")))
+JOB_LEASE_SECONDS = float(getenv("JOB_LEASE_SECONDS", "60"))  # a worker that stops renewing loses its unfinished jobs to another worker
+
+# Processing status events
+EVENT_BUFFER_SIZE = int(getenv("EVENT_BUFFER_SIZE", "500"))  # recent events kept per session for SSE replay
+EVENT_SUBSCRIBER_QUEUE_SIZE = int(getenv("EVENT_SUBSCRIBER_QUEUE_SIZE", "256"))  # per SSE connection; overflow resyncs from the buffer
+SSE_KEEPALIVE_SECONDS = float(getenv("SSE_KEEPALIVE_SECONDS", "15"))
+
+# Query answering
+QUERY_MODES = ("fast", "agent")
+QUERY_MODE = getenv("QUERY_MODE", "fast")  # "fast" (retrieve then one generation call) or "agent" (tool-calling agent)
+if QUERY_MODE not in QUERY_MODES:
+    raise ValueError(f"QUERY_MODE must be one of {', '.join(QUERY_MODES)}, got {QUERY_MODE!r}")
+
+# Metrics (/metrics, Prometheus text format)
+METRICS_ENABLED = getenv("METRICS_ENABLED", "true").lower() == "true"  # expose /metrics
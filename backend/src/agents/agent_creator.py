@@ -1,3 +1,5 @@
+import threading
+import time
 import yaml
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.agents import create_agent
@@ -10,43 +12,111 @@ PROMPTS_PATH = Path(__file__).resolve().parent.parent / "utils" / "promps.yml"
 with open(PROMPTS_PATH, "r") as f:
     PROMPTS = yaml.safe_load(f)
 
+DEFAULT_MODEL_NAME = "gemini-2.5-flash"
+
+# Process-wide registry of chat model clients and compiled agent graphs.
+# Agents are keyed by agent name and tool names, so tools must not capture per-request
+# state; pass it as runtime config instead, e.g.
+# agent.invoke(inputs, config={"configurable": {"namespace": namespace}}).
+_models: dict[tuple[str, bool], ChatGoogleGenerativeAI] = {}
+_agents: dict[tuple[str, tuple[str, ...], bool], object] = {}
+_registry_lock = threading.Lock()
+_build_metrics = {
+    "model_builds": 0,
+    "model_build_seconds": 0.0,
+    "model_cache_hits": 0,
+    "agent_builds": 0,
+    "agent_build_seconds": 0.0,
+    "agent_cache_hits": 0,
+}
+
+
+def _get_api_key() -> str:
+    # Ensure GOOGLE_API_KEY is set
+    if GOOGLE_API_KEY:
+        return GOOGLE_API_KEY
+    # Try reloading environment in case we're in a background thread
+    from dotenv import load_dotenv
+    from os import getenv
+    load_dotenv(".env")
+    api_key = getenv("GOOGLE_API_KEY")
+    if not api_key:
+        raise ValueError("GOOGLE_API_KEY environment variable is not set. Please set it in your .env file.")
+    return api_key
+
+
+def get_chat_model(model_name: str = DEFAULT_MODEL_NAME, verbose: bool = True) -> ChatGoogleGenerativeAI:
+    """Returns the shared chat model client for model_name, creating it on first use."""
+    key = (model_name, verbose)
+    with _registry_lock:
+        model = _models.get(key)
+        if model is not None:
+            _build_metrics["model_cache_hits"] += 1
+            return model
+
+        start = time.perf_counter()
+        model = ChatGoogleGenerativeAI(model=model_name, api_key=_get_api_key(), verbose=verbose)
+        _models[key] = model
+        _build_metrics["model_builds"] += 1
+        _build_metrics["model_build_seconds"] += time.perf_counter() - start
+        return model
+
+
 def create_agent_with_tools(agent_name: str, tools: list, verbose: bool = True):
     """
-    Creates a LangGraph ReAct agent with the specified name and tools.
+    Returns a LangGraph ReAct agent with the specified name and tools.
     The system prompt is fetched from src/utils/promps.yml using agent_name + '_prompt'.
+    The compiled agent is built once per (agent_name, tool names) and reused afterwards.
     
     Args:
         agent_name: Name of the agent (used to fetch prompt)
         tools: List of tools to provide to the agent
         verbose: Enable verbose logging (default: True)
     """
+    key = (agent_name, tuple(sorted(getattr(t, "name", repr(t)) for t in tools)), verbose)
+    with _registry_lock:
+        agent = _agents.get(key)
+        if agent is not None:
+            _build_metrics["agent_cache_hits"] += 1
+            return agent
+
     prompt_key = f"{agent_name}_prompt"
     system_prompt_text = PROMPTS.get(prompt_key)
     
     if not system_prompt_text:
         raise ValueError(f"Prompt for '{agent_name}' not found in {PROMPTS_PATH}. Key expected: {prompt_key}")
 
-    # Ensure GOOGLE_API_KEY is set
-    if not GOOGLE_API_KEY:
-        # Try reloading environment in case we're in a background thread
-        from dotenv import load_dotenv
-        from os import getenv
-        load_dotenv(".env")
-        api_key = getenv("GOOGLE_API_KEY")
-        if not api_key:
-            raise ValueError("GOOGLE_API_KEY environment variable is not set. Please set it in your .env file.")
-    else:
-        api_key = GOOGLE_API_KEY
-
-    model = ChatGoogleGenerativeAI(model="gemini-2.5-flash", api_key=api_key, verbose=verbose)
-    
-    # Wrap prompt in SystemMessage
-    system_prompt = SystemMessage(content=system_prompt_text)
-    
-    agent = create_agent(
-        model=model,
-        tools=tools,
-        system_prompt=system_prompt
-    )
+    model = get_chat_model(verbose=verbose)
+
+    with _registry_lock:
+        # Another thread may have finished building it meanwhile
+        agent = _agents.get(key)
+        if agent is not None:
+            _build_metrics["agent_cache_hits"] += 1
+            return agent
+
+        start = time.perf_counter()
+        # Wrap prompt in SystemMessage
+        system_prompt = SystemMessage(content=system_prompt_text)
+        
+        agent = create_agent(
+            model=model,
+            tools=tools,
+            system_prompt=system_prompt
+        )
+        _agents[key] = agent
+        _build_metrics["agent_builds"] += 1
+        _build_metrics["agent_build_seconds"] += time.perf_counter() - start
+        print(f"🧩 Compiled agent '{agent_name}' in {time.perf_counter() - start:.2f}s")
     
     return agent
+
+
+def get_build_metrics() -> dict:
+    """Returns model/agent build counts, cumulative build time and cache hits."""
+    with _registry_lock:
+        return {
+            **_build_metrics,
+            "cached_models": len(_models),
+            "cached_agents": len(_agents),
+        }
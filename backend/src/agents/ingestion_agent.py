@@ -0,0 +1,25 @@
+from langchain_core.runnables import RunnableConfig
+from src.schemas.response_schema import ResponseSchema
+from src.workflow.ingestion_pipeline import ingest_videos
+
+
+def ingestion_agent(state: ResponseSchema, config: RunnableConfig = None) -> dict:
+    """
+    Graph node that streams the selected videos through fetch → chunk → embed → upsert.
+    A threading.Event passed as config["configurable"]["cancel_event"] cancels the job.
+    """
+    video_ids = state.get("video_ids", [])
+    namespace = state.get("namespace", "youtube_transcripts")
+    session_id = state.get("session_id", "")
+
+    print(f"Ingesting {len(video_ids)} videos into namespace: {namespace}...")
+    cancel_event = ((config or {}).get("configurable") or {}).get("cancel_event")
+    statuses = ingest_videos(video_ids, namespace, session_id, state.get("transcript_mode"), cancel_event=cancel_event)
+
+    indexed_video_ids = [video_id for video_id in video_ids if statuses.get(video_id) in ("indexed", "already_indexed")]
+    response = "\n".join(f"{video_id}: {statuses.get(video_id, 'skipped')}" for video_id in video_ids)
+    return {"indexed_video_ids": indexed_video_ids, "query_response": response}
+
+
+if __name__ == "__main__":
+    print(ingestion_agent({"video_ids": ["R1LE5xfasmw"], "namespace": "test_namespace"}))
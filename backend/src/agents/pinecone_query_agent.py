@@ -1,9 +1,12 @@
 from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.runnables import RunnableConfig
+from langchain.tools import tool
 from src.tools.query_tool import query_tool
-from langchain_google_genai import ChatGoogleGenerativeAI
-from settings import GOOGLE_API_KEY
-from langchain.agents import create_agent
+from src.agents.agent_creator import create_agent_with_tools, get_chat_model
+from src.utils.metrics import track_stage
+from settings import QUERY_MODE, QUERY_MODES
 from pathlib import Path
+from typing import Optional
 import yaml
 
 
@@ -11,51 +14,92 @@ PROMPTS_PATH = Path(__file__).resolve().parent.parent / "utils" / "promps.yml"
 with open(PROMPTS_PATH, "r") as f:
     PROMPTS = yaml.safe_load(f)
 
-def query_agent(query: str, namespace: str, verbose: bool = True) -> str:
+
+def get_fast_model():
+    """Returns the process-wide chat model used for single-call answers."""
+    return get_chat_model(verbose=False)
+
+
+@tool
+def search_knowledge_base(query: str, config: RunnableConfig) -> str:
+    """Searches the knowledge base for relevant context."""
+    # The namespace comes from the per-request runtime config, so the compiled agent is shared
+    namespace = config.get("configurable", {}).get("namespace")
+    if not namespace:
+        raise ValueError("search_knowledge_base requires a namespace in the runtime config.")
+    return query_tool.func(query=query, namespace=namespace)
+
+
+def content_to_text(response_content) -> str:
+    """Flattens a model response's content (string or Gemini content blocks) to text."""
+    # Parse structured response if it's a list (common with Gemini/Flash models)
+    if isinstance(response_content, list):
+        # Look for text block
+        text_blocks = [block.get("text", "") for block in response_content if isinstance(block, dict) and block.get("type") == "text"]
+        if text_blocks:
+            return " ".join(text_blocks)
+        # Fallback: join string representations
+        return " ".join(str(item) for item in response_content)
+    return str(response_content)
+
+
+def build_fast_messages(query: str, context: str) -> list:
+    """Builds the single-call prompt: retrieved context plus the user's question."""
+    system_prompt = SystemMessage(content=PROMPTS.get("query_fast_prompt", "You are a helpful assistant."))
+    return [
+        system_prompt,
+        HumanMessage(content=f"Retrieved context:\n{context or 'No relevant context found.'}\n\nQuestion: {query}")
+    ]
+
+
+def fast_query_agent(query: str, namespace: str) -> str:
+    """
+    Retrieves context up front and answers with exactly one generation call.
+    """
+    context = query_tool.func(query=query, namespace=namespace)
+    with track_stage("generation"):
+        result = get_fast_model().invoke(build_fast_messages(query, context))
+    return content_to_text(result.content)
+
+
+def agentic_query_agent(query: str, namespace: str, verbose: bool = True) -> str:
+    """
+    Lets the model decide when (and how often) to search the knowledge base.
+    Uses the shared compiled query agent; the namespace is passed as runtime config.
+    """
+    agent = create_agent_with_tools("query_agent", [search_knowledge_base], verbose=verbose)
+    # Covers every model and tool call of the agent loop; its searches also count as "retrieval"
+    with track_stage("agent"):
+        result = agent.invoke(
+            {"messages": [HumanMessage(content=query)]},
+            config={"configurable": {"namespace": namespace}}
+        )
+    return content_to_text(result["messages"][-1].content)
+
+
+def query_agent(query: str, namespace: str, verbose: bool = True, mode: Optional[str] = None) -> str:
     """
     Agent that takes a query, searches Pinecone for context, and answers the question.
-    Uses langgraph.prebuilt.create_agent for robust tool calling.
     
     Args:
         query: The user's question
         namespace: The Pinecone namespace to search in
         verbose: Enable verbose logging (default: True)
+        mode: "fast" (retrieve, then a single generation call) or "agent" (tool-calling
+            agent for complex questions); defaults to settings.QUERY_MODE
+
+    Raises:
+        ValueError: If mode is not one of settings.QUERY_MODES
     """
-    model = ChatGoogleGenerativeAI(model="gemini-2.5-flash", api_key=GOOGLE_API_KEY, verbose=verbose)
-    
-    system_prompt_text = PROMPTS.get("query_agent_prompt", "You are a helpful assistant.")
-    system_prompt = SystemMessage(content=system_prompt_text)
-    
-    # Create a wrapper tool that has the namespace bound to it
-    from langchain.tools import tool
-    
-    @tool
-    def search_knowledge_base(query: str) -> str:
-        """Searches the knowledge base for relevant context."""
-        # Force the usage of the passed namespace
-        return query_tool.func(query=query, namespace=namespace)
-    
-    agent = create_agent(model, tools=[search_knowledge_base], system_prompt=system_prompt)
-    
-    print(f"🔍 Processing query: {query}")
+    mode = mode or QUERY_MODE
+    if mode not in QUERY_MODES:
+        raise ValueError(f"Unknown query mode {mode!r}; expected one of {', '.join(QUERY_MODES)}")
+    print(f"🔍 Processing query ({mode} mode): {query}")
     try:
-        result = agent.invoke({
-            "messages": [HumanMessage(content=query)]
-        })
-        response_content = result["messages"][-1].content
-        
-        # Parse structured response if it's a list (common with Gemini/Flash models)
-        if isinstance(response_content, list):
-            # Look for text block
-            text_blocks = [block.get("text", "") for block in response_content if isinstance(block, dict) and block.get("type") == "text"]
-            if text_blocks:
-                response = " ".join(text_blocks)
-            else:
-                # Fallback: join string representations
-                response = " ".join(str(item) for item in response_content)
+        if mode == "agent":
+            response = agentic_query_agent(query, namespace, verbose=verbose)
         else:
-            response = str(response_content)
-            
+            response = fast_query_agent(query, namespace)
         print(f"✅ Query completed successfully")
     except Exception as e:
         response = f"Error processing query: {str(e)}"
@@ -67,4 +111,4 @@ def query_agent(query: str, namespace: str, verbose: bool = True) -> str:
 
 if __name__ == "__main__":
     test_query = "Which is the best iphone for students?"
-    print(query_agent(test_query))
+    print(query_agent(test_query, namespace="youtube_transcripts"))
@@ -1,5 +1,5 @@
 from langchain_core.messages import HumanMessage
-from src.tools.pinecone_uploader import upload_transcript_to_pinecone
+from src.tools.pinecone_uploader import upload_transcript_to_pinecone, upload_video_transcript
 from src.schemas.response_schema import ResponseSchema
 from src.agents.agent_creator import create_agent_with_tools
 from src.utils.event_emitter import event_emitter
@@ -8,20 +8,28 @@ def uploader_agent(state: ResponseSchema) -> dict:
     transcript = state.get("transcript", "")
     namespace = state.get("namespace", "youtube_transcripts")  # Get namespace from state
     session_id = state.get("session_id", "")
+    video_transcripts = state.get("video_transcripts") or []
     
-    if not transcript:
+    if not transcript and not video_transcripts:
         return {"transcript": "No transcript provided."}
 
     print(f"Processing transcript upload to namespace: {namespace}...")
     if session_id:
         event_emitter.emit(session_id, "pinecone_upload_started", f"Starting Pinecone upload to namespace: {namespace}")
     try:
-        # Call the tool directly with namespace and session_id for event emission
-        response = upload_transcript_to_pinecone.invoke({
-            "transcript": transcript,
-            "namespace": namespace,
-            "session_id": session_id
-        })
+        if video_transcripts:
+            # Upload per video so chunks are tagged with their video_id
+            response = "\n".join(
+                upload_video_transcript(t["video_id"], t["text"], namespace, session_id)
+                for t in video_transcripts
+            )
+        else:
+            # Call the tool directly with namespace and session_id for event emission
+            response = upload_transcript_to_pinecone.invoke({
+                "transcript": transcript,
+                "namespace": namespace,
+                "session_id": session_id
+            })
         if session_id:
             event_emitter.emit(session_id, "pinecone_upload_complete", f"Successfully uploaded to Pinecone namespace: {namespace}")
     except Exception as e:
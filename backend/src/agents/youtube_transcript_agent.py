@@ -1,54 +1,166 @@
+import queue
+import threading
+import time
+from typing import Callable, Iterator, Optional
 from langchain_core.messages import HumanMessage
-from src.tools.transcript_fetcher import transcript_fetcher
+from src.tools.transcript_fetcher import transcript_fetcher, fetch_transcript_snippets
 from src.schemas.response_schema import ResponseSchema
 from src.agents.agent_creator import create_agent_with_tools
+from src.agents.pinecone_query_agent import content_to_text
 from src.utils.event_emitter import event_emitter
+from src.utils.metrics import track_stage
+from settings import TRANSCRIPT_FETCH_WORKERS, TRANSCRIPT_FETCH_TIMEOUT_SECONDS, TRANSCRIPT_MODE
+
+
+def fetch_transcripts_concurrently(
+    video_ids: list[str],
+    fetch: Callable[[str], dict],
+    session_id: str = "",
+    max_workers: int = TRANSCRIPT_FETCH_WORKERS,
+    timeout_seconds: float = TRANSCRIPT_FETCH_TIMEOUT_SECONDS,
+    max_abandoned: Optional[int] = None,
+) -> Iterator[tuple[int, str, Optional[dict], Optional[Exception]]]:
+    """
+    Fetches transcripts with at most max_workers fetches in flight.
+    Yields (index, video_id, transcript, error) in completion order; exactly one of
+    transcript/error is set. A fetch running longer than timeout_seconds is abandoned
+    and reported as a TimeoutError; its slot goes to the next video while the stuck
+    thread is left to finish on its own. Stuck threads still count against a ceiling of
+    max_workers + max_abandoned (default max_workers) threads: once every thread is
+    stuck, videos that haven't started are reported as failed instead of waiting.
+    Closing the generator stops new fetches from starting.
+    """
+    total = len(video_ids)
+    if total == 0:
+        return
+    max_workers = max(1, min(max_workers, total))
+    max_abandoned = max_workers if max_abandoned is None else max_abandoned
+
+    results: queue.Queue = queue.Queue()
+
+    def run(i: int, video_id: str):
+        print(f"Processing video {i+1}/{total}: {video_id}")
+        if session_id:
+            event_emitter.emit(session_id, "video_processing", f"Processing video {i+1}/{total}: {video_id}", {
+                "video_id": video_id,
+                "video_number": i + 1,
+                "total_videos": total
+            })
+        try:
+            results.put((i, fetch(video_id), None))
+        except Exception as e:
+            results.put((i, None, e))
+
+    next_index = 0
+    running: dict[int, float] = {}  # index -> start time
+    abandoned: set[int] = set()
+    while next_index < total or running:
+        # Fill free slots; abandoned fetches still hold a thread, so they count against the ceiling
+        while next_index < total and len(running) < max_workers and len(running) + len(abandoned) < max_workers + max_abandoned:
+            threading.Thread(
+                target=run, args=(next_index, video_ids[next_index]), name="transcript-fetch", daemon=True
+            ).start()
+            running[next_index] = time.monotonic()
+            next_index += 1
+        if not running:
+            # Every slot is held by a hung fetch; fail the rest rather than wait forever
+            for i in range(next_index, total):
+                yield i, video_ids[i], None, TimeoutError(f"Not fetched: {len(abandoned)} transcript fetches are hung")
+            return
+
+        try:
+            i, transcript, error = results.get(timeout=0.5)
+        except queue.Empty:
+            pass
+        else:
+            if i in abandoned:
+                # A timed-out fetch finally returned; its thread is free again
+                abandoned.discard(i)
+            else:
+                del running[i]
+                yield i, video_ids[i], transcript, error
+
+        # Abandon fetches that have been running longer than the per-video timeout
+        now = time.monotonic()
+        for i, started in list(running.items()):
+            if now - started > timeout_seconds:
+                del running[i]
+                abandoned.add(i)
+                yield i, video_ids[i], None, TimeoutError(f"Transcript fetch timed out after {timeout_seconds:.0f}s")
+
+
+def get_transcript_fetch(mode: Optional[str] = None) -> Callable[[str], dict]:
+    """Returns the per-video fetch function for the given transcript mode (defaults to TRANSCRIPT_MODE), timed as the "fetch" stage."""
+    fetch = _select_transcript_fetch(mode)
+
+    def timed_fetch(video_id: str) -> dict:
+        with track_stage("fetch"):
+            return fetch(video_id)
+
+    return timed_fetch
+
+
+def _select_transcript_fetch(mode: Optional[str] = None) -> Callable[[str], dict]:
+    if (mode or TRANSCRIPT_MODE) != "agent":
+        # Default: call YouTubeTranscriptApi directly and keep the structured snippets
+        return fetch_transcript_snippets
+
+    # Opt-in: let the LLM call the transcript tool and echo the transcript back
+    agent = create_agent_with_tools("transcript_agent", [transcript_fetcher])
+
+    def fetch(video_id: str) -> dict:
+        result = agent.invoke({
+            "messages": [HumanMessage(content=f"Fetch the transcript for the YouTube video with ID: {video_id}")]
+        })
+        # Gemini may answer with a list of content blocks rather than a string
+        text = content_to_text(result["messages"][-1].content)
+        return {"video_id": video_id, "language_code": None, "snippets": [], "text": text}
+
+    return fetch
+
 
 def transcript_agent(state: ResponseSchema) -> dict:
     video_ids = state["video_ids"]
     session_id = state.get("session_id", "")
-    print(f"Found {len(video_ids)} videos to process.")
+    total = len(video_ids)
+    print(f"Found {total} videos to process.")
     
     if session_id:
-        event_emitter.emit(session_id, "transcript_started", f"Starting transcript extraction for {len(video_ids)} videos")
+        event_emitter.emit(session_id, "transcript_started", f"Starting transcript extraction for {total} videos")
     
-    agent = create_agent_with_tools("transcript_agent", [transcript_fetcher])
+    fetch = get_transcript_fetch(state.get("transcript_mode"))
 
-    aggregated_transcripts = ""
-    for i, video_id in enumerate(video_ids):
-        print(f"Processing video {i+1}/{len(video_ids)}: {video_id}")
-        if session_id:
-            event_emitter.emit(session_id, "video_processing", f"Processing video {i+1}/{len(video_ids)}: {video_id}", {
-                "video_id": video_id,
-                "video_number": i + 1,
-                "total_videos": len(video_ids)
-            })
-        try:
-            result = agent.invoke({
-                "messages": [HumanMessage(content=f"Fetch the transcript for the YouTube video with ID: {video_id}")]
-            })
-            transcript = result["messages"][-1].content
-            aggregated_transcripts += f"\n\nTranscript for Video ID-{video_id}: \n{transcript}"
+    # Keep results in the user's selection order regardless of completion order
+    sections: list[str] = [""] * total
+    video_transcripts: list[Optional[dict]] = [None] * total
+    for i, video_id, transcript, error in fetch_transcripts_concurrently(video_ids, fetch, session_id):
+        if error is None:
+            video_transcripts[i] = transcript
+            sections[i] = f"\n\nTranscript for Video ID-{video_id}: \n{transcript['text']}"
             if session_id:
-                event_emitter.emit(session_id, "video_processed", f"Video {i+1}/{len(video_ids)} processed successfully", {
+                event_emitter.emit(session_id, "video_processed", f"Video {i+1}/{total} processed successfully", {
                     "video_id": video_id,
                     "video_number": i + 1,
-                    "total_videos": len(video_ids)
+                    "total_videos": total,
+                    "cached": transcript.get("cached", False)
                 })
-        except Exception as e:
-            aggregated_transcripts += f"\n\nError for Video ID-{video_id}: \n{str(e)}"
+        else:
+            sections[i] = f"\n\nError for Video ID-{video_id}: \n{str(error)}"
             if session_id:
-                event_emitter.emit(session_id, "video_error", f"Error processing video {i+1}/{len(video_ids)}: {str(e)}", {
+                event_emitter.emit(session_id, "video_error", f"Error processing video {i+1}/{total}: {str(error)}", {
                     "video_id": video_id,
                     "video_number": i + 1,
-                    "total_videos": len(video_ids),
-                    "error": str(e)
+                    "total_videos": total,
+                    "error": str(error)
                 })
     
     if session_id:
-        event_emitter.emit(session_id, "transcript_complete", f"Transcript extraction completed for {len(video_ids)} videos")
+        event_emitter.emit(session_id, "transcript_complete", f"Transcript extraction completed for {total} videos")
     
-    return {"transcript": aggregated_transcripts}
+    return {
+        "transcript": "".join(sections),
+        "video_transcripts": [t for t in video_transcripts if t is not None],
+    }
 
 if __name__ == "__main__":
     print(transcript_agent({"user_query": "", "video_ids": ["R1LE5xfasmw"], "transcript": ""}))
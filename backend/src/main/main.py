@@ -1,17 +1,31 @@
 from fastapi import FastAPI, HTTPException, Response, Cookie, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Literal
 from src.workflow.workflow import processing_workflow
-from src.agents.pinecone_query_agent import query_agent
+from src.agents.pinecone_query_agent import query_agent, get_fast_model, build_fast_messages, content_to_text
+from src.tools.query_tool import aretrieve_context, format_context, chunk_references
 from src.agents.youtube_retriever_agent import retriever_agent_with_metadata
+from src.agents.agent_creator import get_build_metrics
 from src.utils import session_manager
 from src.utils.event_emitter import event_emitter
-from settings import DEFAULT_TIMEOUT_SECONDS, ELEVENLABS_API_KEY
+from src.utils.embedding_engine import embedding_engine
+from src.utils import pinecone_client
+from src.utils.answer_cache import answer_cache
+from src.utils.transcript_cache import transcript_cache
+from src.utils.embedding_cache import embedding_cache
+from src.utils.job_scheduler import job_scheduler, SchedulerFull
+from src.utils.job_checkpoints import job_checkpoints
+from src.utils.deletion_queue import deletion_queue
+from src.utils.metrics import metrics, track_stage
+from settings import DEFAULT_TIMEOUT_SECONDS, ELEVENLABS_API_KEY, ANSWER_CACHE_ENABLED, SSE_KEEPALIVE_SECONDS, JOB_CHECKPOINTS_ENABLED, JOB_LEASE_SECONDS, METRICS_ENABLED
 from os import getenv
 import asyncio
 import json
+import threading
+import time
+import uuid
 import requests
 
 app = FastAPI()
@@ -29,14 +43,69 @@ app.add_middleware(
 )
 
 
+# Gauges read when /metrics is scraped; stage latencies are recorded where the work happens
+metrics.gauge("autovoyce_active_sessions", "Sessions that have not expired.", callback=session_manager.session_count)
+metrics.gauge("autovoyce_jobs_queued", "Processing jobs waiting for a worker.", callback=lambda: job_scheduler.stats()["queued"])
+metrics.gauge("autovoyce_jobs_running", "Processing jobs currently running.", callback=lambda: job_scheduler.stats()["running"])
+metrics.gauge("autovoyce_deletions_pending", "Vector deletions queued or awaiting retry.", callback=deletion_queue.pending_count)
+metrics.gauge("autovoyce_deletions_retrying", "Vector deletions that failed at least once and await retry.", callback=lambda: deletion_queue.stats()["retrying"])
+metrics.gauge("autovoyce_deletions_dead", "Vector deletions given up after DELETION_MAX_ATTEMPTS.", callback=lambda: deletion_queue.stats()["dead"])
+sse_streams_open = metrics.gauge("autovoyce_sse_streams_open", "Open Server-Sent Events streams.", ["endpoint"])
+
+
+def _build_metric(name: str) -> dict:
+    build_metrics = get_build_metrics()
+    return {kind: build_metrics[f"{kind}_{name}"] for kind in ("model", "agent")}
+
+
+metrics.counter("autovoyce_llm_builds_total", "Chat models and compiled agents built.", ["kind"], callback=lambda: _build_metric("builds"))
+metrics.counter("autovoyce_llm_build_seconds_total", "Time spent building chat models and compiling agents.", ["kind"], callback=lambda: _build_metric("build_seconds"))
+metrics.counter("autovoyce_llm_build_cache_hits_total", "Chat model and agent requests served from the registry.", ["kind"], callback=lambda: _build_metric("cache_hits"))
+
+
+def _cache_stats() -> dict:
+    engine = embedding_engine.status()
+    return {
+        "transcript": transcript_cache.stats(),
+        "embedding": embedding_cache.stats(),
+        "answer": answer_cache.stats(),
+        "query_embedding": {
+            "hits": engine["query_cache_hits"],
+            "misses": engine["query_cache_misses"],
+            "entries": engine["query_cache_entries"],
+        },
+    }
+
+
+def _cache_lookups() -> dict:
+    return {
+        (cache, result): stats[key]
+        for cache, stats in _cache_stats().items()
+        for result, key in (("hit", "hits"), ("miss", "misses"))
+    }
+
+
+metrics.counter("autovoyce_cache_lookups_total", "Cache lookups by cache and result (hit, miss).", ["cache", "result"], callback=_cache_lookups)
+metrics.gauge("autovoyce_cache_entries", "Entries held by each cache.", ["cache"], callback=lambda: {cache: stats["entries"] for cache, stats in _cache_stats().items()})
+metrics.gauge("autovoyce_transcript_cache_bytes", "Transcript bytes stored in the transcript cache.", callback=lambda: transcript_cache.stats()["bytes"])
+metrics.counter("autovoyce_cache_evictions_total", "Entries evicted from the transcript and embedding caches.", ["cache"], callback=lambda: {
+    "transcript": transcript_cache.stats()["evictions"],
+    "embedding": embedding_cache.stats()["evictions"],
+})
+metrics.counter("autovoyce_answer_cache_invalidations_total", "Answer cache invalidations after new chunks were indexed.", callback=lambda: answer_cache.stats()["invalidations"])
+metrics.gauge("autovoyce_embedding_model_loaded", "1 once the embedding model is loaded.", callback=lambda: int(embedding_engine.status()["loaded"]))
+
+
 class QueryRequest(BaseModel):
     user_query: str
     session_id: Optional[str] = None  # Allow session_id in request body
+    mode: Optional[Literal["fast", "agent"]] = None  # defaults to QUERY_MODE
 
 
 class ProcessRequest(BaseModel):
     video_ids: List[str]
     session_id: Optional[str] = None  # Allow session_id in request body
+    transcript_mode: Optional[str] = None  # "direct" (default) or "agent"
 
 
 class TTSRequest(BaseModel):
@@ -49,8 +118,16 @@ def read_root():
     return {"message": "AutoVoyce API is running"}
 
 
+@app.get("/metrics")
+def metrics_endpoint():
+    """Prometheus scrape endpoint: per-stage latency histograms, call counters and gauges of this worker."""
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled.")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.post("/upload")
-async def search_videos(request: QueryRequest, response: Response):
+def search_videos(request: QueryRequest, response: Response):
     """
     Phase 1: Searches YouTube for videos matching the query.
     Creates a new session and returns video list for user selection.
@@ -69,9 +146,7 @@ async def search_videos(request: QueryRequest, response: Response):
             max_age=86400,  # 24 hours
         )
         print(f"✅ Set cookie for session: {session_id} with namespace: {namespace}")
-        print(
-            f"📋 Created session, all sessions now: {session_manager.get_all_sessions()}"
-        )
+        print(f"📋 Created session, active sessions now: {session_manager.session_count()}")
 
         # Search for videos with metadata
         videos = retriever_agent_with_metadata(request.user_query)
@@ -104,8 +179,160 @@ async def search_videos(request: QueryRequest, response: Response):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def schedule_processing_job(
+    session_id: str,
+    namespace: str,
+    video_ids: List[str],
+    transcript_mode: Optional[str] = None,
+    job_id: Optional[str] = None,
+):
+    """
+    Queues the processing workflow for the selected videos on the shared job scheduler
+    and checkpoints the job so it can be resumed after a restart.
+    Raises SchedulerFull when the queue is at capacity.
+    """
+
+    def run_processing_workflow(cancel_event):
+        import sys
+
+        print(f"🔄 BACKGROUND THREAD STARTED for session: {session_id}", flush=True)
+        set_checkpoint_status("running")
+        event_emitter.emit(
+            session_id,
+            "processing_started",
+            f"Processing started for {len(video_ids)} videos",
+        )
+        sys.stdout.flush()
+
+        try:
+            # Ensure environment variables are loaded in background thread
+            from dotenv import load_dotenv
+
+            load_dotenv(".env")
+            print(f"✅ Environment loaded", flush=True)
+
+            initial_state = {
+                "user_query": "",  # Not needed for processing
+                "video_ids": video_ids,
+                "transcript": "",
+                "namespace": namespace,
+                "session_id": session_id,  # Pass session_id to workflow for event emission
+            }
+            if transcript_mode:
+                initial_state["transcript_mode"] = transcript_mode
+            print(
+                f"🚀 Starting processing workflow for session: {session_id} with {len(video_ids)} videos",
+                flush=True,
+            )
+            print(f"📋 Video IDs: {video_ids}", flush=True)
+
+            # Update last access at start of processing to prevent cleanup
+            session_manager.update_last_access(session_id)
+            print(f"✅ Session access updated", flush=True)
+
+            result = processing_workflow.invoke(
+                initial_state,
+                config={"configurable": {"cancel_event": cancel_event}},
+            )
+            print(
+                f"✅ Processing workflow completed for session: {session_id}",
+                flush=True,
+            )
+            if cancel_event.is_set():
+                set_checkpoint_status("cancelled")
+            else:
+                set_checkpoint_status("completed")
+                processed = len(result.get("indexed_video_ids", []))
+                failed = len(video_ids) - processed
+                event_emitter.emit(
+                    session_id,
+                    "processing_complete",
+                    f"Processed {processed}/{len(video_ids)} videos"
+                    + (f" ({failed} failed)" if failed else " successfully"),
+                    {"processed": processed, "failed": failed, "total": len(video_ids)},
+                )
+
+            # Update last access after processing completes to keep session alive
+            session_manager.update_last_access(session_id)
+            print(f"✅ Updated last access for session: {session_id}", flush=True)
+
+            return result
+        except Exception as e:
+            print(f"❌ Error in processing workflow: {str(e)}", flush=True)
+            set_checkpoint_status("failed")
+            import traceback
+
+            traceback.print_exc()
+            sys.stdout.flush()
+            raise
+
+    def set_checkpoint_status(status: str):
+        if not JOB_CHECKPOINTS_ENABLED:
+            return
+        try:
+            job_checkpoints.set_job_status(job_id, status)
+        except Exception as e:
+            print(f"⚠️ Could not checkpoint job status: {e}")
+
+    resuming = job_id is not None
+    job_id = job_id or str(uuid.uuid4())
+    # Checkpoint before queueing so a worker can't start the job before its row exists
+    if JOB_CHECKPOINTS_ENABLED and not resuming:
+        try:
+            job_checkpoints.save_job(job_id, session_id, namespace, video_ids, transcript_mode)
+        except Exception as e:
+            print(f"⚠️ Could not checkpoint job {job_id}: {e}")
+    try:
+        return job_scheduler.submit(
+            session_id, run_processing_workflow, video_count=len(video_ids), job_id=job_id
+        )
+    except SchedulerFull:
+        if not resuming:
+            set_checkpoint_status("rejected")
+        raise
+
+
+def resume_unfinished_jobs():
+    """
+    Resubmits queued or running jobs whose worker stopped (restart or crash). Only jobs
+    whose lease expired are claimed, and each by a single worker.
+    """
+    claimed = job_checkpoints.claim_unfinished_jobs()
+    for position, saved in enumerate(claimed):
+        if session_manager.get_namespace(saved["session_id"]) != saved["namespace"]:
+            print(f"⏭️ Not resuming job {saved['job_id']}: session {saved['session_id']} is gone")
+            job_checkpoints.set_job_status(saved["job_id"], "abandoned")
+            continue
+        try:
+            schedule_processing_job(
+                saved["session_id"],
+                saved["namespace"],
+                saved["video_ids"],
+                saved["transcript_mode"],
+                job_id=saved["job_id"],
+            )
+            print(f"🔁 Resumed job {saved['job_id']} for session {saved['session_id']}")
+        except SchedulerFull:
+            print("⚠️ Job queue full; remaining unfinished jobs stay checkpointed")
+            # Let this or another worker claim them again on a later pass
+            for unscheduled in claimed[position:]:
+                job_checkpoints.release_job(unscheduled["job_id"])
+            break
+
+
+def job_lease_loop():
+    """Renews this worker's job leases and adopts jobs whose worker stopped renewing."""
+    while True:
+        try:
+            job_checkpoints.renew_leases()
+            resume_unfinished_jobs()
+        except Exception as e:
+            print(f"⚠️ Job lease check failed: {e}")
+        time.sleep(JOB_LEASE_SECONDS / 3)
+
+
 @app.post("/upload/process")
-async def process_selected_videos(
+def process_selected_videos(
     request: ProcessRequest,
     response: Response,
     cookie_session_id: Optional[str] = Cookie(None, alias="session_id"),
@@ -121,7 +348,7 @@ async def process_selected_videos(
         print(
             f"📥 Process request - Body session_id: {request.session_id}, Cookie session_id: {cookie_session_id}"
         )
-        print(f"📋 All active sessions: {session_manager.get_all_sessions()}")
+        print(f"📋 Active sessions: {session_manager.session_count()}")
 
         if not session_id:
             print("❌ No session_id found in request body or cookie")
@@ -138,9 +365,6 @@ async def process_selected_videos(
 
         if not namespace:
             print(f"❌ Session {session_id} not found in active sessions")
-            print(
-                f"📋 Available sessions: {list(session_manager.get_all_sessions().keys())}"
-            )
             raise HTTPException(
                 status_code=404,
                 detail="Session not found or expired. Please search for videos again.",
@@ -162,93 +386,36 @@ async def process_selected_videos(
             max_age=86400,
         )
 
-        # Start processing workflow in background
-        import asyncio
-        from concurrent.futures import ThreadPoolExecutor
-
-        def run_processing_workflow():
-            import sys
-
-            print(f"🔄 BACKGROUND THREAD STARTED for session: {session_id}", flush=True)
-            event_emitter.emit(
-                session_id,
-                "processing_started",
-                f"Processing started for {len(request.video_ids)} videos",
-            )
-            sys.stdout.flush()
-
-            try:
-                # Ensure environment variables are loaded in background thread
-                from dotenv import load_dotenv
-
-                load_dotenv(".env")
-                print(f"✅ Environment loaded", flush=True)
-
-                initial_state = {
-                    "user_query": "",  # Not needed for processing
-                    "video_ids": request.video_ids,
-                    "transcript": "",
-                    "namespace": namespace,
-                    "session_id": session_id,  # Pass session_id to workflow for event emission
-                }
-                print(
-                    f"🚀 Starting processing workflow for session: {session_id} with {len(request.video_ids)} videos",
-                    flush=True,
-                )
-                print(f"📋 Video IDs: {request.video_ids}", flush=True)
-
-                # Update last access at start of processing to prevent cleanup
-                session_manager.update_last_access(session_id)
-                print(f"✅ Session access updated", flush=True)
-
-                result = processing_workflow.invoke(initial_state)
-                print(
-                    f"✅ Processing workflow completed for session: {session_id}",
-                    flush=True,
-                )
-                event_emitter.emit(
-                    session_id,
-                    "processing_complete",
-                    "All videos processed successfully",
-                )
-
-                # Update last access after processing completes to keep session alive
-                session_manager.update_last_access(session_id)
-                print(f"✅ Updated last access for session: {session_id}", flush=True)
-
-                return result
-            except Exception as e:
-                print(f"❌ Error in processing workflow: {str(e)}", flush=True)
-                import traceback
-
-                traceback.print_exc()
-                sys.stdout.flush()
-                raise
-
-        # Run in background thread (fire and forget)
+        # Queue the job (bounded; sessions are served round-robin)
         print(f"📤 Scheduling background processing for session: {session_id}")
-        loop = asyncio.get_event_loop()
-        executor = ThreadPoolExecutor(max_workers=1)
-        future = loop.run_in_executor(executor, run_processing_workflow)
-
-        # Add error callback to catch any issues
-        def handle_future_result(fut):
-            try:
-                fut.result()  # This will raise if there was an error
-            except Exception as e:
-                print(f"❌ Background processing failed: {e}", flush=True)
-                import traceback
-
-                traceback.print_exc()
+        try:
+            job = schedule_processing_job(
+                session_id, namespace, request.video_ids, request.transcript_mode
+            )
+        except SchedulerFull as e:
+            print(f"⚠️ Rejecting processing request for session {session_id}: {e}")
+            raise HTTPException(
+                status_code=429,
+                detail=str(e),
+                headers={"Retry-After": "10", "X-Queued-Jobs": str(e.queued)},
+            )
 
-        future.add_done_callback(handle_future_result)
-        print(f"✅ Background task scheduled", flush=True)
+        queue_position = job_scheduler.queue_position(job.job_id)
+        print(f"✅ Job {job.job_id} queued (position: {queue_position})", flush=True)
+        event_emitter.emit(
+            session_id,
+            "job_queued",
+            f"Processing job queued for {len(request.video_ids)} videos",
+            {"job_id": job.job_id, "queue_position": queue_position},
+        )
 
         # Return immediately
         response_data = {
             "session_id": session_id,
             "namespace": namespace,
             "status": "processing",
+            "job_id": job.job_id,
+            "queue_position": queue_position,
             "video_count": len(request.video_ids),
             "message": f"Processing {len(request.video_ids)} selected videos. You can start querying in a few moments.",
         }
@@ -265,63 +432,113 @@ async def process_selected_videos(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """Returns a processing job's status and, while it waits, its queue position."""
+    job = job_scheduler.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return {**job.to_dict(), "queue_position": job_scheduler.queue_position(job_id)}
+
+
+@app.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: str):
+    """Cancels a queued job, or asks a running job to stop after its current video."""
+    job = job_scheduler.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    if JOB_CHECKPOINTS_ENABLED and job.status == "cancelled":
+        # Dropped before it started; don't resume it after a restart
+        job_checkpoints.set_job_status(job_id, "cancelled")
+    event_emitter.emit(job.session_id, "job_cancel_requested", "Processing job cancellation requested", {"job_id": job_id})
+    return job.to_dict()
+
+
 @app.on_event("startup")
 def startup_event():
     # Start the background cleanup scheduler (checks every 60s, expires after DEFAULT_TIMEOUT_SECONDS)
     session_manager.start_cleanup_scheduler(
         timeout_seconds=int(DEFAULT_TIMEOUT_SECONDS)
     )
+    # Warm up the shared embedding model so the first processing job doesn't pay for loading it
+    threading.Thread(target=embedding_engine.load, daemon=True).start()
+    # Keep our job leases alive and pick up jobs interrupted by a restart or a dead worker
+    if JOB_CHECKPOINTS_ENABLED:
+        threading.Thread(target=job_lease_loop, name="job-leases", daemon=True).start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Stop idle job workers and the deletion worker (pending deletions stay queued on disk),
+    # then release pooled Pinecone connections
+    job_scheduler.shutdown()
+    deletion_queue.stop()
+    if JOB_CHECKPOINTS_ENABLED:
+        # Our unfinished jobs die with the process; let the next worker resume them immediately
+        await asyncio.to_thread(job_checkpoints.release_leases)
+    await pinecone_client.close()
 
 
 @app.get("/upload/status/{session_id}")
-async def stream_processing_status(session_id: str):
+async def stream_processing_status(
+    session_id: str,
+    last_event_id: Optional[str] = Header(None),
+):
     """
     Server-Sent Events endpoint for streaming processing status updates.
     Frontend connects to this endpoint to receive real-time updates.
+    Every event is sent with an SSE id; a reconnecting client (EventSource sends
+    Last-Event-ID automatically) only receives the events it missed. An id from before
+    a restart replays the buffered events instead.
     """
-    import queue
-    import threading
+    resume_after = event_emitter.resume_point(session_id, last_event_id)
+
+    def format_event(event: dict) -> str:
+        return f"id: {event_emitter.sse_id(event)}\ndata: {json.dumps(event)}\n\n"
 
     async def event_generator():
         # Send initial connection message
-        yield f"data: {json.dumps({'type': 'connected', 'message': 'Connected to processing status stream'})}\n\n"
-
-        # Thread-safe queue for events
-        event_queue = queue.Queue()
-
-        def on_event(event):
-            """Callback to add events to the queue (called from background thread)"""
-            event_queue.put(event)
+        yield f"data: {json.dumps({'type': 'connected', 'message': 'Connected to processing status stream', 'resumed_after': resume_after})}\n\n"
 
-        # Subscribe to events for this session
-        event_emitter.subscribe(session_id, on_event)
+        # Events from background threads are handed to this loop's queue; nothing here blocks
+        subscription = event_emitter.subscribe_async(session_id)
+        sse_streams_open.inc(endpoint="status")
 
         try:
-            # Send any existing events first
-            existing_events = event_emitter.get_events(session_id)
-            for event in existing_events:
-                yield f"data: {json.dumps(event)}\n\n"
+            # Send buffered events the client hasn't seen yet
+            last_sent = resume_after
+            for event in event_emitter.get_events(session_id, after_seq=resume_after):
+                yield format_event(event)
+                last_sent = event["id"]
 
             # Keep connection alive and stream new events
             while True:
                 try:
-                    # Wait for new event with timeout (non-blocking check)
-                    try:
-                        event = event_queue.get(timeout=1.0)
-                        yield f"data: {json.dumps(event)}\n\n"
-                    except queue.Empty:
-                        # Send keepalive
-                        yield f": keepalive\n\n"
-                        await asyncio.sleep(0.1)  # Small delay to prevent busy loop
-                        continue
-                except Exception as e:
-                    print(f"Error in SSE stream: {e}", flush=True)
-                    break
+                    event = await asyncio.wait_for(subscription.queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    # Send keepalive
+                    yield f": keepalive\n\n"
+                    continue
+
+                if subscription.overflowed:
+                    # Slow consumer: drop the backlog and catch up from the ring buffer
+                    subscription.reset()
+                    for missed in event_emitter.get_events(session_id, after_seq=last_sent):
+                        yield format_event(missed)
+                        last_sent = missed["id"]
+                    continue
+
+                # Skip events already replayed from the buffer
+                if event["id"] <= last_sent:
+                    continue
+                yield format_event(event)
+                last_sent = event["id"]
         except asyncio.CancelledError:
             pass
         finally:
             # Unsubscribe when client disconnects
-            event_emitter.unsubscribe(session_id, on_event)
+            event_emitter.unsubscribe(session_id, subscription)
+            sse_streams_open.dec(endpoint="status")
 
     return StreamingResponse(
         event_generator(),
@@ -334,6 +551,40 @@ async def stream_processing_status(session_id: str):
     )
 
 
+def resolve_query_namespace(
+    request: QueryRequest,
+    cookie_session_id: Optional[str],
+    x_session_id: Optional[str],
+) -> str:
+    """Resolves the session's namespace for a query or raises the matching HTTPException."""
+    # Get session_id from header, request body, or cookie (in that priority order)
+    session_id = x_session_id or request.session_id or cookie_session_id
+
+    print(
+        f"📥 Received query request. Header session_id: {x_session_id}, Body session_id: {request.session_id}, Cookie session_id: {cookie_session_id}"
+    )
+    print(f"📋 Active sessions: {session_manager.session_count()}")
+
+    if not session_id:
+        print("❌ No session_id found in request body or cookie")
+        raise HTTPException(
+            status_code=401,
+            detail="No active session. Please provide session_id or upload data first.",
+        )
+
+    # Keep session alive
+    session_manager.update_last_access(session_id)
+
+    namespace = session_manager.get_namespace(session_id)
+    print(f"🔍 Looked up namespace for session {session_id}: {namespace}")
+
+    if not namespace:
+        print(f"❌ Session {session_id} not found in active sessions")
+        raise HTTPException(status_code=404, detail="Session not found or expired.")
+
+    return namespace
+
+
 @app.post("/query")
 def query_endpoint(
     request: QueryRequest,
@@ -345,37 +596,28 @@ def query_endpoint(
     Uses session_id from header, request body, or cookie to determine which namespace to query.
     """
     try:
-        # Get session_id from header, request body, or cookie (in that priority order)
-        session_id = x_session_id or request.session_id or cookie_session_id
-
-        print(
-            f"📥 Received query request. Header session_id: {x_session_id}, Body session_id: {request.session_id}, Cookie session_id: {cookie_session_id}"
-        )
-        print(f"📋 Active sessions: {session_manager.get_all_sessions()}")
-
-        if not session_id:
-            print("❌ No session_id found in request body or cookie")
-            raise HTTPException(
-                status_code=401,
-                detail="No active session. Please provide session_id or upload data first.",
-            )
-
-        # Keep session alive
-        session_manager.update_last_access(session_id)
-
-        namespace = session_manager.get_namespace(session_id)
-        print(f"🔍 Looked up namespace for session {session_id}: {namespace}")
-
-        if not namespace:
-            print(f"❌ Session {session_id} not found in active sessions")
-            raise HTTPException(status_code=404, detail="Session not found or expired.")
+        namespace = resolve_query_namespace(request, cookie_session_id, x_session_id)
 
         # Set namespace in context for query_tool to access
         session_manager.set_current_namespace(namespace)
         print(f"✅ Set namespace in context: {namespace}")
 
+        # Serve repeated or paraphrased questions from the semantic answer cache
+        question_vector = None
+        cache_version = answer_cache.version(namespace)
+        if ANSWER_CACHE_ENABLED:
+            cached = answer_cache.get_exact(namespace, request.user_query)
+            if cached is None:
+                question_vector = embedding_engine.embed_query(request.user_query)
+                cached = answer_cache.get(namespace, question_vector)
+            if cached is not None:
+                print(f"⚡ Answer cache hit for namespace: {namespace}")
+                return {"response": cached, "namespace": namespace, "cached": True}
+
         # Query with session-specific namespace
-        result = query_agent(request.user_query, namespace=namespace)
+        result = query_agent(request.user_query, namespace=namespace, mode=request.mode)
+        if question_vector is not None and not result.startswith("Error processing query"):
+            answer_cache.put(namespace, request.user_query, question_vector, result, cache_version)
         return {"response": result, "namespace": namespace}
     except HTTPException:
         raise
@@ -383,8 +625,80 @@ def query_endpoint(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/query/stream")
+async def query_stream_endpoint(
+    request: QueryRequest,
+    cookie_session_id: Optional[str] = Cookie(None, alias="session_id"),
+    x_session_id: Optional[str] = Header(None, alias="X-Session-ID"),
+):
+    """
+    Server-Sent Events variant of /query.
+    Retrieves context, then streams answer tokens as they are generated ('token' events)
+    and finishes with a 'complete' event carrying the full answer and chunk references.
+    Always answers in fast mode (regardless of QUERY_MODE); mode="agent" is rejected.
+    """
+    if request.mode == "agent":
+        raise HTTPException(
+            status_code=400,
+            detail="Streaming only supports fast mode. Use /query for mode 'agent'.",
+        )
+    # Session lookups hit the session store (SQLite or Redis); keep them off the event loop
+    namespace = await asyncio.to_thread(resolve_query_namespace, request, cookie_session_id, x_session_id)
+    query = request.user_query
+
+    async def event_generator():
+        yield f"data: {json.dumps({'type': 'connected', 'message': 'Connected to query stream', 'namespace': namespace})}\n\n"
+        sse_streams_open.inc(endpoint="query")
+
+        try:
+            cache_version = answer_cache.version(namespace)
+            question_vector = None
+            if ANSWER_CACHE_ENABLED:
+                cached = answer_cache.get_exact(namespace, query)
+                if cached is None:
+                    question_vector = await asyncio.to_thread(embedding_engine.embed_query, query)
+                    cached = answer_cache.get(namespace, question_vector)
+                if cached is not None:
+                    yield f"data: {json.dumps({'type': 'token', 'content': cached})}\n\n"
+                    yield f"data: {json.dumps({'type': 'complete', 'response': cached, 'cached': True, 'chunks': []})}\n\n"
+                    return
+
+            chunks = await aretrieve_context(query, namespace)
+            yield f"data: {json.dumps({'type': 'context_retrieved', 'message': f'Retrieved {len(chunks)} chunks', 'chunk_count': len(chunks)})}\n\n"
+
+            parts = []
+            with track_stage("generation"):
+                async for message_chunk in get_fast_model().astream(build_fast_messages(query, format_context(chunks))):
+                    text = content_to_text(message_chunk.content)
+                    if text:
+                        parts.append(text)
+                        yield f"data: {json.dumps({'type': 'token', 'content': text})}\n\n"
+
+            response_text = "".join(parts)
+            if question_vector is not None:
+                answer_cache.put(namespace, query, question_vector, response_text, cache_version)
+            yield f"data: {json.dumps({'type': 'complete', 'response': response_text, 'cached': False, 'chunks': chunk_references(chunks)})}\n\n"
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print(f"❌ Error in query stream: {e}", flush=True)
+            yield f"data: {json.dumps({'type': 'error', 'message': f'Error processing query: {str(e)}'})}\n\n"
+        finally:
+            sse_streams_open.dec(endpoint="query")
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",  # Disable buffering in nginx
+        },
+    )
+
+
 @app.get("/scribe-token")
-async def get_scribe_token():
+def get_scribe_token():
     """
     Generate a single-use token for ElevenLabs Realtime Speech-to-Text API.
     This token is used by the frontend to connect to ElevenLabs' realtime transcription service.
@@ -451,7 +765,7 @@ async def get_scribe_token():
 
 
 @app.post("/tts")
-async def text_to_speech(request: TTSRequest):
+def text_to_speech(request: TTSRequest):
     """
     Convert text to speech using ElevenLabs TTS API.
     Returns audio as MP3.
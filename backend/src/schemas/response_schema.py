@@ -7,3 +7,6 @@ class ResponseSchema(TypedDict, total=False):
     namespace: str  # Session-specific Pinecone namespace
     query_response: Optional[str]  # Upload confirmation/error message
     session_id: str  # Session ID for event emission
+    transcript_mode: str  # "direct" or "agent" (overrides settings.TRANSCRIPT_MODE)
+    video_transcripts: list[dict]  # Per-video transcripts: video_id, language_code, snippets, text
+    indexed_video_ids: list[str]  # Videos that finished ingestion and can be queried
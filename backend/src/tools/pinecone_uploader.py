@@ -1,11 +1,15 @@
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_experimental.text_splitter import SemanticChunker
-from src.utils.pinecone_vector_index import PineconeVectorIndex
+from src.utils.vector_index_factory import get_vector_index
 from src.utils.event_emitter import event_emitter
+from src.utils.embedding_engine import embedding_engine
+from src.utils.semantic_chunker import SentenceEmbeddingChunker, EmbeddedChunks
+from src.utils.video_corpus import video_corpus
+from src.utils.job_checkpoints import job_checkpoints
+from settings import VECTOR_STORAGE_MODE, SHARED_CORPUS_NAMESPACE, JOB_CHECKPOINTS_ENABLED
 from langchain.tools import tool
+from typing import Optional
 
 @tool
-def upload_transcript_to_pinecone(transcript: str, namespace: str = "youtube_transcripts", session_id: str = "") -> str:
+def upload_transcript_to_pinecone(transcript: str, namespace: str = "youtube_transcripts", session_id: str = "", video_id: str = "") -> str:
     """
     Uploads a YouTube transcript to the Pinecone vector database.
     Useful when you need to store transcript text for later retrieval or Q&A.
@@ -14,6 +18,7 @@ def upload_transcript_to_pinecone(transcript: str, namespace: str = "youtube_tra
         transcript: The transcript text to upload
         namespace: The Pinecone namespace to use for isolation (default: "youtube_transcripts")
         session_id: Optional session ID for event emission
+        video_id: Optional YouTube video ID; tags every chunk and gives chunks stable IDs
     """
     print("Starting Pinecone upload process...")
     if session_id:
@@ -24,24 +29,18 @@ def upload_transcript_to_pinecone(transcript: str, namespace: str = "youtube_tra
         return "No transcript found to upload."
 
     try:
-        # Initialize Embeddings
-        print("Initializing Embedding Model (sentence-transformers/all-MiniLM-L6-v2)...")
-        if session_id:
-            event_emitter.emit(session_id, "embedding_model_init", "Initializing Embedding Model (sentence-transformers/all-MiniLM-L6-v2)...")
-        embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+        # Reuse the process-wide embedding model (loaded once, shared across jobs)
+        if not embedding_engine.is_loaded():
+            if session_id:
+                event_emitter.emit(session_id, "embedding_model_init", f"Initializing Embedding Model ({embedding_engine.model_name})...")
+            embedding_engine.load()
+        embeddings = embedding_engine
         
         # Initialize Vector Index Wrapper
-        vector_index = PineconeVectorIndex(embeddings, session_id=session_id)
-        
-        # Define Chunker
-        chunker = SemanticChunker(
-            embeddings,
-            breakpoint_threshold_type="percentile"  # 95th percentile similarity threshold
-        )
+        vector_index = get_vector_index(embeddings, session_id=session_id)
         
-        def chunker_wrapper(text: str):
-            chunks = chunker.split_text(transcript)
-            return chunks
+        # Define Chunker: embeds each sentence window once and reuses those vectors for the chunks
+        chunker = SentenceEmbeddingChunker(embeddings)
         
         # Upload to specified namespace
         print(f"Uploading transcript to Pinecone (Namespace: {namespace})...")
@@ -50,8 +49,10 @@ def upload_transcript_to_pinecone(transcript: str, namespace: str = "youtube_tra
         
         vector_index.create_or_load_vector_index(
             markdown_text=transcript,
-            chunker=chunker_wrapper,
-            namespace=namespace
+            chunker=chunker,
+            namespace=namespace,
+            metadata={"video_id": video_id} if video_id else None,
+            id_prefix=video_id or None
         )
         
         success_msg = f"Transcript successfully uploaded to Pinecone namespace '{namespace}'."
@@ -66,6 +67,85 @@ def upload_transcript_to_pinecone(transcript: str, namespace: str = "youtube_tra
         traceback.print_exc()
         return error_msg
 
+def resolve_upload_namespace(video_id: str, namespace: str, session_id: str = "") -> Optional[str]:
+    """
+    Returns the namespace a video's chunks should be upserted into, or None when
+    nothing needs uploading.
+    In "shared" storage mode the video is stored once in SHARED_CORPUS_NAMESPACE and the
+    session namespace only references it; videos already in the corpus return None.
+    """
+    if VECTOR_STORAGE_MODE != "shared":
+        return namespace
+
+    # Reference the video before checking the corpus so a concurrent expiry can't drop it
+    video_corpus.attach(namespace, [video_id])
+    already_indexed = video_corpus.is_indexed(video_id)
+    if not already_indexed and JOB_CHECKPOINTS_ENABLED:
+        # Only a completed upsert counts; a partially uploaded video must be finished, not skipped
+        try:
+            already_indexed = job_checkpoints.get_stage(SHARED_CORPUS_NAMESPACE, video_id) == "indexed"
+        except Exception as e:
+            print(f"⚠️ Could not check shared corpus checkpoint for {video_id}: {e}")
+
+    if already_indexed:
+        video_corpus.mark_indexed(video_id)
+        message = f"Video {video_id} already in shared corpus; skipping embedding."
+        print(message)
+        if session_id:
+            event_emitter.emit(session_id, "video_already_indexed", message, {
+                "video_id": video_id,
+                "namespace": SHARED_CORPUS_NAMESPACE
+            })
+        return None
+    return SHARED_CORPUS_NAMESPACE
+
+
+def upload_video_chunks(video_id: str, chunks: EmbeddedChunks, namespace: str, session_id: str = "", skip_ids: set = None, on_batch=None) -> int:
+    """
+    Upserts a video's pre-embedded chunks tagged with its video_id. Returns the number upserted.
+    Chunk IDs in skip_ids are not sent again; on_batch receives the IDs of each stored batch.
+    """
+    vector_index = get_vector_index(embedding_engine, session_id=session_id)
+    uploaded = vector_index.upsert_chunks(
+        chunks.texts,
+        namespace=namespace,
+        chunk_vectors=chunks.vectors,
+        metadata={"video_id": video_id},
+        id_prefix=video_id,
+        skip_ids=skip_ids,
+        on_batch=on_batch
+    )
+    if namespace == SHARED_CORPUS_NAMESPACE:
+        mark_shared_indexed(video_id, len(chunks.texts))
+    return uploaded
+
+
+def mark_shared_indexed(video_id: str, chunk_count: Optional[int] = None):
+    """Records that every chunk of a video is in the shared corpus (registry and checkpoint)."""
+    video_corpus.mark_indexed(video_id)
+    if JOB_CHECKPOINTS_ENABLED:
+        try:
+            job_checkpoints.mark_stage(SHARED_CORPUS_NAMESPACE, video_id, "indexed", chunk_count)
+        except Exception as e:
+            print(f"⚠️ Could not checkpoint shared corpus video {video_id}: {e}")
+
+
+def upload_video_transcript(video_id: str, transcript: str, namespace: str, session_id: str = "") -> str:
+    """Uploads a single video's transcript, skipping videos already in the shared corpus."""
+    target_namespace = resolve_upload_namespace(video_id, namespace, session_id)
+    if target_namespace is None:
+        return f"Video {video_id} already in shared corpus; skipping embedding."
+
+    response = upload_transcript_to_pinecone.invoke({
+        "transcript": transcript,
+        "namespace": target_namespace,
+        "session_id": session_id,
+        "video_id": video_id
+    })
+    if target_namespace == SHARED_CORPUS_NAMESPACE and not response.startswith("Error"):
+        mark_shared_indexed(video_id)
+    return response
+
 if __name__ == "__main__":
     # Test execution
     mock_transcript = "This is a test transcript for Pinecone upload verification.\n" * 50
@@ -1,47 +1,144 @@
-from pinecone import Pinecone
-from settings import PINECONE_API_KEY, PINECONE_HOST_URL
+import asyncio
+from settings import VECTOR_STORAGE_MODE, SHARED_CORPUS_NAMESPACE, HYBRID_SEARCH_ENABLED, HYBRID_CANDIDATES, HYBRID_RRF_K, CONTEXT_TOP_K
 from langchain.tools import tool
 from pydantic import Field
 from src.utils import session_manager
+from src.utils.video_corpus import video_corpus
+from src.utils.embedding_engine import embedding_engine
+from src.utils.vector_index_factory import get_vector_index
+from src.utils.keyword_index import keyword_index
+from src.utils.context_packer import pack_context
+from src.utils.metrics import track_stage
 
-# Lazy initialization - only create when needed
-_pc = None
-_index = None
 
-def get_index():
-    """Lazily initializes and returns the Pinecone index."""
-    global _pc, _index
-    if _index is None:
-        if not PINECONE_API_KEY:
-            raise ValueError("PINECONE_API_KEY environment variable is not set")
-        if not PINECONE_HOST_URL:
-            raise ValueError("PINECONE_HOST_URL environment variable is not set")
-        _pc = Pinecone(api_key=PINECONE_API_KEY)
-        _index = _pc.Index(host=PINECONE_HOST_URL)
-    return _index
+def search_scope(namespace: str):
+    """
+    Returns the (namespace, metadata filter) to search for a session namespace, or None
+    when a shared-mode session has no videos yet.
+    """
+    if VECTOR_STORAGE_MODE != "shared":
+        return namespace, None
+    # Sessions are a set of videos in the shared corpus
+    video_ids = video_corpus.get_videos(namespace)
+    if not video_ids:
+        return None
+    return SHARED_CORPUS_NAMESPACE, {"video_id": {"$in": video_ids}}
+
+
+def retrieve_chunks(query: str, namespace: str, top_k: int = CONTEXT_TOP_K, include_values: bool = False) -> list[dict]:
+    """
+    Searches the session's vectors and returns the hits as dicts with
+    id, score, chunk_text, video_id and chunk_id (plus vector values if include_values).
+    The query is embedded locally with the same model used at ingestion; with
+    HYBRID_SEARCH_ENABLED, BM25 keyword hits are fused in by reciprocal rank.
+    """
+    print(f"🔍 query_tool searching in namespace: {namespace}")
+
+    scope = search_scope(namespace)
+    if scope is None:
+        return []
+    namespace, search_filter = scope
+
+    query_vector = embedding_engine.embed_query(query)
+    vector_index = get_vector_index(embedding_engine)
+    if not HYBRID_SEARCH_ENABLED:
+        return vector_index.query(query_vector, namespace=namespace, top_k=top_k, filter=search_filter, include_values=include_values)
+
+    candidates = max(HYBRID_CANDIDATES, top_k)
+    vector_hits = vector_index.query(query_vector, namespace=namespace, top_k=candidates, filter=search_filter, include_values=include_values)
+    keyword_hits = keyword_index.search(namespace, query, top_k=candidates, filter=search_filter, include_values=include_values)
+    return fuse_rankings(vector_hits, keyword_hits, top_k)
+
+
+async def aretrieve_chunks(query: str, namespace: str, top_k: int = CONTEXT_TOP_K, include_values: bool = False) -> list[dict]:
+    """
+    retrieve_chunks for the event loop: the vector query goes through the backend's async
+    client while embedding and the SQLite lookups run in worker threads.
+    """
+    print(f"🔍 query_tool searching in namespace: {namespace}")
+
+    scope = await asyncio.to_thread(search_scope, namespace)
+    if scope is None:
+        return []
+    namespace, search_filter = scope
+
+    query_vector = await asyncio.to_thread(embedding_engine.embed_query, query)
+    vector_index = get_vector_index(embedding_engine)
+    if not HYBRID_SEARCH_ENABLED:
+        return await vector_index.aquery(query_vector, namespace=namespace, top_k=top_k, filter=search_filter, include_values=include_values)
+
+    candidates = max(HYBRID_CANDIDATES, top_k)
+    vector_hits, keyword_hits = await asyncio.gather(
+        vector_index.aquery(query_vector, namespace=namespace, top_k=candidates, filter=search_filter, include_values=include_values),
+        asyncio.to_thread(keyword_index.search, namespace, query, top_k=candidates, filter=search_filter, include_values=include_values),
+    )
+    return fuse_rankings(vector_hits, keyword_hits, top_k)
+
+
+def fuse_rankings(vector_hits: list[dict], keyword_hits: list[dict], top_k: int, k: int = HYBRID_RRF_K) -> list[dict]:
+    """
+    Reciprocal rank fusion of vector and BM25 hits. The returned chunks keep their
+    vector similarity (if any) in vector_score and carry the fused score in score.
+    """
+    fused: dict[str, dict] = {}
+    for rank, hit in enumerate(vector_hits):
+        fused[hit["id"]] = {**hit, "vector_score": hit["score"], "score": 1.0 / (k + rank + 1)}
+    for rank, hit in enumerate(keyword_hits):
+        chunk = fused.get(hit["id"])
+        if chunk is None:
+            metadata = hit["metadata"]
+            chunk = fused[hit["id"]] = {
+                "id": hit["id"],
+                "score": 0.0,
+                "vector_score": None,
+                "chunk_text": metadata["chunk_text"],
+                "video_id": metadata.get("video_id"),
+                "chunk_id": metadata.get("chunk_id"),
+                **({"values": hit["values"]} if "values" in hit else {}),
+            }
+        chunk["score"] += 1.0 / (k + rank + 1)
+    return sorted(fused.values(), key=lambda chunk: chunk["score"], reverse=True)[:top_k]
+
+
+def retrieve_context(query: str, namespace: str) -> list[dict]:
+    """Retrieves chunks and packs them (deduplicated, ordered, token-budgeted) for the prompt."""
+    with track_stage("retrieval") as stage:
+        chunks = retrieve_chunks(query, namespace, include_values=True)
+        packed = pack_context(chunks)
+        stage.add_items(len(packed))
+        return packed
+
+
+async def aretrieve_context(query: str, namespace: str) -> list[dict]:
+    """retrieve_context for async endpoints (see aretrieve_chunks)."""
+    with track_stage("retrieval") as stage:
+        chunks = await aretrieve_chunks(query, namespace, include_values=True)
+        packed = pack_context(chunks)
+        stage.add_items(len(packed))
+        return packed
+
+
+def format_context(chunks: list[dict]) -> str:
+    """Joins packed chunk texts, in order, into the context string handed to the model."""
+    return "\n\n".join(chunk["chunk_text"] for chunk in chunks)
+
+
+def chunk_references(chunks: list[dict]) -> list[dict]:
+    """Returns the client-facing references (no text) for retrieved chunks."""
+    return [
+        {"id": chunk["id"], "score": chunk["score"], "video_id": chunk["video_id"], "chunk_id": chunk["chunk_id"]}
+        for chunk in chunks
+    ]
 
 
 @tool
 def query_tool(query: str = Field(description="The search query to find relevant context from the vector database."), namespace: str = Field(description="The namespace to search in.")) -> str:
     """
     Searches the Pinecone vector index for relevant context based on the query.
-    Returns a comma-separated string of relevant text chunks.
+    Returns the relevant text chunks, deduplicated and trimmed to the context token budget.
     Uses the current namespace from session context.
     """    
-    print(f"🔍 query_tool searching in namespace: {namespace}")
-    
-    index = get_index()
-    results = index.search(
-        namespace=namespace, 
-        query={
-            "inputs": {"text": query}, 
-            "top_k": 5
-        },
-        fields=["chunk_text"]
-    )
-    hits = results.get("result", {}).get("hits", [])
-    chunk_texts = [hit["fields"]["chunk_text"] for hit in hits if "fields" in hit and "chunk_text" in hit["fields"]]
-    return ", ".join(set(chunk_texts))
+    return format_context(retrieve_context(query, namespace))
 
 if __name__ == "__main__":
     results = query_tool(query="Which iphone is best for students?", namespace="session_716979f0")
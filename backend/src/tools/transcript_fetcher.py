@@ -1,11 +1,70 @@
+import requests
 from langchain.tools import tool
 from youtube_transcript_api import YouTubeTranscriptApi
+from src.utils.transcript_cache import transcript_cache
+from settings import TRANSCRIPT_LANGUAGES, TRANSCRIPT_CACHE_ENABLED, TRANSCRIPT_HTTP_TIMEOUT_SECONDS
+
+
+class TimeoutSession(requests.Session):
+    """requests.Session whose calls default to a timeout, so a stalled YouTube request fails instead of holding its fetch thread."""
+
+    def __init__(self, timeout: float = TRANSCRIPT_HTTP_TIMEOUT_SECONDS):
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, *args, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(*args, **kwargs)
+
+
+def fetch_transcript_snippets(video_id: str, languages: list[str] = TRANSCRIPT_LANGUAGES) -> dict:
+    """
+    Fetches a YouTube transcript deterministically (no LLM involved).
+    Returns a dict with video_id, language_code, snippets (text/start/duration),
+    the joined transcript text and whether it was served from the transcript cache.
+    """
+    cache_language = ",".join(languages)
+    if TRANSCRIPT_CACHE_ENABLED:
+        try:
+            cached = transcript_cache.get(video_id, cache_language)
+        except Exception as e:
+            print(f"⚠️ Transcript cache read failed for {video_id}: {e}")
+            cached = None
+        if cached is not None:
+            print(f"📦 Transcript cache hit for {video_id}")
+            cached["cached"] = True
+            return cached
+
+    ytt_api = YouTubeTranscriptApi(http_client=TimeoutSession())
+    fetched = ytt_api.fetch(video_id, languages=languages)
+    snippets = fetched.to_raw_data()
+    transcript = {
+        "video_id": video_id,
+        "language_code": fetched.language_code,
+        "snippets": snippets,
+        "text": snippets_to_text(snippets),
+    }
+
+    if TRANSCRIPT_CACHE_ENABLED:
+        try:
+            transcript_cache.put(video_id, cache_language, transcript)
+        except Exception as e:
+            print(f"⚠️ Transcript cache write failed for {video_id}: {e}")
+
+    transcript["cached"] = False
+    return transcript
+
+
+def snippets_to_text(snippets: list[dict]) -> str:
+    """Joins transcript snippets into a single whitespace-normalized string."""
+    return " ".join(text for text in (s.get("text", "").strip() for s in snippets) if text)
+
 
 @tool
 def transcript_fetcher(video_id: str) -> str:
     """This tool fetches the transcript of a YouTube video given its video ID."""
-    ytt_api = YouTubeTranscriptApi()
-    return ytt_api.fetch(video_id)  
+    return fetch_transcript_snippets(video_id)["text"]
 
 if __name__ == "__main__":
-    print(transcript_fetcher.invoke("R1LE5xfasmw"))
\ No newline at end of file
+    print(transcript_fetcher.invoke("R1LE5xfasmw"))
+    print(fetch_transcript_snippets("R1LE5xfasmw")["text"][:500])
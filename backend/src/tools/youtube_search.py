@@ -1,6 +1,7 @@
 from serpapi.google_search import GoogleSearch
 from langchain.tools import tool
 from settings import SERP_API_KEY
+from src.utils.metrics import track_stage
 from typing import List, Dict, Any
 import re
 
@@ -43,8 +44,11 @@ def youtube_search_with_metadata(query: str) -> List[Dict[str, Any]]:
     }
 
     try:
-        search = GoogleSearch(params)
-        results = search.get_dict()
+        with track_stage("search") as stage:
+            search = GoogleSearch(params)
+            results = search.get_dict()
+            if "error" in results:
+                stage.fail()
 
         # Debug: Print what we got from API
         print(f"🔍 SerpAPI response keys: {list(results.keys())}")
@@ -99,6 +103,7 @@ def youtube_search_with_metadata(query: str) -> List[Dict[str, Any]]:
             print(f"✅ Added video: {video_info['title'][:50]}...")
 
         print(f"📊 Total videos processed: {len(videos)}")
+        stage.add_items(len(videos))
         return videos
 
     except Exception as e:
@@ -0,0 +1,122 @@
+"""
+Semantic answer cache for /query.
+Answers are stored per namespace with the embedded question; a new question within the
+similarity threshold of a cached one returns the stored answer. Upserting new chunks
+into a namespace bumps its version, which drops its entries and rejects answers that
+were generated against the old contents.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional
+import numpy as np
+from settings import (
+    ANSWER_CACHE_SIMILARITY_THRESHOLD,
+    ANSWER_CACHE_MAX_ENTRIES,
+    ANSWER_CACHE_TTL_SECONDS,
+)
+
+
+@dataclass
+class _Entry:
+    question: str
+    vector: np.ndarray  # unit-normalized question embedding
+    answer: str
+    created_at: float
+
+
+def _normalize_question(question: str) -> str:
+    return " ".join(question.lower().split())
+
+
+class AnswerCache:
+    """Thread-safe, size- and TTL-bounded semantic answer cache."""
+
+    def __init__(
+        self,
+        similarity_threshold: float = ANSWER_CACHE_SIMILARITY_THRESHOLD,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+        ttl_seconds: int = ANSWER_CACHE_TTL_SECONDS,
+    ):
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # (namespace, normalized question) -> entry, in least-recently-used order
+        self._entries: "OrderedDict[tuple[str, str], _Entry]" = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def version(self, namespace: str) -> int:
+        """Returns the namespace's current content version (capture before generating an answer)."""
+        with self._lock:
+            return self._versions.get(namespace, 0)
+
+    def invalidate(self, namespace: str):
+        """Bumps the namespace version and drops its cached answers (call after upserts)."""
+        with self._lock:
+            self._versions[namespace] = self._versions.get(namespace, 0) + 1
+            for key in [key for key in self._entries if key[0] == namespace]:
+                del self._entries[key]
+            self._stats["invalidations"] += 1
+
+    def get_exact(self, namespace: str, question: str) -> Optional[str]:
+        """Returns a cached answer for the same question text without embedding it."""
+        key = (namespace, _normalize_question(question))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() - entry.created_at > self.ttl_seconds:
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry.answer
+
+    def get(self, namespace: str, question_vector: list[float]) -> Optional[str]:
+        """Returns the answer of the most similar cached question above the threshold."""
+        query = np.asarray(question_vector, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1.0
+        now = time.time()
+        with self._lock:
+            keys = []
+            for key, entry in list(self._entries.items()):
+                if now - entry.created_at > self.ttl_seconds:
+                    del self._entries[key]
+                elif key[0] == namespace:
+                    keys.append(key)
+            if not keys:
+                self._stats["misses"] += 1
+                return None
+
+            matrix = np.stack([self._entries[key].vector for key in keys])
+            similarities = matrix @ query
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.similarity_threshold:
+                self._stats["misses"] += 1
+                return None
+
+            self._entries.move_to_end(keys[best])
+            self._stats["hits"] += 1
+            return self._entries[keys[best]].answer
+
+    def put(self, namespace: str, question: str, question_vector: list[float], answer: str, version: int):
+        """Stores an answer unless the namespace changed since version was captured."""
+        vector = np.asarray(question_vector, dtype=np.float32)
+        vector /= np.linalg.norm(vector) or 1.0
+        key = (namespace, _normalize_question(question))
+        with self._lock:
+            if self._versions.get(namespace, 0) != version:
+                return
+            self._entries[key] = _Entry(question, vector, answer, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "entries": len(self._entries)}
+
+
+# Global answer cache instance
+answer_cache = AnswerCache()
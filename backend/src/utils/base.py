@@ -1,9 +1,34 @@
+import asyncio
 from abc import ABC, abstractmethod
 
 class VectorIndexStrategy(ABC):
 
     @abstractmethod
-    def create_or_load_vector_index(self, markdown_text: str, chunker=None, namespace: str = None):
+    def create_or_load_vector_index(self, markdown_text: str, chunker=None, namespace: str = None, metadata: dict = None, id_prefix: str = None):
+        pass
+
+    @abstractmethod
+    def upsert_chunks(self, chunk_texts: list[str], namespace: str = None, chunk_vectors: list[list[float]] = None, metadata: dict = None, id_prefix: str = None, skip_ids: set = None, on_batch=None) -> int:
+        pass
+
+    @abstractmethod
+    def query(self, vector: list[float], namespace: str = None, top_k: int = 5, filter: dict = None, include_values: bool = False) -> list[dict]:
+        pass
+
+    async def aquery(self, vector: list[float], namespace: str = None, top_k: int = 5, filter: dict = None, include_values: bool = False) -> list[dict]:
+        """Async query; backends without a native async client run query() in a worker thread."""
+        return await asyncio.to_thread(self.query, vector, namespace=namespace, top_k=top_k, filter=filter, include_values=include_values)
+
+    @abstractmethod
+    def has_vectors(self, ids: list[str], namespace: str = None) -> bool:
+        pass
+
+    @abstractmethod
+    def delete_by_prefix(self, prefix: str, namespace: str = None) -> int:
+        pass
+
+    @abstractmethod
+    def delete_namespace(self, namespace: str):
         pass
 
     @abstractmethod
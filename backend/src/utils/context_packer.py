@@ -0,0 +1,102 @@
+"""
+Context assembly for query answering.
+Turns retrieved chunks into a compact prompt context: near-duplicate chunks (e.g. the
+same passage from overlapping videos) are dropped by cosine similarity, the rest are
+packed best-first into a token budget and then ordered by video and position so the
+model reads passages in transcript order.
+"""
+
+import threading
+from typing import Optional
+import numpy as np
+from settings import CONTEXT_TOKEN_BUDGET, CONTEXT_DEDUPE_THRESHOLD
+
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None:
+        with _encoding_lock:
+            if _encoding is None:
+                try:
+                    import tiktoken
+
+                    _encoding = tiktoken.get_encoding("cl100k_base")
+                except Exception as e:
+                    # tiktoken downloads its BPE file on first use; estimate offline
+                    print(f"⚠️ tiktoken unavailable ({e}); estimating tokens as characters / 4")
+                    _encoding = False
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """Approximate token count of text (cl100k_base; Gemini's tokenizer is close enough for budgeting)."""
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def _normalized_matrix(chunks: list[dict]) -> Optional[np.ndarray]:
+    """
+    Unit-normalized chunk vectors. Chunks retrieved without values get a zero row, so
+    they take no part in the cosine dedupe (nothing is embedded on the request path).
+    """
+    present = [chunk["values"] for chunk in chunks if chunk.get("values") is not None]
+    if not present:
+        return None
+
+    matrix = np.zeros((len(chunks), len(present[0])), dtype=np.float32)
+    for i, chunk in enumerate(chunks):
+        if chunk.get("values") is not None:
+            matrix[i] = chunk["values"]
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def pack_context(
+    chunks: list[dict],
+    token_budget: int = CONTEXT_TOKEN_BUDGET,
+    dedupe_threshold: float = CONTEXT_DEDUPE_THRESHOLD,
+) -> list[dict]:
+    """
+    Selects chunks for the prompt. Chunks are considered best score first; a chunk is
+    skipped if its cosine similarity to an already selected chunk is >= dedupe_threshold
+    (chunks without values are only deduplicated by exact text) or if it doesn't fit in
+    the remaining token_budget. The selection is returned grouped
+    by video (best video first) and in chunk order within each video.
+    """
+    if not chunks:
+        return []
+
+    ranked = sorted(chunks, key=lambda chunk: chunk["score"] or 0.0, reverse=True)
+    matrix = _normalized_matrix(ranked) if dedupe_threshold < 1.0 else None
+    similarities = matrix @ matrix.T if matrix is not None else None
+
+    selected: list[int] = []
+    seen_texts = set()
+    used_tokens = 0
+    for i, chunk in enumerate(ranked):
+        text = chunk["chunk_text"]
+        if text in seen_texts:
+            continue
+        if similarities is not None and selected and similarities[i, selected].max() >= dedupe_threshold:
+            continue
+        tokens = count_tokens(text)
+        if used_tokens + tokens > token_budget:
+            # A shorter, lower-ranked chunk may still fit
+            continue
+        selected.append(i)
+        seen_texts.add(text)
+        used_tokens += tokens
+
+    video_rank: dict = {}
+    for i in selected:
+        video_rank.setdefault(ranked[i].get("video_id"), len(video_rank))
+    packed = [ranked[i] for i in selected]
+    packed.sort(key=lambda chunk: (video_rank[chunk.get("video_id")], chunk.get("chunk_id") if chunk.get("chunk_id") is not None else 0))
+    return packed
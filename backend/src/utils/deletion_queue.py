@@ -0,0 +1,186 @@
+"""
+Persistent queue of vector deletions for expired sessions.
+Session cleanup only enqueues work; a background worker claims due deletions and runs
+them with bounded parallelism. Failures are retried with exponential backoff rather
+than dropped, and pending deletions live in SQLite so namespaces orphaned by a crash or
+restart are still collected. Claims are leased, so several worker processes can share
+the queue without deleting the same namespace twice at once. A deletion that keeps
+failing is marked dead after DELETION_MAX_ATTEMPTS and kept (with its last error)
+instead of being retried forever.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+from src.utils.sqlite_store import SQLiteStore
+from settings import (
+    DELETION_QUEUE_PATH,
+    DELETION_MAX_PARALLEL,
+    DELETION_RETRY_BACKOFF_SECONDS,
+    DELETION_MAX_BACKOFF_SECONDS,
+    DELETION_MAX_ATTEMPTS,
+)
+
+# How long a claimed deletion is reserved before another worker may retry it
+_LEASE_SECONDS = 300
+
+
+class NamespaceDeletionQueue(SQLiteStore):
+    """Retrying, persisted deletion queue with a bounded worker pool."""
+
+    schema = (
+        """
+        CREATE TABLE IF NOT EXISTS pending_deletions (
+            namespace TEXT NOT NULL,
+            video_id TEXT NOT NULL DEFAULT '',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt REAL NOT NULL,
+            last_error TEXT,
+            created_at REAL NOT NULL,
+            dead INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (namespace, video_id)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_pending_deletions_next_attempt ON pending_deletions (next_attempt)",
+    )
+    added_columns = (("pending_deletions", "dead", "INTEGER NOT NULL DEFAULT 0"),)
+
+    def __init__(
+        self,
+        path: Path = DELETION_QUEUE_PATH,
+        max_parallel: int = DELETION_MAX_PARALLEL,
+        retry_backoff_seconds: float = DELETION_RETRY_BACKOFF_SECONDS,
+        max_backoff_seconds: float = DELETION_MAX_BACKOFF_SECONDS,
+        max_attempts: int = DELETION_MAX_ATTEMPTS,
+    ):
+        super().__init__(path)
+        self.max_parallel = max_parallel
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.max_attempts = max_attempts
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def enqueue_namespace(self, namespace: str):
+        """Queues deletion of every vector in a session namespace."""
+        self._enqueue(namespace, "")
+
+    def enqueue_video(self, namespace: str, video_id: str):
+        """Queues deletion of one video's chunks from a shared namespace."""
+        self._enqueue(namespace, video_id)
+
+    def _enqueue(self, namespace: str, video_id: str):
+        now = time.time()
+        # Re-enqueueing a dead deletion gives it a fresh set of attempts
+        self._connection().execute(
+            """
+            INSERT INTO pending_deletions (namespace, video_id, next_attempt, created_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT (namespace, video_id) DO UPDATE
+            SET dead = 0, attempts = 0, next_attempt = excluded.next_attempt WHERE dead = 1
+            """,
+            (namespace, video_id, now, now),
+        )
+        self._wakeup.set()
+
+    def _claim(self, limit: int) -> list[tuple[str, str, int]]:
+        now = time.time()
+        rows = self._connection().execute(
+            """
+            UPDATE pending_deletions SET next_attempt = ?
+            WHERE rowid IN (
+                SELECT rowid FROM pending_deletions WHERE dead = 0 AND next_attempt <= ? ORDER BY next_attempt LIMIT ?
+            )
+            RETURNING namespace, video_id, attempts
+            """,
+            (now + _LEASE_SECONDS, now, limit),
+        ).fetchall()
+        return rows
+
+    def _run_one(self, namespace: str, video_id: str, attempts: int):
+        from src.utils.vector_index_factory import get_vector_index
+        from src.utils.video_corpus import video_corpus
+        from src.utils.job_checkpoints import job_checkpoints
+
+        target = f"{namespace}/{video_id}" if video_id else namespace
+        try:
+            vector_index = get_vector_index()
+            if video_id:
+                # A new session may have picked the video up again while this waited
+                if video_corpus.refcount(video_id) == 0:
+                    # Forget the video first so nobody skips uploading it while its vectors go away
+                    job_checkpoints.clear_video(namespace, video_id)
+                    vector_index.delete_by_prefix(f"{video_id}#", namespace=namespace)
+            else:
+                vector_index.delete_namespace(namespace)
+            self._connection().execute(
+                "DELETE FROM pending_deletions WHERE namespace = ? AND video_id = ?", (namespace, video_id)
+            )
+            print(f"✅ Deleted vectors for {target}")
+        except Exception as e:
+            if attempts + 1 >= self.max_attempts:
+                print(f"❌ Deleting {target} failed {attempts + 1} times: {e}; giving up (marked dead)")
+                self._connection().execute(
+                    "UPDATE pending_deletions SET attempts = ?, dead = 1, last_error = ? WHERE namespace = ? AND video_id = ?",
+                    (attempts + 1, str(e), namespace, video_id),
+                )
+                return
+            delay = min(self.retry_backoff_seconds * (2 ** attempts), self.max_backoff_seconds)
+            print(f"⚠️ Deleting {target} failed (attempt {attempts + 1}): {e}; retrying in {delay:.0f}s")
+            self._connection().execute(
+                "UPDATE pending_deletions SET attempts = ?, next_attempt = ?, last_error = ? WHERE namespace = ? AND video_id = ?",
+                (attempts + 1, time.time() + delay, str(e), namespace, video_id),
+            )
+
+    def _next_due_in(self) -> float:
+        row = self._connection().execute("SELECT MIN(next_attempt) FROM pending_deletions WHERE dead = 0").fetchone()
+        if row[0] is None:
+            return 60.0
+        return max(0.0, min(60.0, row[0] - time.time()))
+
+    def _worker_loop(self):
+        with ThreadPoolExecutor(max_workers=self.max_parallel, thread_name_prefix="delete") as executor:
+            while not self._stop.is_set():
+                try:
+                    # Clear before claiming so an enqueue that races the claim still wakes us
+                    self._wakeup.clear()
+                    batch = self._claim(self.max_parallel * 4)
+                    if batch:
+                        print(f"🗑️ Deleting {len(batch)} namespaces/videos ({self.pending_count()} queued)")
+                        # Wait for the batch so the in-flight work stays bounded
+                        list(executor.map(lambda row: self._run_one(*row), batch))
+                        continue
+                    self._wakeup.wait(timeout=self._next_due_in())
+                except Exception as e:
+                    print(f"❌ Error in deletion queue: {e}")
+                    self._stop.wait(10)
+
+    def start(self):
+        """Starts the background worker (idempotent)."""
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._worker_loop, name="deletion-queue", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+
+    def pending_count(self) -> int:
+        """Number of deletions waiting or being retried (dead ones excluded)."""
+        return self._connection().execute("SELECT COUNT(*) FROM pending_deletions WHERE dead = 0").fetchone()[0]
+
+    def stats(self) -> dict:
+        pending, retrying, dead = self._connection().execute(
+            "SELECT COALESCE(SUM(dead = 0), 0), COALESCE(SUM(dead = 0 AND attempts > 0), 0), COALESCE(SUM(dead), 0) FROM pending_deletions"
+        ).fetchone()
+        return {"pending": pending, "retrying": retrying, "dead": dead, "max_parallel": self.max_parallel}
+
+
+# Global deletion queue instance
+deletion_queue = NamespaceDeletionQueue()
@@ -0,0 +1,124 @@
+"""
+Content-addressed embedding cache.
+Vectors are keyed by a hash of the model name plus the text and stored as float32
+blobs in SQLite, with least-recently-used eviction beyond a maximum entry count.
+"""
+
+import hashlib
+import threading
+import time
+from pathlib import Path
+from typing import Iterable
+import numpy as np
+from src.utils.sqlite_store import SQLiteStore
+from settings import EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_ENTRIES
+
+# Stay well below SQLite's bound-parameter limit
+_LOOKUP_BATCH_SIZE = 500
+
+
+def embedding_key(model_name: str, text: str) -> str:
+    """Returns the content address for a text embedded with model_name."""
+    return hashlib.sha256(f"{model_name}\x00{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache(SQLiteStore):
+    """Thread- and process-safe on-disk embedding cache."""
+
+    schema = (
+        """
+        CREATE TABLE IF NOT EXISTS embeddings (
+            key TEXT PRIMARY KEY,
+            dim INTEGER NOT NULL,
+            vector BLOB NOT NULL,
+            last_access REAL NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings (last_access)",
+        # Running entry count, kept by triggers so eviction and stats never scan the table
+        "CREATE TABLE IF NOT EXISTS embedding_totals (id INTEGER PRIMARY KEY CHECK (id = 1), entries INTEGER NOT NULL)",
+        """
+        CREATE TRIGGER IF NOT EXISTS embeddings_count_insert AFTER INSERT ON embeddings
+        BEGIN UPDATE embedding_totals SET entries = entries + 1 WHERE id = 1; END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS embeddings_count_delete AFTER DELETE ON embeddings
+        BEGIN UPDATE embedding_totals SET entries = entries - 1 WHERE id = 1; END
+        """,
+        # Seeds the count once for caches created before the totals table existed
+        "INSERT OR IGNORE INTO embedding_totals (id, entries) SELECT 1, COUNT(*) FROM embeddings",
+    )
+
+    def __init__(self, path: Path = EMBEDDING_CACHE_PATH, max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES):
+        super().__init__(path)
+        self.max_entries = max_entries
+        self._stats_lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def _count(self, key: str, amount: int = 1):
+        with self._stats_lock:
+            self._stats[key] += amount
+
+    def get_many(self, model_name: str, texts: list[str]) -> dict[str, list[float]]:
+        """Returns {text: vector} for every text that is cached."""
+        keys = {embedding_key(model_name, text): text for text in dict.fromkeys(texts)}
+        found: dict[str, list[float]] = {}
+        conn = self._connection()
+        key_list = list(keys)
+        for start in range(0, len(key_list), _LOOKUP_BATCH_SIZE):
+            batch = key_list[start:start + _LOOKUP_BATCH_SIZE]
+            placeholders = ",".join("?" * len(batch))
+            rows = conn.execute(f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch).fetchall()
+            for key, blob in rows:
+                found[keys[key]] = np.frombuffer(blob, dtype=np.float32).tolist()
+            if rows:
+                now = time.time()
+                conn.executemany("UPDATE embeddings SET last_access = ? WHERE key = ?", [(now, key) for key, _ in rows])
+
+        self._count("hits", len(found))
+        self._count("misses", len(keys) - len(found))
+        return found
+
+    def put_many(self, model_name: str, items: Iterable[tuple[str, list[float]]]):
+        """Stores (text, vector) pairs and evicts least recently used entries beyond max_entries."""
+        now = time.time()
+        rows = []
+        for text, vector in items:
+            array = np.asarray(vector, dtype=np.float32)
+            rows.append((embedding_key(model_name, text), array.shape[0], array.tobytes(), now))
+        if not rows:
+            return
+
+        conn = self._connection()
+        # An upsert rather than INSERT OR REPLACE: REPLACE's implicit delete skips the count triggers
+        conn.executemany(
+            "INSERT INTO embeddings (key, dim, vector, last_access) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET dim = excluded.dim, vector = excluded.vector, last_access = excluded.last_access",
+            rows,
+        )
+        self._evict(conn)
+
+    def _entries(self, conn) -> int:
+        return conn.execute("SELECT entries FROM embedding_totals WHERE id = 1").fetchone()[0]
+
+    def _evict(self, conn):
+        overflow = self._entries(conn) - self.max_entries
+        if overflow <= 0:
+            return
+        conn.execute(
+            "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_access ASC LIMIT ?)",
+            (overflow,),
+        )
+        self._count("evictions", overflow)
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters for this process plus current cache size."""
+        entries = self._entries(self._connection())
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["entries"] = entries
+        return stats
+
+
+# Global embedding cache instance
+embedding_cache = EmbeddingCache()
@@ -0,0 +1,149 @@
+"""
+Process-wide embedding engine.
+Loads the sentence-transformers model once and shares it between the uploader,
+the semantic chunker and query-side embedding.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from langchain_core.embeddings import Embeddings
+from src.utils.embedding_cache import EmbeddingCache, embedding_cache
+from src.utils.metrics import track_stage
+from settings import (
+    EMBEDDING_MODEL_NAME,
+    EMBEDDING_BATCH_SIZE,
+    EMBEDDING_DEVICE,
+    EMBEDDING_NUM_THREADS,
+    EMBEDDING_CACHE_ENABLED,
+    QUERY_EMBEDDING_CACHE_SIZE,
+)
+
+
+class EmbeddingEngine(Embeddings):
+    """Lazily loaded, thread-safe wrapper around a single HuggingFaceEmbeddings model."""
+
+    def __init__(
+        self,
+        model_name: str = EMBEDDING_MODEL_NAME,
+        batch_size: int = EMBEDDING_BATCH_SIZE,
+        device: str = EMBEDDING_DEVICE,
+        num_threads: int = EMBEDDING_NUM_THREADS,
+        cache: Optional[EmbeddingCache] = None,
+        query_cache_size: int = QUERY_EMBEDDING_CACHE_SIZE,
+    ):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.device = device
+        self.num_threads = num_threads
+        self.cache = cache
+        self._model = None
+        self._load_seconds: Optional[float] = None
+        self._lock = threading.Lock()
+        # LRU of recent query vectors; agents often reissue the same search
+        self.query_cache_size = query_cache_size
+        self._query_vectors: OrderedDict[str, list[float]] = OrderedDict()
+        self._query_lock = threading.Lock()
+        self._query_hits = 0
+        self._query_misses = 0
+
+    def load(self):
+        """Loads the model if it is not loaded yet and returns it."""
+        if self._model is not None:
+            return self._model
+
+        with self._lock:
+            if self._model is None:
+                from langchain_huggingface import HuggingFaceEmbeddings
+
+                if self.num_threads > 0:
+                    import torch
+
+                    torch.set_num_threads(self.num_threads)
+
+                print(f"Initializing Embedding Model ({self.model_name}) on {self.device}...")
+                start = time.perf_counter()
+                self._model = HuggingFaceEmbeddings(
+                    model_name=self.model_name,
+                    model_kwargs={"device": self.device},
+                    encode_kwargs={"batch_size": self.batch_size},
+                )
+                self._load_seconds = time.perf_counter() - start
+                print(f"✅ Embedding model loaded in {self._load_seconds:.2f}s")
+        return self._model
+
+    def is_loaded(self) -> bool:
+        """Returns True once the model weights are in memory."""
+        return self._model is not None
+
+    def status(self) -> dict:
+        """Returns the engine configuration and load state."""
+        return {
+            "model_name": self.model_name,
+            "loaded": self.is_loaded(),
+            "load_seconds": self._load_seconds,
+            "batch_size": self.batch_size,
+            "device": self.device,
+            "num_threads": self.num_threads,
+            "cache_enabled": self.cache is not None,
+            "query_cache_size": self.query_cache_size,
+            "query_cache_entries": len(self._query_vectors),
+            "query_cache_hits": self._query_hits,
+            "query_cache_misses": self._query_misses,
+        }
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        """Embeds texts, only running the model for texts missing from the embedding cache."""
+        if not texts:
+            return []
+        with track_stage("embed") as stage:
+            stage.add_items(len(texts))
+            return self._embed_documents(texts)
+
+    def _embed_documents(self, texts: list[str]) -> list[list[float]]:
+        if self.cache is None:
+            return self.load().embed_documents(texts)
+
+        try:
+            vectors = self.cache.get_many(self.model_name, texts)
+        except Exception as e:
+            print(f"⚠️ Embedding cache read failed: {e}")
+            vectors = {}
+
+        missing = [text for text in dict.fromkeys(texts) if text not in vectors]
+        if missing:
+            computed = self.load().embed_documents(missing)
+            vectors.update(zip(missing, computed))
+            try:
+                self.cache.put_many(self.model_name, zip(missing, computed))
+            except Exception as e:
+                print(f"⚠️ Embedding cache write failed: {e}")
+
+        return [vectors[text] for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        """Embeds a query, serving repeated queries from the in-memory LRU."""
+        if self.query_cache_size <= 0:
+            return self.load().embed_query(text)
+
+        key = " ".join(text.split())
+        with self._query_lock:
+            vector = self._query_vectors.get(key)
+            if vector is not None:
+                self._query_vectors.move_to_end(key)
+                self._query_hits += 1
+                return vector
+            self._query_misses += 1
+
+        vector = self.load().embed_query(key)
+        with self._query_lock:
+            self._query_vectors[key] = vector
+            self._query_vectors.move_to_end(key)
+            while len(self._query_vectors) > self.query_cache_size:
+                self._query_vectors.popitem(last=False)
+        return vector
+
+
+# Global embedding engine instance
+embedding_engine = EmbeddingEngine(cache=embedding_cache if EMBEDDING_CACHE_ENABLED else None)
@@ -3,18 +3,69 @@ Event emitter for processing status updates.
 Allows background threads to emit events that can be streamed via SSE.
 """
 
+import asyncio
 import threading
-from typing import Dict, List, Callable, Optional
+import uuid
+from collections import deque
+from typing import Deque, Dict, List, Callable, Optional
 from datetime import datetime
+from settings import EVENT_BUFFER_SIZE, EVENT_SUBSCRIBER_QUEUE_SIZE
+
+
+class EventSubscription:
+    """
+    Delivers a session's events to an asyncio.Queue owned by one event loop.
+    Emitting threads never touch the queue directly: events are handed to the loop with
+    call_soon_threadsafe. If the consumer falls behind and the queue fills up, further
+    events are dropped and overflowed is set; the consumer is expected to reset() and
+    catch up from the emitter's ring buffer.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, max_queue: int = EVENT_SUBSCRIBER_QUEUE_SIZE):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.overflowed = False
+        self._loop = loop
+
+    def __call__(self, event: dict):
+        # Called from any thread
+        try:
+            self._loop.call_soon_threadsafe(self._deliver, event)
+        except RuntimeError:
+            pass  # Loop already closed; the subscriber is gone
+
+    def _deliver(self, event: dict):
+        # Runs on the subscriber's loop
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    def reset(self):
+        """Drops the queued backlog and clears the overflow flag (call from the loop)."""
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.overflowed = False
 
 
 class ProcessingEventEmitter:
-    """Thread-safe event emitter for processing status updates."""
+    """
+    Thread-safe event emitter for processing status updates.
+    Each session keeps only its last buffer_size events; every event carries a per-session,
+    monotonically increasing "id" so reconnecting clients can resume after the last one seen.
+    Ids restart after a process restart, so the SSE id sent to clients is prefixed with
+    this emitter's boot id ("<boot_id>-<id>"); a Last-Event-ID from another boot (or one
+    ahead of this session's events) replays the whole buffer instead of skipping events.
+    """
 
-    def __init__(self):
+    def __init__(self, buffer_size: int = EVENT_BUFFER_SIZE):
         self._listeners: Dict[str, List[Callable]] = {}
-        self._events: Dict[str, List[dict]] = {}  # Store events per session
+        self._events: Dict[str, Deque[dict]] = {}  # Ring buffer of recent events per session
+        self._sequences: Dict[str, int] = {}  # session_id -> last assigned event id
+        self._buffer_size = buffer_size
         self._lock = threading.Lock()
+        self.boot_id = uuid.uuid4().hex[:12]
 
     def emit(
         self,
@@ -32,25 +83,27 @@ class ProcessingEventEmitter:
             message: Human-readable message
             data: Optional additional data
         """
-        event = {
-            "type": event_type,
-            "message": message,
-            "timestamp": datetime.now().isoformat(),
-            "data": data or {},
-        }
-
         with self._lock:
+            seq = self._sequences.get(session_id, 0) + 1
+            self._sequences[session_id] = seq
+            event = {
+                "id": seq,
+                "type": event_type,
+                "message": message,
+                "timestamp": datetime.now().isoformat(),
+                "data": data or {},
+            }
             if session_id not in self._events:
-                self._events[session_id] = []
+                self._events[session_id] = deque(maxlen=self._buffer_size)
             self._events[session_id].append(event)
+            listeners = list(self._listeners.get(session_id, ()))
 
-            # Notify listeners
-            if session_id in self._listeners:
-                for callback in self._listeners[session_id]:
-                    try:
-                        callback(event)
-                    except Exception as e:
-                        print(f"Error in event callback: {e}", flush=True)
+        # Notify listeners outside the lock so a slow callback can't stall other emitters
+        for callback in listeners:
+            try:
+                callback(event)
+            except Exception as e:
+                print(f"Error in event callback: {e}", flush=True)
 
     def subscribe(self, session_id: str, callback: Callable):
         """Subscribe to events for a session."""
@@ -59,6 +112,15 @@ class ProcessingEventEmitter:
                 self._listeners[session_id] = []
             self._listeners[session_id].append(callback)
 
+    def subscribe_async(self, session_id: str, max_queue: int = EVENT_SUBSCRIBER_QUEUE_SIZE) -> EventSubscription:
+        """
+        Subscribe the running event loop to a session's events.
+        Returns an EventSubscription whose queue receives new events; unsubscribe it when done.
+        """
+        subscription = EventSubscription(asyncio.get_running_loop(), max_queue)
+        self.subscribe(session_id, subscription)
+        return subscription
+
     def unsubscribe(self, session_id: str, callback: Callable):
         """Unsubscribe from events for a session."""
         with self._lock:
@@ -67,17 +129,55 @@ class ProcessingEventEmitter:
                     self._listeners[session_id].remove(callback)
                 except ValueError:
                     pass
+                if not self._listeners[session_id]:
+                    del self._listeners[session_id]
+
+    def get_events(self, session_id: str, after_seq: int = 0) -> List[dict]:
+        """Get the buffered events for a session with an id greater than after_seq."""
+        with self._lock:
+            events = self._events.get(session_id)
+            if not events:
+                return []
+            if after_seq <= 0:
+                return list(events)
+            # Events are in id order; walk back from the newest
+            missed = []
+            for event in reversed(events):
+                if event["id"] <= after_seq:
+                    break
+                missed.append(event)
+            missed.reverse()
+            return missed
 
-    def get_events(self, session_id: str) -> List[dict]:
-        """Get all events for a session."""
+    def last_event_id(self, session_id: str) -> int:
+        """Returns the id of the most recent event emitted for the session (0 if none)."""
         with self._lock:
-            return self._events.get(session_id, []).copy()
+            return self._sequences.get(session_id, 0)
+
+    def sse_id(self, event: dict) -> str:
+        """The SSE id sent with an event."""
+        return f"{self.boot_id}-{event['id']}"
+
+    def resume_point(self, session_id: str, last_event_id: Optional[str]) -> int:
+        """
+        Converts a client's Last-Event-ID into the event id to resume after. Returns 0
+        (replay everything buffered) when the header is missing or malformed, comes from
+        an earlier boot, or is ahead of the session's last event.
+        """
+        boot_id, _, seq = (last_event_id or "").rpartition("-")
+        if boot_id != self.boot_id:
+            return 0
+        try:
+            after = int(seq)
+        except ValueError:
+            return 0
+        return after if 0 < after <= self.last_event_id(session_id) else 0
 
     def clear_events(self, session_id: str):
-        """Clear events for a session."""
+        """Clear events for a session (called when the session expires or is deleted)."""
         with self._lock:
-            if session_id in self._events:
-                del self._events[session_id]
+            self._events.pop(session_id, None)
+            self._sequences.pop(session_id, None)
 
 
 # Global event emitter instance
@@ -0,0 +1,179 @@
+"""
+Checkpoints for processing jobs.
+Records each job's parameters and every video's progress (fetched → embedded → indexed)
+plus the chunk IDs already upserted, in SQLite. After a restart, unfinished jobs are
+resubmitted; on resume or re-submission indexed videos are skipped and partially
+upserted videos only send their missing chunks. Fetches and embeddings that have to
+be redone are served by the transcript and embedding caches.
+Unfinished jobs are leased to the worker process that runs them. The owner renews its
+leases while alive; other workers only claim (atomically) jobs whose lease expired, so
+each job is resumed by exactly one worker.
+"""
+
+import json
+import os
+import socket
+import time
+import uuid
+from pathlib import Path
+from typing import List, Optional
+from src.utils.sqlite_store import SQLiteStore
+from settings import JOB_CHECKPOINT_PATH, JOB_LEASE_SECONDS
+
+# Video stages in completion order
+STAGES = ("fetched", "embedded", "indexed")
+
+# Identifies this process as a lease owner
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class JobCheckpointStore(SQLiteStore):
+    """Thread- and process-safe job and per-video progress store."""
+
+    schema = (
+        """
+        CREATE TABLE IF NOT EXISTS jobs (
+            job_id TEXT PRIMARY KEY,
+            session_id TEXT NOT NULL,
+            namespace TEXT NOT NULL,
+            video_ids TEXT NOT NULL,
+            transcript_mode TEXT,
+            status TEXT NOT NULL,
+            updated_at REAL NOT NULL,
+            owner TEXT,
+            lease_until REAL NOT NULL DEFAULT 0
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status)",
+        """
+        CREATE TABLE IF NOT EXISTS video_progress (
+            namespace TEXT NOT NULL,
+            video_id TEXT NOT NULL,
+            stage TEXT NOT NULL,
+            chunk_count INTEGER,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (namespace, video_id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS upserted_chunks (
+            namespace TEXT NOT NULL,
+            video_id TEXT NOT NULL,
+            chunk_id TEXT NOT NULL,
+            PRIMARY KEY (namespace, video_id, chunk_id)
+        )
+        """,
+    )
+    added_columns = (
+        ("jobs", "owner", "TEXT"),
+        ("jobs", "lease_until", "REAL NOT NULL DEFAULT 0"),
+    )
+
+    def __init__(self, path: Path = JOB_CHECKPOINT_PATH, lease_seconds: float = JOB_LEASE_SECONDS):
+        super().__init__(path)
+        self.lease_seconds = lease_seconds
+
+    def save_job(self, job_id: str, session_id: str, namespace: str, video_ids: List[str], transcript_mode: Optional[str], status: str = "queued"):
+        """Records a new job, leased to this worker."""
+        now = time.time()
+        self._connection().execute(
+            "INSERT OR REPLACE INTO jobs (job_id, session_id, namespace, video_ids, transcript_mode, status, updated_at, owner, lease_until) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (job_id, session_id, namespace, json.dumps(video_ids), transcript_mode, status, now, WORKER_ID, now + self.lease_seconds),
+        )
+
+    def set_job_status(self, job_id: str, status: str):
+        self._connection().execute(
+            "UPDATE jobs SET status = ?, updated_at = ? WHERE job_id = ?",
+            (status, time.time(), job_id),
+        )
+
+    def claim_unfinished_jobs(self) -> List[dict]:
+        """
+        Takes over queued or running jobs whose owner stopped renewing its lease (oldest
+        first). The claim is a single UPDATE, so concurrent workers never get the same job.
+        """
+        now = time.time()
+        rows = self._connection().execute(
+            "UPDATE jobs SET owner = ?, lease_until = ? "
+            "WHERE status IN ('queued', 'running') AND lease_until < ? "
+            "RETURNING job_id, session_id, namespace, video_ids, transcript_mode, updated_at",
+            (WORKER_ID, now + self.lease_seconds, now),
+        ).fetchall()
+        rows.sort(key=lambda row: row[-1])
+        return [
+            {
+                "job_id": job_id,
+                "session_id": session_id,
+                "namespace": namespace,
+                "video_ids": json.loads(video_ids),
+                "transcript_mode": transcript_mode,
+            }
+            for job_id, session_id, namespace, video_ids, transcript_mode, _ in rows
+        ]
+
+    def renew_leases(self) -> int:
+        """Extends the leases of this worker's unfinished jobs. Returns how many were renewed."""
+        return self._connection().execute(
+            "UPDATE jobs SET lease_until = ? WHERE owner = ? AND status IN ('queued', 'running')",
+            (time.time() + self.lease_seconds, WORKER_ID),
+        ).rowcount
+
+    def release_job(self, job_id: str):
+        """Gives up this worker's lease on a job so any worker may claim it right away."""
+        self._connection().execute(
+            "UPDATE jobs SET lease_until = 0 WHERE job_id = ? AND owner = ?", (job_id, WORKER_ID)
+        )
+
+    def release_leases(self):
+        """Gives up all of this worker's leases (on shutdown)."""
+        self._connection().execute(
+            "UPDATE jobs SET lease_until = 0 WHERE owner = ? AND status IN ('queued', 'running')", (WORKER_ID,)
+        )
+
+    def get_stage(self, namespace: str, video_id: str) -> Optional[str]:
+        row = self._connection().execute(
+            "SELECT stage FROM video_progress WHERE namespace = ? AND video_id = ?",
+            (namespace, video_id),
+        ).fetchone()
+        return row[0] if row else None
+
+    def mark_stage(self, namespace: str, video_id: str, stage: str, chunk_count: Optional[int] = None):
+        conn = self._connection()
+        conn.execute(
+            "INSERT OR REPLACE INTO video_progress (namespace, video_id, stage, chunk_count, updated_at) VALUES (?, ?, ?, ?, ?)",
+            (namespace, video_id, stage, chunk_count, time.time()),
+        )
+        if stage == "indexed":
+            # The video is complete; per-chunk progress is no longer needed
+            conn.execute("DELETE FROM upserted_chunks WHERE namespace = ? AND video_id = ?", (namespace, video_id))
+
+    def record_chunks(self, namespace: str, video_id: str, chunk_ids: List[str]):
+        self._connection().executemany(
+            "INSERT OR IGNORE INTO upserted_chunks (namespace, video_id, chunk_id) VALUES (?, ?, ?)",
+            [(namespace, video_id, chunk_id) for chunk_id in chunk_ids],
+        )
+
+    def upserted_chunks(self, namespace: str, video_id: str) -> set:
+        rows = self._connection().execute(
+            "SELECT chunk_id FROM upserted_chunks WHERE namespace = ? AND video_id = ?",
+            (namespace, video_id),
+        ).fetchall()
+        return {row[0] for row in rows}
+
+    def clear_video(self, namespace: str, video_id: str):
+        """Forgets one video's progress (its vectors were deleted)."""
+        conn = self._connection()
+        conn.execute("DELETE FROM video_progress WHERE namespace = ? AND video_id = ?", (namespace, video_id))
+        conn.execute("DELETE FROM upserted_chunks WHERE namespace = ? AND video_id = ?", (namespace, video_id))
+
+    def clear_namespace(self, namespace: str):
+        """Forgets all progress for a namespace (its vectors were deleted)."""
+        conn = self._connection()
+        conn.execute("DELETE FROM video_progress WHERE namespace = ?", (namespace,))
+        conn.execute("DELETE FROM upserted_chunks WHERE namespace = ?", (namespace,))
+        conn.execute("UPDATE jobs SET status = 'abandoned', updated_at = ? WHERE namespace = ? AND status IN ('queued', 'running')", (time.time(), namespace))
+
+
+# Global job checkpoint store instance
+job_checkpoints = JobCheckpointStore()
@@ -0,0 +1,203 @@
+"""
+Process-wide scheduler for video processing jobs.
+A fixed pool of worker threads runs jobs from a bounded queue. Sessions are served
+round-robin and each session may only have a limited number of jobs running, so one
+large selection can't starve everyone else. When the queue is full, submit raises
+SchedulerFull and the API answers 429 instead of spawning more threads.
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Optional
+from settings import JOB_MAX_WORKERS, JOB_MAX_QUEUED, JOB_MAX_PER_SESSION, JOB_HISTORY_SIZE
+
+
+class SchedulerFull(Exception):
+    """Raised when the job queue is at capacity."""
+
+    def __init__(self, queued: int, max_queued: int):
+        super().__init__(f"Processing queue is full ({queued}/{max_queued} jobs waiting). Please retry shortly.")
+        self.queued = queued
+        self.max_queued = max_queued
+
+
+@dataclass
+class Job:
+    job_id: str
+    session_id: str
+    fn: Callable[[threading.Event], Any]  # Receives the cancel event; should return early once it is set
+    video_count: int = 0
+    status: str = "queued"  # queued, running, completed, failed, cancelled
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+    cancel_event: threading.Event = field(default_factory=threading.Event)
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "session_id": self.session_id,
+            "status": self.status,
+            "video_count": self.video_count,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+            "cancel_requested": self.cancel_event.is_set(),
+        }
+
+
+class JobScheduler:
+    """Bounded worker pool with a bounded, per-session round-robin queue."""
+
+    def __init__(
+        self,
+        max_workers: int = JOB_MAX_WORKERS,
+        max_queued: int = JOB_MAX_QUEUED,
+        max_per_session: int = JOB_MAX_PER_SESSION,
+        history_size: int = JOB_HISTORY_SIZE,
+    ):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.max_per_session = max_per_session
+        self.history_size = history_size
+        self._queues: "OrderedDict[str, Deque[Job]]" = OrderedDict()  # session_id -> queued jobs, in round-robin order
+        self._running: Dict[str, int] = {}  # session_id -> running job count
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()  # job_id -> job (queued, running and recent finished)
+        self._queued_count = 0
+        self._cond = threading.Condition()
+        self._workers: list[threading.Thread] = []
+        self._stopping = False
+
+    def _ensure_workers(self):
+        if self._workers:
+            return
+        for i in range(self.max_workers):
+            worker = threading.Thread(target=self._worker_loop, name=f"job-worker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+        print(f"🧵 Job scheduler started with {self.max_workers} workers (queue limit {self.max_queued})")
+
+    def submit(self, session_id: str, fn: Callable[[threading.Event], Any], video_count: int = 0, job_id: Optional[str] = None) -> Job:
+        """Queues a job (job_id keeps a resumed job's ID); raises SchedulerFull if the queue is at capacity."""
+        with self._cond:
+            if self._queued_count >= self.max_queued:
+                raise SchedulerFull(self._queued_count, self.max_queued)
+            self._ensure_workers()
+            job = Job(job_id=job_id or str(uuid.uuid4()), session_id=session_id, fn=fn, video_count=video_count)
+            self._jobs[job.job_id] = job
+            self._queues.setdefault(session_id, deque()).append(job)
+            self._queued_count += 1
+            self._trim_history()
+            self._cond.notify()
+            return job
+
+    def _next_job(self) -> Optional[Job]:
+        # Round-robin over sessions that are below their concurrency limit
+        for session_id in list(self._queues):
+            if self._running.get(session_id, 0) >= self.max_per_session:
+                continue
+            jobs = self._queues.pop(session_id)
+            job = jobs.popleft()
+            if jobs:
+                self._queues[session_id] = jobs  # back of the line
+            self._queued_count -= 1
+            self._running[session_id] = self._running.get(session_id, 0) + 1
+            return job
+        return None
+
+    def _worker_loop(self):
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None and not self._stopping:
+                    self._cond.wait()
+                    job = self._next_job()
+                if job is None:
+                    return
+                job.status = "running"
+                job.started_at = time.time()
+
+            try:
+                job.fn(job.cancel_event)
+                status, error = ("cancelled" if job.cancel_event.is_set() else "completed"), None
+            except Exception as e:
+                print(f"❌ Job {job.job_id} failed: {e}", flush=True)
+                status, error = "failed", str(e)
+
+            with self._cond:
+                job.status = status
+                job.error = error
+                job.finished_at = time.time()
+                remaining = self._running.get(job.session_id, 1) - 1
+                if remaining:
+                    self._running[job.session_id] = remaining
+                else:
+                    self._running.pop(job.session_id, None)
+                # A slot for this session freed up
+                self._cond.notify_all()
+
+    def _trim_history(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished_at is not None]
+        for job_id in finished[:max(0, len(self._jobs) - self.history_size)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def queue_position(self, job_id: str) -> Optional[int]:
+        """1-based position in the round-robin order (ignoring per-session limits); None if not queued."""
+        with self._cond:
+            queues = [list(jobs) for jobs in self._queues.values()]
+            position = 0
+            depth = 0
+            while any(depth < len(jobs) for jobs in queues):
+                for jobs in queues:
+                    if depth < len(jobs):
+                        position += 1
+                        if jobs[depth].job_id == job_id:
+                            return position
+                depth += 1
+            return None
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancels a queued job or asks a running one to stop. Returns the job, or None if unknown."""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job.finished_at is not None:
+                return job
+            job.cancel_event.set()
+            jobs = self._queues.get(job.session_id)
+            if job.status == "queued" and jobs is not None:
+                jobs.remove(job)
+                if not jobs:
+                    del self._queues[job.session_id]
+                self._queued_count -= 1
+                job.status = "cancelled"
+                job.finished_at = time.time()
+            return job
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "workers": self.max_workers,
+                "queued": self._queued_count,
+                "max_queued": self.max_queued,
+                "running": sum(self._running.values()),
+                "max_per_session": self.max_per_session,
+            }
+
+    def shutdown(self):
+        """Lets running jobs finish and stops the workers once the queue is drained of runnable work."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+
+
+# Global job scheduler instance
+job_scheduler = JobScheduler()
@@ -0,0 +1,228 @@
+"""
+Per-namespace BM25 keyword index.
+Complements the embedding search: product names, model numbers and proper nouns that
+MiniLM embeds poorly still match exactly here. Postings (term frequencies per chunk)
+are kept in SQLite keyed by namespace and term, alongside per-namespace document counts
+and total lengths, so a query only reads its own namespace's postings and BM25's IDF and
+length normalization come from that namespace alone. Chunks are indexed as they are
+upserted and dropped with their namespace or video prefix. Each chunk's vector is stored
+alongside it, so keyword-only hits can be deduplicated against vector hits without
+re-embedding them at query time. The index is persisted next to the other stores, so it
+survives restarts and every worker process on the host searches the same postings.
+"""
+
+import json
+import math
+import re
+import numpy as np
+from collections import Counter
+from pathlib import Path
+from typing import List, Optional
+from src.utils.sqlite_store import SQLiteStore
+from src.utils.local_vector_index import matches_filter
+from settings import KEYWORD_INDEX_PATH
+
+
+_TOKEN_RE = re.compile(r"\w+")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by do does for from has have how i in is it its of on or "
+    "so that the this to was what when where which who why will with you your".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens without common stopwords."""
+    return [token for token in _TOKEN_RE.findall(text.lower()) if token not in _STOPWORDS]
+
+
+class KeywordIndex(SQLiteStore):
+    """Process- and thread-safe BM25 index keyed by namespace."""
+
+    schema = (
+        # Superseded single-table FTS5 layout, whose bm25() mixed every namespace's statistics
+        "DROP TABLE IF EXISTS keyword_fts",
+        "DROP TABLE IF EXISTS keyword_chunks",
+        """
+        CREATE TABLE IF NOT EXISTS keyword_documents (
+            rowid INTEGER PRIMARY KEY,
+            namespace TEXT NOT NULL,
+            doc_id TEXT NOT NULL,
+            chunk_text TEXT NOT NULL,
+            metadata TEXT NOT NULL,
+            vector BLOB,
+            length INTEGER NOT NULL,
+            UNIQUE (namespace, doc_id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS keyword_postings (
+            namespace TEXT NOT NULL,
+            term TEXT NOT NULL,
+            document INTEGER NOT NULL,
+            tf INTEGER NOT NULL,
+            PRIMARY KEY (namespace, term, document)
+        ) WITHOUT ROWID
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_keyword_postings_document ON keyword_postings (document)",
+        """
+        CREATE TABLE IF NOT EXISTS keyword_namespaces (
+            namespace TEXT PRIMARY KEY,
+            documents INTEGER NOT NULL,
+            total_length INTEGER NOT NULL
+        )
+        """,
+    )
+
+    def __init__(self, path: Path = KEYWORD_INDEX_PATH, k1: float = 1.5, b: float = 0.75):
+        super().__init__(path)
+        self.k1 = k1
+        self.b = b
+
+    def _write(self, statements):
+        conn = self._connection()
+        # One writer at a time keeps documents, postings and namespace totals in step
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            statements(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _adjust_totals(conn, namespace: str, documents: int, length: int):
+        conn.execute(
+            """
+            INSERT INTO keyword_namespaces (namespace, documents, total_length) VALUES (?, ?, ?)
+            ON CONFLICT (namespace) DO UPDATE
+            SET documents = documents + excluded.documents, total_length = total_length + excluded.total_length
+            """,
+            (namespace, documents, length),
+        )
+
+    def _remove_where(self, conn, where: str, params: tuple) -> int:
+        """Removes the namespace's documents matching where, with their postings and totals."""
+        removed = 0
+        for rowid, namespace, length in conn.execute(
+            f"SELECT rowid, namespace, length FROM keyword_documents WHERE {where}", params
+        ).fetchall():
+            conn.execute("DELETE FROM keyword_postings WHERE document = ?", (rowid,))
+            conn.execute("DELETE FROM keyword_documents WHERE rowid = ?", (rowid,))
+            self._adjust_totals(conn, namespace, -1, -length)
+            removed += 1
+        return removed
+
+    def add(self, namespace: str, ids: List[str], metadata: List[dict], vectors: Optional[list] = None):
+        """
+        Indexes chunks (metadata must contain chunk_text); re-adding an ID replaces it.
+        vectors (same order, entries may be None) are the chunks' stored embeddings.
+        """
+        def statements(conn):
+            for i, (doc_id, meta) in enumerate(zip(ids, metadata)):
+                text = meta.get("chunk_text", "")
+                stored = json.dumps({key: value for key, value in meta.items() if key != "chunk_text"})
+                vector = vectors[i] if vectors is not None else None
+                blob = np.asarray(vector, dtype=np.float32).tobytes() if vector is not None else None
+                if blob is None:
+                    # Keep the stored vector when the caller doesn't have one (e.g. a skipped chunk)
+                    row = conn.execute(
+                        "SELECT vector FROM keyword_documents WHERE namespace = ? AND doc_id = ?", (namespace, doc_id)
+                    ).fetchone()
+                    blob = row[0] if row is not None else None
+                self._remove_where(conn, "namespace = ? AND doc_id = ?", (namespace, doc_id))
+                tokens = tokenize(text)
+                rowid = conn.execute(
+                    "INSERT INTO keyword_documents (namespace, doc_id, chunk_text, metadata, vector, length) VALUES (?, ?, ?, ?, ?, ?)",
+                    (namespace, doc_id, text, stored, blob, len(tokens)),
+                ).lastrowid
+                conn.executemany(
+                    "INSERT INTO keyword_postings (namespace, term, document, tf) VALUES (?, ?, ?, ?)",
+                    [(namespace, term, rowid, tf) for term, tf in Counter(tokens).items()],
+                )
+                self._adjust_totals(conn, namespace, 1, len(tokens))
+
+        self._write(statements)
+
+    def search(self, namespace: str, query: str, top_k: int = 5, filter: Optional[dict] = None, include_values: bool = False) -> List[dict]:
+        """
+        Returns the top_k BM25 matches as dicts with id, score and metadata (plus the
+        stored vector as values, or None, when include_values is set).
+        """
+        terms = sorted(set(tokenize(query)))
+        if not terms:
+            return []
+        conn = self._connection()
+        totals = conn.execute(
+            "SELECT documents, total_length FROM keyword_namespaces WHERE namespace = ?", (namespace,)
+        ).fetchone()
+        if totals is None or totals[0] <= 0:
+            return []
+        doc_count, total_length = totals
+        avg_length = total_length / doc_count or 1.0
+
+        placeholders = ", ".join("?" * len(terms))
+        frequencies = conn.execute(
+            f"SELECT term, COUNT(*) FROM keyword_postings WHERE namespace = ? AND term IN ({placeholders}) GROUP BY term",
+            (namespace, *terms),
+        ).fetchall()
+        if not frequencies:
+            return []
+        # IDF from this namespace's document frequencies only
+        idf = [(term, math.log(1 + (doc_count - df + 0.5) / (df + 0.5))) for term, df in frequencies]
+        weights = ", ".join("(?, ?)" for _ in idf)
+        rows = conn.execute(
+            f"""
+            WITH weights (term, idf) AS (VALUES {weights})
+            SELECT d.doc_id, d.metadata, d.chunk_text, d.vector,
+                   SUM(w.idf * p.tf * (? + 1) / (p.tf + ? * (1 - ? + ? * d.length / ?))) AS score
+            FROM weights AS w
+            JOIN keyword_postings AS p ON p.namespace = ? AND p.term = w.term
+            JOIN keyword_documents AS d ON d.rowid = p.document
+            GROUP BY p.document
+            ORDER BY score DESC
+            """,
+            (*[value for pair in idf for value in pair], self.k1, self.k1, self.b, self.b, avg_length, namespace),
+        )
+        results = []
+        for doc_id, stored, text, blob, score in rows:
+            metadata = {**json.loads(stored), "chunk_text": text}
+            if filter and not matches_filter(metadata, filter):
+                continue
+            hit = {"id": doc_id, "score": score, "metadata": metadata}
+            if include_values:
+                hit["values"] = np.frombuffer(blob, dtype=np.float32).tolist() if blob is not None else None
+            results.append(hit)
+            if len(results) >= top_k:
+                break
+        return results
+
+    def delete_by_prefix(self, namespace: str, prefix: str) -> int:
+        """Drops chunks whose ID starts with prefix. Returns the number removed."""
+        removed = 0
+
+        def statements(conn):
+            nonlocal removed
+            removed = self._remove_where(conn, "namespace = ? AND substr(doc_id, 1, ?) = ?", (namespace, len(prefix), prefix))
+
+        self._write(statements)
+        return removed
+
+    def delete_namespace(self, namespace: str):
+        """Drops a namespace's postings."""
+        def statements(conn):
+            conn.execute("DELETE FROM keyword_postings WHERE namespace = ?", (namespace,))
+            conn.execute("DELETE FROM keyword_documents WHERE namespace = ?", (namespace,))
+            conn.execute("DELETE FROM keyword_namespaces WHERE namespace = ?", (namespace,))
+
+        self._write(statements)
+
+    def stats(self) -> dict:
+        """Returns per-namespace document counts."""
+        rows = self._connection().execute(
+            "SELECT namespace, documents FROM keyword_namespaces WHERE documents > 0"
+        ).fetchall()
+        return {namespace: {"documents": count} for namespace, count in rows}
+
+
+# Global keyword index instance
+keyword_index = KeywordIndex()
@@ -0,0 +1,517 @@
+"""
+In-process vector index backend.
+Keeps one unit-normalized float32 matrix per namespace and answers queries with a
+vectorized cosine top-k. Each namespace is persisted as an append-only raw vector file
+(opened read-only as a memory map) plus an append-only JSON-lines log of IDs and metadata,
+so an upsert writes only its own rows and the log records it adds; the files are
+compacted once deleted rows outweigh live ones. Metadata filters run on per-key value
+columns built once after each write rather than on every query.
+Intended for development and single-node deployments with one worker process: each
+process caches namespaces in memory and writes are not coordinated between processes.
+"""
+
+import json
+import os
+import re
+import shutil
+import threading
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+import numpy as np
+from settings import LOCAL_VECTOR_INDEX_DIR, UPSERT_BATCH_SIZE
+from src.utils.base import VectorIndexStrategy
+from src.utils.event_emitter import event_emitter
+from src.utils.semantic_chunker import EmbeddedChunks
+from src.utils.answer_cache import answer_cache
+from src.utils.metrics import track_stage
+
+
+_FILTER_OPS = {
+    "$eq": lambda value, operand: value == operand,
+    "$ne": lambda value, operand: value != operand,
+    "$in": lambda value, operand: value in operand,
+    "$nin": lambda value, operand: value not in operand,
+    "$gt": lambda value, operand: value is not None and value > operand,
+    "$gte": lambda value, operand: value is not None and value >= operand,
+    "$lt": lambda value, operand: value is not None and value < operand,
+    "$lte": lambda value, operand: value is not None and value <= operand,
+}
+
+
+def matches_filter(metadata: dict, filter: Optional[dict]) -> bool:
+    """Evaluates a Pinecone-style metadata filter ($eq, $ne, $in, $nin, $gt(e), $lt(e), $and, $or)."""
+    if not filter:
+        return True
+    for key, condition in filter.items():
+        if key == "$and":
+            if not all(matches_filter(metadata, sub) for sub in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_filter(metadata, sub) for sub in condition):
+                return False
+        else:
+            value = metadata.get(key)
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            for op, operand in condition.items():
+                if op not in _FILTER_OPS:
+                    raise ValueError(f"Unsupported metadata filter operator: {op}")
+                if not _FILTER_OPS[op](value, operand):
+                    return False
+    return True
+
+
+def _normalize_rows(vectors) -> np.ndarray:
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix[None, :]
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+_COLUMN_OPS = {
+    "$eq": lambda column, operand: column == operand,
+    "$ne": lambda column, operand: column != operand,
+    "$in": lambda column, operand: np.isin(column, np.array(list(operand), dtype=object)),
+    "$nin": lambda column, operand: ~np.isin(column, np.array(list(operand), dtype=object)),
+}
+
+
+class _Namespace:
+    """
+    Vectors, IDs and metadata of one namespace; rows line up across the three. Deleted
+    rows (and rows left without a log record by a crash) have None as ID and metadata.
+    """
+
+    __slots__ = ("dim", "generation", "ids", "positions", "metadata", "vectors", "dead", "log_records", "columns")
+
+    def __init__(self, dim: int = 0, generation: int = 0):
+        self.dim = dim
+        self.generation = generation
+        self.ids: List[Optional[str]] = []
+        self.positions: Dict[str, int] = {}
+        self.metadata: List[Optional[dict]] = []
+        self.vectors: Optional[np.ndarray] = None
+        self.dead: set = set()
+        self.log_records = 0
+        self.columns: Dict[str, np.ndarray] = {}  # metadata key -> value per row (built on demand)
+
+    def column(self, key: str) -> np.ndarray:
+        column = self.columns.get(key)
+        if column is None:
+            column = np.empty(len(self.ids), dtype=object)
+            column[:] = [meta.get(key) if meta is not None else None for meta in self.metadata]
+            self.columns[key] = column
+        return column
+
+    def filter_mask(self, filter: dict) -> np.ndarray:
+        """Vectorized matches_filter over every row."""
+        mask = np.ones(len(self.ids), dtype=bool)
+        for key, condition in filter.items():
+            if key == "$and":
+                for sub in condition:
+                    mask &= self.filter_mask(sub)
+            elif key == "$or":
+                mask &= np.logical_or.reduce([self.filter_mask(sub) for sub in condition]) if condition else False
+            else:
+                if not isinstance(condition, dict):
+                    condition = {"$eq": condition}
+                column = self.column(key)
+                for op, operand in condition.items():
+                    if op not in _FILTER_OPS:
+                        raise ValueError(f"Unsupported metadata filter operator: {op}")
+                    if op in _COLUMN_OPS:
+                        mask &= np.asarray(_COLUMN_OPS[op](column, operand), dtype=bool)
+                    else:
+                        compare = _FILTER_OPS[op]
+                        mask &= np.fromiter((compare(value, operand) for value in column), dtype=bool, count=len(column))
+        return mask
+
+    @property
+    def live_count(self) -> int:
+        return len(self.positions)
+
+
+class LocalVectorStore:
+    """Thread-safe, file-backed store of per-namespace vector matrices."""
+
+    META_FILE = "meta.jsonl"
+    LEGACY_META_FILE = "meta.json"
+
+    def __init__(self, directory: Path = LOCAL_VECTOR_INDEX_DIR, compact_min_rows: int = 1024):
+        self.directory = Path(directory)
+        self.compact_min_rows = compact_min_rows
+        self._namespaces: Dict[str, _Namespace] = {}
+        self._lock = threading.RLock()
+
+    def _path(self, namespace: str) -> Path:
+        return self.directory / re.sub(r"[^A-Za-z0-9_.-]", "_", namespace)
+
+    @staticmethod
+    def _vectors_file(path: Path, generation: int) -> Path:
+        return path / f"vectors.{generation}.f32"
+
+    def _map(self, path: Path, data: _Namespace):
+        rows = len(data.ids)
+        data.vectors = (
+            np.memmap(self._vectors_file(path, data.generation), dtype=np.float32, mode="r", shape=(rows, data.dim))
+            if rows else None
+        )
+
+    def _load(self, namespace: str) -> _Namespace:
+        data = self._namespaces.get(namespace)
+        if data is not None:
+            return data
+
+        path = self._path(namespace)
+        if (path / self.META_FILE).exists():
+            data = self._read_log(namespace, path)
+        elif (path / self.LEGACY_META_FILE).exists():
+            data = self._read_legacy(namespace, path)
+        else:
+            data = _Namespace()
+        self._namespaces[namespace] = data
+        return data
+
+    def _read_log(self, namespace: str, path: Path) -> _Namespace:
+        with open(path / self.META_FILE, "r") as f:
+            lines = f.read().split("\n")
+        header = json.loads(lines[0])
+        data = _Namespace(header["dim"], header["generation"])
+        vectors_file = self._vectors_file(path, data.generation)
+        row_bytes = data.dim * 4
+        size = vectors_file.stat().st_size if vectors_file.exists() else 0
+        rows = size // row_bytes
+        if size != rows * row_bytes:
+            # Drop a half-written trailing row
+            os.truncate(vectors_file, rows * row_bytes)
+        data.ids = [None] * rows
+        data.metadata = [None] * rows
+        for line in lines[1:]:
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                print(f"⚠️ Skipping a truncated record in the local vector index for '{namespace}'")
+                continue
+            data.log_records += 1
+            vector_id = record["id"]
+            previous = data.positions.pop(vector_id, None)
+            if previous is not None:
+                data.ids[previous] = data.metadata[previous] = None
+            row = record.get("row")
+            if row is None or row >= rows:
+                continue  # deleted, or its vector never made it to disk
+            data.ids[row] = vector_id
+            data.metadata[row] = record["metadata"]
+            data.positions[vector_id] = row
+        data.dead = {row for row, vector_id in enumerate(data.ids) if vector_id is None}
+        self._map(path, data)
+        return data
+
+    def _read_legacy(self, namespace: str, path: Path) -> _Namespace:
+        """Converts a namespace saved as one vector file plus a JSON sidecar."""
+        with open(path / self.LEGACY_META_FILE, "r") as f:
+            meta = json.load(f)
+        count, dim = len(meta["ids"]), meta["dim"]
+        legacy_vectors = path / "vectors.f32"
+        if not count or legacy_vectors.stat().st_size != count * dim * 4:
+            if count:
+                print(f"⚠️ Local vector index for '{namespace}' is incomplete; starting it empty")
+            return _Namespace()
+        vectors = np.memmap(legacy_vectors, dtype=np.float32, mode="r", shape=(count, dim))
+        data = self._rewrite(path, dim, 0, meta["ids"], meta["metadata"], vectors)
+        del vectors
+        legacy_vectors.unlink(missing_ok=True)
+        (path / self.LEGACY_META_FILE).unlink(missing_ok=True)
+        return data
+
+    def _rewrite(self, path: Path, dim: int, generation: int, ids: List[str], metadata: List[dict], vectors) -> _Namespace:
+        """Writes a compacted copy as the next generation; replacing the log is the commit point."""
+        data = _Namespace(dim, generation + 1)
+        path.mkdir(parents=True, exist_ok=True)
+        vectors_file = self._vectors_file(path, data.generation)
+        with open(vectors_file, "wb") as f:
+            for start in range(0, len(ids), 4096):
+                f.write(np.ascontiguousarray(vectors[start:start + 4096], dtype=np.float32).tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        meta_tmp = path / f"{self.META_FILE}.{uuid.uuid4().hex}.tmp"
+        with open(meta_tmp, "w") as f:
+            f.write(json.dumps({"dim": dim, "generation": data.generation}) + "\n")
+            for row, (vector_id, meta) in enumerate(zip(ids, metadata)):
+                f.write(json.dumps({"id": vector_id, "row": row, "metadata": meta}) + "\n")
+        os.replace(meta_tmp, path / self.META_FILE)
+        for stale in path.glob("vectors.*.f32"):
+            if stale != vectors_file:
+                stale.unlink(missing_ok=True)
+
+        data.ids = list(ids)
+        data.metadata = list(metadata)
+        data.positions = {vector_id: row for row, vector_id in enumerate(ids)}
+        data.log_records = len(ids)
+        self._map(path, data)
+        return data
+
+    def _compact_if_needed(self, namespace: str, data: _Namespace) -> _Namespace:
+        live = data.live_count
+        path = self._path(namespace)
+        if live == 0:
+            shutil.rmtree(path, ignore_errors=True)
+            data = self._namespaces[namespace] = _Namespace()
+            return data
+        waste = max(len(data.dead), data.log_records - live)
+        if waste < max(self.compact_min_rows, live):
+            return data
+        rows = sorted(data.positions.values())
+        data = self._rewrite(
+            path, data.dim, data.generation,
+            [data.ids[row] for row in rows],
+            [data.metadata[row] for row in rows],
+            np.asarray(data.vectors[rows]),
+        )
+        self._namespaces[namespace] = data
+        return data
+
+    def _append_log(self, path: Path, data: _Namespace, records: List[dict]):
+        meta_file = path / self.META_FILE
+        with open(meta_file, "a") as f:
+            if f.tell() == 0:
+                f.write(json.dumps({"dim": data.dim, "generation": data.generation}) + "\n")
+            f.write("".join(json.dumps(record) + "\n" for record in records))
+        data.log_records += len(records)
+
+    def upsert(self, namespace: str, ids: List[str], vectors, metadata: List[dict]) -> int:
+        """Inserts or overwrites vectors by ID. Returns the number of upserted vectors."""
+        if not ids:
+            return 0
+        new_vectors = _normalize_rows(vectors)
+        with self._lock:
+            data = self._load(namespace)
+            if data.ids and data.dim != new_vectors.shape[1]:
+                raise ValueError(
+                    f"Vector dimension {new_vectors.shape[1]} does not match namespace '{namespace}' ({data.dim})"
+                )
+            data.dim = new_vectors.shape[1]
+            path = self._path(namespace)
+            path.mkdir(parents=True, exist_ok=True)
+
+            # The last occurrence of a repeated ID wins
+            latest = {vector_id: i for i, vector_id in enumerate(ids)}
+            overwrites = [(data.positions[vector_id], i) for vector_id, i in latest.items() if vector_id in data.positions]
+            appended = [i for vector_id, i in latest.items() if vector_id not in data.positions]
+
+            # Vectors first, so every log record points at rows already on disk
+            vectors_file = self._vectors_file(path, data.generation)
+            row_bytes = data.dim * 4
+            with open(vectors_file, "ab") as f:
+                size = f.tell()
+                if size % row_bytes:
+                    f.truncate(size - size % row_bytes)
+                first_new_row = size // row_bytes
+                f.write(np.ascontiguousarray(new_vectors[appended]).tobytes())
+            # Rows a crashed writer appended without logging them stay unused
+            while len(data.ids) < first_new_row:
+                data.dead.add(len(data.ids))
+                data.ids.append(None)
+                data.metadata.append(None)
+            if overwrites:
+                with open(vectors_file, "r+b") as f:
+                    for row, i in overwrites:
+                        f.seek(row * data.dim * 4)
+                        f.write(new_vectors[i].tobytes())
+
+            records = []
+            for row, i in overwrites:
+                data.metadata[row] = metadata[i]
+                records.append({"id": ids[i], "row": row, "metadata": metadata[i]})
+            for offset, i in enumerate(appended):
+                row = first_new_row + offset
+                data.ids.append(ids[i])
+                data.metadata.append(metadata[i])
+                data.positions[ids[i]] = row
+                records.append({"id": ids[i], "row": row, "metadata": metadata[i]})
+            self._append_log(path, data, records)
+
+            data.columns = {}
+            self._map(path, data)
+            self._compact_if_needed(namespace, data)
+        return len(ids)
+
+    def query(self, namespace: str, vector, top_k: int = 5, filter: Optional[dict] = None, include_values: bool = False) -> List[dict]:
+        """Returns the top_k most cosine-similar vectors as dicts with id, score and metadata (and values)."""
+        with self._lock:
+            data = self._load(namespace)
+            vectors, ids, metadata = data.vectors, data.ids, data.metadata
+            mask = data.filter_mask(filter) if filter else None
+            if data.dead:
+                if mask is None:
+                    mask = np.ones(len(ids), dtype=bool)
+                mask[list(data.dead)] = False
+        if vectors is None or top_k <= 0:
+            return []
+
+        scores = vectors @ _normalize_rows(vector)[0]
+        if mask is not None:
+            scores = np.where(mask, scores, -np.inf)
+            candidates = int(mask.sum())
+        else:
+            candidates = len(ids)
+        k = min(top_k, candidates)
+        if k == 0:
+            return []
+
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            {
+                "id": ids[row],
+                "score": float(scores[row]),
+                "metadata": metadata[row],
+                **({"values": vectors[row].tolist()} if include_values else {}),
+            }
+            for row in top
+        ]
+
+    def existing_ids(self, namespace: str, ids: List[str]) -> List[str]:
+        """Returns the subset of ids stored in the namespace."""
+        with self._lock:
+            data = self._load(namespace)
+            return [vector_id for vector_id in ids if vector_id in data.positions]
+
+    def delete_by_prefix(self, namespace: str, prefix: str) -> int:
+        """Deletes vectors whose ID starts with prefix. Returns the number deleted."""
+        with self._lock:
+            data = self._load(namespace)
+            doomed = [vector_id for vector_id in data.positions if vector_id.startswith(prefix)]
+            if not doomed:
+                return 0
+            path = self._path(namespace)
+            self._append_log(path, data, [{"id": vector_id, "row": None} for vector_id in doomed])
+            for vector_id in doomed:
+                row = data.positions.pop(vector_id)
+                data.ids[row] = data.metadata[row] = None
+                data.dead.add(row)
+            data.columns = {}
+            self._compact_if_needed(namespace, data)
+        return len(doomed)
+
+    def delete_namespace(self, namespace: str):
+        """Drops a namespace and its files."""
+        with self._lock:
+            self._namespaces.pop(namespace, None)
+            shutil.rmtree(self._path(namespace), ignore_errors=True)
+
+    def stats(self) -> dict:
+        """Returns the loaded namespaces and their vector counts."""
+        with self._lock:
+            return {
+                "directory": str(self.directory),
+                "namespaces": {namespace: data.live_count for namespace, data in self._namespaces.items() if data.live_count},
+            }
+
+
+# Global local vector store instance
+local_vector_store = LocalVectorStore()
+
+
+class LocalVectorIndex(VectorIndexStrategy):
+    def __init__(self, embeddings=None, session_id: str = "", store: LocalVectorStore = None):
+        self.__embeddings = embeddings
+        self.__session_id = session_id
+        self.__store = store or local_vector_store
+
+    def create_or_load_vector_index(self, markdown_text: str, chunker=None, namespace: str = None, metadata: dict = None, id_prefix: str = None):
+        chunk_vectors = None
+        if chunker is not None:
+            chunk_outputs = chunker(markdown_text)
+            if isinstance(chunk_outputs, EmbeddedChunks):
+                chunk_texts, chunk_vectors = chunk_outputs.texts, chunk_outputs.vectors
+            elif chunk_outputs and hasattr(chunk_outputs[0], "page_content"):
+                chunk_texts = [c.page_content for c in chunk_outputs]
+            else:
+                chunk_texts = list(chunk_outputs)
+        else:
+            chunk_texts = [markdown_text] if markdown_text else []
+        if chunk_texts:
+            self.upsert_chunks(chunk_texts, namespace=namespace, chunk_vectors=chunk_vectors, metadata=metadata, id_prefix=id_prefix)
+        return self
+
+    def upsert_chunks(self, chunk_texts: list[str], namespace: str = None, chunk_vectors: list[list[float]] = None, metadata: dict = None, id_prefix: str = None, skip_ids: set = None, on_batch=None) -> int:
+        """Embeds (unless chunk_vectors are given) and upserts chunks; same IDs, metadata, skip_ids and on_batch as PineconeVectorIndex."""
+        if namespace is None:
+            raise ValueError("Namespace is required for the local vector index.")
+
+        all_ids = [f"{id_prefix}#{i}" if id_prefix else str(uuid.uuid4()) for i in range(len(chunk_texts))]
+        pending = [i for i, chunk_id in enumerate(all_ids) if not skip_ids or chunk_id not in skip_ids]
+        ids = [all_ids[i] for i in pending]
+        chunk_metadata = [
+            {"chunk_text": chunk_texts[i], "chunk_id": i, "source": "uploaded_document", **(metadata or {})}
+            for i in pending
+        ]
+        if chunk_vectors is not None:
+            vectors = [chunk_vectors[i] for i in pending]
+        else:
+            vectors = []
+            for start in range(0, len(pending), UPSERT_BATCH_SIZE):
+                vectors.extend(self.__embeddings.embed_documents([chunk_texts[i] for i in pending[start:start + UPSERT_BATCH_SIZE]]))
+
+        with track_stage("upsert") as stage:
+            uploaded = self.__store.upsert(namespace, ids, vectors, chunk_metadata)
+            stage.add_items(uploaded)
+        if on_batch is not None and ids:
+            on_batch(ids)
+        from src.utils.keyword_index import keyword_index
+
+        keyword_index.add(namespace, ids, chunk_metadata, vectors)
+        answer_cache.invalidate(namespace)
+        print(f"Uploaded {uploaded} chunks to local vector index in namespace '{namespace}'")
+        if self.__session_id:
+            event_emitter.emit(self.__session_id, "chunks_uploaded", f"Uploaded {uploaded} chunks to local vector index", {
+                "chunk_count": uploaded,
+                "namespace": namespace
+            })
+        return uploaded
+
+    def query(self, vector: list[float], namespace: str = None, top_k: int = 5, filter: dict = None, include_values: bool = False) -> list[dict]:
+        if namespace is None:
+            raise ValueError("Namespace is required for semantic search to ensure data isolation.")
+        with track_stage("vector_query"):
+            matches = self.__store.query(namespace, vector, top_k=top_k, filter=filter, include_values=include_values)
+        return [
+            {
+                "id": match["id"],
+                "score": match["score"],
+                "chunk_text": match["metadata"]["chunk_text"],
+                "video_id": match["metadata"].get("video_id"),
+                "chunk_id": match["metadata"].get("chunk_id"),
+                **({"values": match["values"]} if include_values else {}),
+            }
+            for match in matches
+            if "chunk_text" in match["metadata"]
+        ]
+
+    def has_vectors(self, ids: list[str], namespace: str = None) -> bool:
+        return bool(self.__store.existing_ids(namespace, ids))
+
+    def delete_by_prefix(self, prefix: str, namespace: str = None) -> int:
+        from src.utils.keyword_index import keyword_index
+
+        keyword_index.delete_by_prefix(namespace, prefix)
+        return self.__store.delete_by_prefix(namespace, prefix)
+
+    def delete_namespace(self, namespace: str):
+        from src.utils.keyword_index import keyword_index
+
+        keyword_index.delete_namespace(namespace)
+        self.__store.delete_namespace(namespace)
+
+    def semantic_search(self, embeded_query: list[float], namespace: str = None) -> str:
+        matches = [match for match in self.query(embeded_query, namespace=namespace, top_k=20) if match["score"] >= 0.7]
+        if matches:
+            return matches[0]["chunk_text"] or "No relevant context found for the question."
+        else:
+            return "No relevant context found for the question."
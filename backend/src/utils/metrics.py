@@ -0,0 +1,234 @@
+"""
+Process-wide metrics registry rendered in the Prometheus text exposition format.
+Every pipeline stage (search, fetch, chunk, embed, upsert, vector_query, retrieval,
+generation, agent) is wrapped in track_stage, which records its latency histogram and a call
+counter by outcome. Counters and gauges either hold a value (open SSE streams) or read
+it from a callback at scrape time (active sessions, queued jobs, cache statistics). Metrics are per process; with
+several uvicorn workers each worker is scraped separately.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Seconds; spans cached lookups (ms) up to slow LLM and SerpAPI calls (minutes)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{_escape(extra[1])}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        header = f"# HELP {self.name} {self.documentation}\n# TYPE {self.name} {self.kind}\n"
+        return header + "".join(f"{line}\n" for line in self._samples())
+
+
+class _ValueMetric(_Metric):
+    """
+    One value per label set, either held here or read from a callback at scrape time.
+    A callback returns a number, or with labels a dict keyed by the label value
+    (a tuple of values for several labels).
+    """
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), callback: Optional[Callable[[], object]] = None):
+        super().__init__(name, documentation, labelnames)
+        self._callback = callback
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def _add(self, amount: float, labels: dict):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _current_values(self) -> List[Tuple[Tuple[str, ...], float]]:
+        if self._callback is None:
+            with self._lock:
+                return sorted(self._values.items())
+        try:
+            value = self._callback()
+        except Exception as e:
+            print(f"⚠️ Could not read metric {self.name}: {e}")
+            return []
+        if not self.labelnames:
+            return [((), value)]
+        return sorted(
+            ((key if isinstance(key, tuple) else (key,)), item)
+            for key, item in value.items()
+        )
+
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, tuple(str(v) for v in key))} {_format_value(value)}"
+            for key, value in self._current_values()
+        ]
+
+
+class Counter(_ValueMetric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels):
+        self._add(amount, labels)
+
+
+class Gauge(_ValueMetric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels):
+        self._add(amount, labels)
+
+    def dec(self, amount: float = 1.0, **labels):
+        self._add(-amount, labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._series: Dict[Tuple[str, ...], list] = {}  # labels -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            series = sorted((key, list(values)) for key, values in self._series.items())
+        lines = []
+        for key, values in series:
+            for bound, count in zip(self.buckets, values):
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', _format_value(bound)))} {count}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(values[-2])}")
+            lines.append(f"{self.name}_count{labels} {values[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named metrics of one process; render() produces the /metrics payload."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                # Re-registering (e.g. a module reload) returns the metric already collecting
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = (), callback: Optional[Callable[[], object]] = None) -> Counter:
+        return self._register(Counter(name, documentation, labelnames, callback))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (), callback: Optional[Callable[[], object]] = None) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames, callback))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "".join(metric.render() for metric in metrics)
+
+
+# Global metrics registry
+metrics = MetricsRegistry()
+
+stage_duration_seconds = metrics.histogram(
+    "autovoyce_stage_duration_seconds", "Time spent in each pipeline stage.", ["stage"]
+)
+stage_calls_total = metrics.counter(
+    "autovoyce_stage_calls_total", "Pipeline stage calls by outcome (ok, error, cancelled).", ["stage", "outcome"]
+)
+stage_items_total = metrics.counter(
+    "autovoyce_stage_items_total", "Items handled per stage (videos found, texts embedded, chunks upserted, ...).", ["stage"]
+)
+
+
+class StageTracker:
+    """Handle yielded by track_stage for stages that report failures without raising."""
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.outcome = "ok"
+
+    def fail(self):
+        self.outcome = "error"
+
+    def add_items(self, count: int):
+        if count:
+            stage_items_total.inc(count, stage=self.stage)
+
+
+def record_stage(stage: str, seconds: float, outcome: str = "ok"):
+    """Records one call of stage that was timed by the caller."""
+    stage_duration_seconds.observe(seconds, stage=stage)
+    stage_calls_total.inc(stage=stage, outcome=outcome)
+
+
+@contextmanager
+def track_stage(stage: str) -> Iterator[StageTracker]:
+    """Times the enclosed block as one call of stage; exceptions count as errors and propagate."""
+    tracker = StageTracker(stage)
+    start = time.perf_counter()
+    try:
+        yield tracker
+    except Exception:
+        tracker.outcome = "error"
+        raise
+    except BaseException:
+        # Client disconnects and generator shutdown, not failures
+        tracker.outcome = "cancelled"
+        raise
+    finally:
+        record_stage(stage, time.perf_counter() - start, tracker.outcome)
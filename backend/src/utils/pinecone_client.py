@@ -0,0 +1,93 @@
+"""
+Shared Pinecone clients.
+One long-lived client and Index handle per process (plus one asyncio index per event
+loop), so every index operation reuses pooled keep-alive connections instead of
+paying a TLS handshake per call.
+"""
+
+import asyncio
+import threading
+from pinecone import Pinecone
+from settings import (
+    PINECONE_API_KEY,
+    PINECONE_INDEX_NAME,
+    PINECONE_HOST_URL,
+    PINECONE_POOL_THREADS,
+    PINECONE_CONNECTION_POOL_MAXSIZE,
+    PINECONE_REQUEST_TIMEOUT_SECONDS,
+)
+
+# Extra keyword arguments for data-plane calls (upsert, query, fetch, delete, list)
+REQUEST_OPTIONS = {"_request_timeout": PINECONE_REQUEST_TIMEOUT_SECONDS}
+
+_client = None
+_index = None
+_async_index = None
+_async_index_loop = None
+_lock = threading.Lock()
+
+
+def is_not_found(error: Exception) -> bool:
+    """True for Pinecone's NotFoundException / HTTP 404 (e.g. deleting a namespace that is already gone)."""
+    return getattr(error, "status", None) == 404 or type(error).__name__ == "NotFoundException"
+
+
+def get_client() -> Pinecone:
+    """Returns the process-wide Pinecone client, creating it on first use."""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                if not PINECONE_API_KEY:
+                    raise ValueError("PINECONE_API_KEY environment variable is not set")
+                _client = Pinecone(api_key=PINECONE_API_KEY, pool_threads=PINECONE_POOL_THREADS)
+    return _client
+
+
+def get_index():
+    """Returns the shared Index handle (by PINECONE_HOST_URL, falling back to PINECONE_INDEX_NAME)."""
+    global _index
+    if _index is None:
+        client = get_client()
+        with _lock:
+            if _index is None:
+                if not PINECONE_HOST_URL and not PINECONE_INDEX_NAME:
+                    raise ValueError("PINECONE_HOST_URL or PINECONE_INDEX_NAME environment variable must be set")
+                _index = client.Index(
+                    name="" if PINECONE_HOST_URL else PINECONE_INDEX_NAME,
+                    host=PINECONE_HOST_URL or "",
+                    pool_threads=PINECONE_POOL_THREADS,
+                    connection_pool_maxsize=PINECONE_CONNECTION_POOL_MAXSIZE,
+                )
+    return _index
+
+
+async def get_async_index():
+    """
+    Returns an asyncio Index handle bound to the running event loop.
+    Requires the pinecone[asyncio] extra (aiohttp).
+    """
+    global _async_index, _async_index_loop
+    loop = asyncio.get_running_loop()
+    if _async_index is None or _async_index_loop is not loop:
+        if not PINECONE_HOST_URL:
+            raise ValueError("PINECONE_HOST_URL environment variable is not set")
+        from pinecone import PineconeAsyncio
+
+        client = PineconeAsyncio(api_key=PINECONE_API_KEY)
+        _async_index = client.IndexAsyncio(host=PINECONE_HOST_URL, connection_pool_maxsize=PINECONE_CONNECTION_POOL_MAXSIZE)
+        _async_index_loop = loop
+    return _async_index
+
+
+async def close():
+    """Closes the pooled connections (called on application shutdown)."""
+    global _index, _async_index, _async_index_loop
+    with _lock:
+        index, _index = _index, None
+    if index is not None:
+        index.close()
+    if _async_index is not None:
+        await _async_index.close()
+        _async_index = None
+        _async_index_loop = None
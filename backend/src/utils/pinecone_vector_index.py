@@ -1,24 +1,33 @@
 from src.utils.base import VectorIndexStrategy
-from settings import PINECONE_API_KEY, PINECONE_INDEX_NAME
-from pinecone import Pinecone
+from settings import PINECONE_INDEX_NAME, PINECONE_HOST_URL, UPSERT_BATCH_SIZE
+from src.utils.pinecone_client import get_index, get_async_index, is_not_found, REQUEST_OPTIONS
 from src.utils.event_emitter import event_emitter
+from src.utils.upsert_engine import upsert_engine
+from src.utils.semantic_chunker import EmbeddedChunks
+from src.utils.answer_cache import answer_cache
+from src.utils.keyword_index import keyword_index
+from src.utils.metrics import track_stage
 
 class PineconeVectorIndex(VectorIndexStrategy):
-    def  __init__ (self, embeddings, session_id: str = ""):
+    def  __init__ (self, embeddings=None, session_id: str = ""):
         self.__collection_name = PINECONE_INDEX_NAME
-        self.__api_key = Pinecone(api_key=PINECONE_API_KEY)
         self.__embeddings = embeddings
         self.__collection = False
         self.__session_id = session_id
 
-    def create_or_load_vector_index(self, markdown_text: str, chunker=None, namespace: str = None):
+    def create_or_load_vector_index(self, markdown_text: str, chunker=None, namespace: str = None, metadata: dict = None, id_prefix: str = None):
+        # metadata and id_prefix are passed through to upsert_chunks.
         # Note: We removed the self.__collection check because we want to allow multiple uploads to different namespaces
         
-        index = self.__api_key.Index(self.__collection_name)
-        # Use provided chunker callable if supplied; it may return Documents or strings
+        index = get_index()
+        # Use provided chunker callable if supplied; it may return Documents, strings or
+        # EmbeddedChunks (texts with vectors already computed by the chunker)
+        chunk_vectors = None
         if chunker is not None:
             chunk_outputs = chunker(markdown_text)
-            if chunk_outputs and hasattr(chunk_outputs[0], "page_content"):
+            if isinstance(chunk_outputs, EmbeddedChunks):
+                chunk_texts, chunk_vectors = chunk_outputs.texts, chunk_outputs.vectors
+            elif chunk_outputs and hasattr(chunk_outputs[0], "page_content"):
                 chunk_texts = [c.page_content for c in chunk_outputs]
             else:
                 chunk_texts = list(chunk_outputs)
@@ -28,48 +37,161 @@ class PineconeVectorIndex(VectorIndexStrategy):
         if not chunk_texts:
             return self
 
-        # Embed documents using langchain's HuggingFaceEmbeddings
-        vectors = self.__embeddings.embed_documents(chunk_texts)
-        pinecone_vectors = []
+        self.upsert_chunks(chunk_texts, namespace=namespace, chunk_vectors=chunk_vectors, metadata=metadata, id_prefix=id_prefix, index=index)
+        self.__collection = True
+        return self
+
+    def upsert_chunks(self, chunk_texts: list[str], namespace: str = None, chunk_vectors: list[list[float]] = None, metadata: dict = None, id_prefix: str = None, index=None, skip_ids: set = None, on_batch=None) -> int:
+        """
+        Embeds (unless chunk_vectors are given) and upserts chunks. Returns the number of upserted vectors.
+        metadata is merged into every chunk (e.g. {"video_id": ...}); id_prefix gives deterministic
+        "<prefix>#<n>" IDs so re-uploading the same video overwrites instead of duplicating.
+        Chunks whose ID is in skip_ids are left out (already upserted by an earlier attempt);
+        on_batch receives the IDs of each batch once it is stored.
+        """
+        if index is None:
+            index = get_index()
+
+        # Use UUIDs to ensure unique IDs across multiple uploads unless a stable prefix is given
         import uuid
-        for i, (values, chunk_text) in enumerate(zip(vectors, chunk_texts)):
-            # Use UUID to ensure unique IDs across multiple uploads
-            chunk_id = str(uuid.uuid4())
-            pinecone_vectors.append({
-                "id": chunk_id,
-                "values": values,
-                "metadata": {
-                    "chunk_text": chunk_text,
-                    "chunk_id": i,
-                    "source": "uploaded_document"
-                }
-            })
+        chunk_ids = [f"{id_prefix}#{i}" if id_prefix else str(uuid.uuid4()) for i in range(len(chunk_texts))]
+        chunk_metadata = [
+            {
+                "chunk_text": chunk_text,
+                "chunk_id": i,
+                "source": "uploaded_document",
+                **(metadata or {})
+            }
+            for i, chunk_text in enumerate(chunk_texts)
+        ]
+        pending = [i for i, chunk_id in enumerate(chunk_ids) if not skip_ids or chunk_id not in skip_ids]
+        # Kept for the keyword index so keyword-only hits don't need re-embedding at query time
+        keyword_vectors = list(chunk_vectors) if chunk_vectors is not None else [None] * len(chunk_texts)
 
-        # Upsert to Pinecone with namespace
-        index.upsert(vectors=pinecone_vectors, namespace=namespace)
-        print(f"Uploaded {len(pinecone_vectors)} chunks to Pinecone index '{self.__collection_name}' in namespace '{namespace}'")
+        def iter_vectors():
+            # Embed in slices so earlier batches are already uploading while later ones embed
+            for start in range(0, len(pending), UPSERT_BATCH_SIZE):
+                rows = pending[start:start + UPSERT_BATCH_SIZE]
+                if chunk_vectors is not None:
+                    vectors = [chunk_vectors[i] for i in rows]
+                else:
+                    vectors = self.__embeddings.embed_documents([chunk_texts[i] for i in rows])
+                    for i, values in zip(rows, vectors):
+                        keyword_vectors[i] = values
+                for i, values in zip(rows, vectors):
+                    yield {
+                        "id": chunk_ids[i],
+                        "values": values,
+                        "metadata": chunk_metadata[i]
+                    }
+
+        # Upsert to Pinecone with namespace in size-bounded, concurrent batches
+        with track_stage("upsert") as stage:
+            uploaded = upsert_engine.upsert(index, iter_vectors(), namespace=namespace, session_id=self.__session_id, on_batch=on_batch)
+            stage.add_items(uploaded)
+        keyword_index.add(namespace, chunk_ids, chunk_metadata, keyword_vectors)
+        # New content: cached answers for this namespace are stale
+        answer_cache.invalidate(namespace)
+        print(f"Uploaded {uploaded} chunks to Pinecone index '{self.__collection_name}' in namespace '{namespace}'")
         if self.__session_id:
-            event_emitter.emit(self.__session_id, "chunks_uploaded", f"Uploaded {len(pinecone_vectors)} chunks to Pinecone", {
-                "chunk_count": len(pinecone_vectors),
+            event_emitter.emit(self.__session_id, "chunks_uploaded", f"Uploaded {uploaded} chunks to Pinecone", {
+                "chunk_count": uploaded,
                 "namespace": namespace
             })
-        self.__collection = True
-        return self
+        return uploaded
+
+    def has_vectors(self, ids: list[str], namespace: str = None) -> bool:
+        """Returns True if any of the given vector IDs exist in the namespace."""
+        index = get_index()
+        response = index.fetch(ids=ids, namespace=namespace, **REQUEST_OPTIONS)
+        return bool(response.vectors)
+
+    def delete_by_prefix(self, prefix: str, namespace: str = None) -> int:
+        """Deletes every vector whose ID starts with prefix. Returns the number of deleted IDs."""
+        index = get_index()
+        deleted = 0
+        try:
+            for ids in index.list(prefix=prefix, namespace=namespace, **REQUEST_OPTIONS):
+                index.delete(ids=ids, namespace=namespace, **REQUEST_OPTIONS)
+                deleted += len(ids)
+        except Exception as e:
+            # The namespace is already gone, so are its vectors
+            if not is_not_found(e):
+                raise
+        keyword_index.delete_by_prefix(namespace, prefix)
+        return deleted
+
+    def delete_namespace(self, namespace: str):
+        """Deletes every vector in the namespace (a namespace that doesn't exist counts as deleted)."""
+        index = get_index()
+        try:
+            index.delete_namespace(namespace=namespace, **REQUEST_OPTIONS)
+        except Exception as e:
+            # Never written to, or removed by an earlier attempt whose response was lost
+            if not is_not_found(e):
+                raise
+        keyword_index.delete_namespace(namespace)
     
-    def semantic_search(self, embeded_query: list[float], namespace: str = None) -> str:
+    def query(self, vector: list[float], namespace: str = None, top_k: int = 5, filter: dict = None, include_values: bool = False) -> list[dict]:
+        """
+        Returns the top_k nearest chunks to vector as dicts with id, score, chunk_text,
+        video_id and chunk_id (plus values when include_values is set).
+        filter is a Pinecone metadata filter (e.g. {"video_id": {"$in": [...]}}).
+        """
+        if namespace is None:
+            raise ValueError("Namespace is required for semantic search to ensure data isolation.")
+
+        index = get_index()
+        with track_stage("vector_query"):
+            response = index.query(
+                vector=vector,
+                top_k=top_k,
+                include_metadata=True,
+                include_values=include_values,
+                filter=filter,
+                namespace=namespace,
+                **REQUEST_OPTIONS
+            )
+        return self._matches(response, include_values)
+
+    async def aquery(self, vector: list[float], namespace: str = None, top_k: int = 5, filter: dict = None, include_values: bool = False) -> list[dict]:
+        """query() on the event loop's asyncio Index handle (needs PINECONE_HOST_URL; otherwise runs query() in a thread)."""
+        if not PINECONE_HOST_URL:
+            return await super().aquery(vector, namespace=namespace, top_k=top_k, filter=filter, include_values=include_values)
         if namespace is None:
             raise ValueError("Namespace is required for semantic search to ensure data isolation.")
-            
-        index = self.__api_key.Index(self.__collection_name)
-        response = index.query(
-            vector=embeded_query,
-            top_k=20,
-            include_metadata=True,
-            score_threshold=0.7,
-            namespace=namespace
-        )
-        if response.get("matches"):
-            context = response["matches"][0]["metadata"].get("chunk_text", "")
-            return context or "No relevant context found for the question."
+
+        index = await get_async_index()
+        with track_stage("vector_query"):
+            response = await index.query(
+                vector=vector,
+                top_k=top_k,
+                include_metadata=True,
+                include_values=include_values,
+                filter=filter,
+                namespace=namespace,
+                **REQUEST_OPTIONS
+            )
+        return self._matches(response, include_values)
+
+    @staticmethod
+    def _matches(response, include_values: bool) -> list[dict]:
+        return [
+            {
+                "id": match.get("id"),
+                "score": match.get("score"),
+                "chunk_text": match["metadata"]["chunk_text"],
+                "video_id": match["metadata"].get("video_id"),
+                "chunk_id": match["metadata"].get("chunk_id"),
+                **({"values": match.get("values")} if include_values else {}),
+            }
+            for match in response.get("matches") or []
+            if match.get("metadata") and "chunk_text" in match["metadata"]
+        ]
+
+    def semantic_search(self, embeded_query: list[float], namespace: str = None) -> str:
+        matches = [match for match in self.query(embeded_query, namespace=namespace, top_k=20) if match["score"] >= 0.7]
+        if matches:
+            return matches[0]["chunk_text"] or "No relevant context found for the question."
         else:
             return "No relevant context found for the question."
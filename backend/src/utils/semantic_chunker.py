@@ -0,0 +1,166 @@
+"""
+Single-pass semantic chunker.
+Embeds each sentence window once, finds breakpoints from consecutive cosine distances
+(same percentile rule as langchain_experimental's SemanticChunker) and derives chunk
+vectors from those sentence embeddings, so chunks don't need a second embedding pass.
+No chunk exceeds max_chunk_chars: oversized semantic chunks are split at sentence
+boundaries, and sentences that are themselves too long at word boundaries.
+"""
+
+import re
+import time
+from typing import NamedTuple, Optional
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from src.utils.metrics import record_stage, stage_items_total
+from settings import CHUNK_EMBEDDING_MODE, CHUNK_BREAKPOINT_PERCENTILE, CHUNK_SENTENCE_BUFFER_SIZE, CHUNK_MAX_CHARS
+
+
+class EmbeddedChunks(NamedTuple):
+    """Chunk texts with their embedding vectors (same order)."""
+    texts: list[str]
+    vectors: list[list[float]]
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _split_long_unit(unit: str, max_chars: int) -> list[str]:
+    """Splits a sentence longer than max_chars at word boundaries (very long words are cut)."""
+    pieces, current = [], ""
+    for word in unit.split():
+        while len(word) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(word[:max_chars])
+            word = word[max_chars:]
+        if current and len(current) + 1 + len(word) > max_chars:
+            pieces.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+class SentenceEmbeddingChunker:
+    """Splits text into semantic chunks and returns them together with their vectors."""
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        buffer_size: int = CHUNK_SENTENCE_BUFFER_SIZE,
+        breakpoint_percentile: float = CHUNK_BREAKPOINT_PERCENTILE,
+        mode: str = CHUNK_EMBEDDING_MODE,
+        sentence_split_regex: str = r"(?<=[.?!])\s+",
+        max_chunk_chars: int = CHUNK_MAX_CHARS,
+    ):
+        if mode not in ("pooled", "exact"):
+            raise ValueError(f"Unknown chunk embedding mode '{mode}'. Expected 'pooled' or 'exact'.")
+        self.embeddings = embeddings
+        self.buffer_size = buffer_size
+        self.breakpoint_percentile = breakpoint_percentile
+        self.mode = mode
+        self.sentence_split_regex = sentence_split_regex
+        self.max_chunk_chars = max_chunk_chars
+
+    def _combined_windows(self, sentences: list[str]) -> list[str]:
+        """Joins each sentence with buffer_size neighbours on both sides."""
+        b = self.buffer_size
+        return [" ".join(sentences[max(0, i - b): i + b + 1]) for i in range(len(sentences))]
+
+    def _sentences(self, text: str, units: Optional[list[str]] = None) -> list[str]:
+        candidates = re.split(self.sentence_split_regex, text)
+        if units and any(len(sentence.strip()) > self.max_chunk_chars for sentence in candidates):
+            # Too little punctuation to find sentences: split on the caller's units (transcript snippets)
+            candidates = units
+        sentences = []
+        for sentence in candidates:
+            sentence = sentence.strip()
+            if not sentence:
+                continue
+            if len(sentence) > self.max_chunk_chars:
+                # Unpunctuated text (e.g. auto-generated captions) would otherwise be one sentence
+                sentences.extend(_split_long_unit(sentence, self.max_chunk_chars))
+            else:
+                sentences.append(sentence)
+        return sentences
+
+    def _bounded_spans(self, sentences: list[str], starts, ends) -> tuple[np.ndarray, np.ndarray]:
+        """Splits each [start, end) span of sentences so no chunk exceeds max_chunk_chars."""
+        bounded_starts, bounded_ends = [], []
+        for start, end in zip(starts, ends):
+            piece_start, length = start, -1
+            for i in range(start, end):
+                added = len(sentences[i]) + 1
+                if i > piece_start and length + added > self.max_chunk_chars:
+                    bounded_starts.append(piece_start)
+                    bounded_ends.append(i)
+                    piece_start, length = i, -1
+                length += added
+            bounded_starts.append(piece_start)
+            bounded_ends.append(end)
+        return np.asarray(bounded_starts), np.asarray(bounded_ends)
+
+    def split_and_embed(self, text: str, units: Optional[list[str]] = None) -> EmbeddedChunks:
+        """
+        Chunks and embeds text. units (e.g. transcript snippet texts) replace sentences
+        as split units when the text lacks sentence punctuation. Time spent outside the
+        embedding calls (which the embedding engine reports as "embed") is recorded as
+        the "chunk" stage.
+        """
+        embed_seconds = 0.0
+
+        def embed_documents(texts: list[str]) -> list[list[float]]:
+            nonlocal embed_seconds
+            start = time.perf_counter()
+            try:
+                return self.embeddings.embed_documents(texts)
+            finally:
+                embed_seconds += time.perf_counter() - start
+
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            chunks = self._split_and_embed(text, embed_documents, units)
+            outcome = "ok"
+            stage_items_total.inc(len(chunks.texts), stage="chunk")
+            return chunks
+        finally:
+            record_stage("chunk", time.perf_counter() - start - embed_seconds, outcome)
+
+    def _split_and_embed(self, text: str, embed_documents, units: Optional[list[str]] = None) -> EmbeddedChunks:
+        sentences = self._sentences(text, units)
+        if not sentences:
+            return EmbeddedChunks([], [])
+        if len(sentences) == 1:
+            return EmbeddedChunks(sentences, _normalize_rows(np.asarray(embed_documents(sentences), dtype=np.float32)).tolist())
+
+        window_vectors = _normalize_rows(
+            np.asarray(embed_documents(self._combined_windows(sentences)), dtype=np.float32)
+        )
+
+        # Cosine distance between consecutive windows; split after sentence i when distance[i] is an outlier
+        distances = 1.0 - np.einsum("ij,ij->i", window_vectors[:-1], window_vectors[1:])
+        threshold = np.percentile(distances, self.breakpoint_percentile)
+        breakpoints = np.flatnonzero(distances > threshold) + 1
+        starts, ends = self._bounded_spans(
+            sentences, np.concatenate(([0], breakpoints)), np.concatenate((breakpoints, [len(sentences)]))
+        )
+
+        texts = [" ".join(sentences[start:end]) for start, end in zip(starts, ends)]
+        if self.mode == "exact":
+            return EmbeddedChunks(texts, embed_documents(texts))
+
+        # Mean of each chunk's window vectors via prefix sums, then re-normalized
+        prefix = np.vstack((np.zeros((1, window_vectors.shape[1]), dtype=np.float32), np.cumsum(window_vectors, axis=0)))
+        means = (prefix[ends] - prefix[starts]) / (ends - starts)[:, None]
+        return EmbeddedChunks(texts, _normalize_rows(means).tolist())
+
+    def __call__(self, text: str) -> EmbeddedChunks:
+        return self.split_and_embed(text)
@@ -2,12 +2,16 @@ import time
 import uuid
 import threading
 from typing import Dict, Optional
-from pinecone import Pinecone
-from settings import PINECONE_API_KEY, PINECONE_HOST_URL, DEFAULT_TIMEOUT_SECONDS
+from settings import DEFAULT_TIMEOUT_SECONDS, VECTOR_STORAGE_MODE, SHARED_CORPUS_NAMESPACE
+from src.utils.deletion_queue import deletion_queue
+from src.utils.video_corpus import video_corpus
+from src.utils.answer_cache import answer_cache
+from src.utils.event_emitter import event_emitter
+from src.utils.job_checkpoints import job_checkpoints
+from src.utils.session_store import get_session_store
 
-# In-memory session store (session_id -> namespace)
-_sessions: Dict[str, str] = {}
-_session_last_access: Dict[str, float] = {}  # session_id -> timestamp
+# Session store (session_id -> namespace, last access); backend chosen by SESSION_STORE_BACKEND
+_store = get_session_store()
 _last_session_id: Optional[str] = None
 _scheduler_thread: Optional[threading.Thread] = None
 _stop_scheduler: threading.Event = threading.Event()
@@ -23,18 +27,15 @@ def create_session() -> tuple[str, str]:
     global _last_session_id
     session_id = str(uuid.uuid4())
     namespace = f"session_{session_id[:8]}"  # Use first 8 chars for readability
-    _sessions[session_id] = namespace
-    _session_last_access[session_id] = time.time()
+    _store.create(session_id, namespace)
     _last_session_id = session_id
     print(f"✅ Created session: {session_id} -> {namespace}")
-    print(f"📋 Total sessions now: {len(_sessions)}")
-    print(f"📋 Session keys: {list(_sessions.keys())}")
+    print(f"📋 Total sessions now: {_store.count()}")
     return session_id, namespace
 
 def update_last_access(session_id: str):
     """Updates the last access timestamp for a session."""
-    if session_id in _sessions:
-        _session_last_access[session_id] = time.time()
+    _store.touch(session_id)
 
 def get_last_session_id() -> Optional[str]:
     """Returns the most recently created session ID."""
@@ -45,10 +46,9 @@ def get_namespace(session_id: str) -> Optional[str]:
     Retrieves the namespace for a given session ID.
     Returns: namespace or None if session doesn't exist
     """
-    namespace = _sessions.get(session_id)
+    namespace = _store.get_namespace(session_id)
     if not namespace:
-        print(f"⚠️ Session {session_id} not found in _sessions dict")
-        print(f"📋 Current sessions: {list(_sessions.keys())}")
+        print(f"⚠️ Session {session_id} not found in session store ({_store.count()} sessions)")
     return namespace
 
 def set_current_namespace(namespace: str):
@@ -67,53 +67,59 @@ def get_current_namespace() -> Optional[str]:
 
 def delete_session(session_id: str) -> bool:
     """
-    Deletes a session and its associated Pinecone namespace.
+    Deletes a session and queues deletion of its associated Pinecone namespace.
     Returns: True if session was deleted, False if it didn't exist
     """
     print(f"🗑️ Attempting to delete session: {session_id}")
-    print(f"📋 Sessions before delete: {list(_sessions.keys())}")
-    namespace = _sessions.pop(session_id, None)
-    _session_last_access.pop(session_id, None)
-    print(f"📋 Sessions after delete: {list(_sessions.keys())}")
+    namespace = _store.delete(session_id)
     
     if namespace:
-        print(f"📦 Found namespace to delete: {namespace}")
-        try:
-            # Delete all vectors in the namespace
-            pc = Pinecone(api_key=PINECONE_API_KEY)
-            index = pc.Index(host=PINECONE_HOST_URL)
-            
-            print(f"🔄 Calling index.delete_namespace(namespace='{namespace}')...")
-            index.delete_namespace(namespace=namespace)
-            
-            print(f"✅ Successfully deleted Pinecone namespace: {namespace}")
-            return True
-        except Exception as e:
-            print(f"❌ Error deleting namespace {namespace}: {type(e).__name__}: {e}")
-            import traceback
-            traceback.print_exc()
-            return False
+        return _release_session(session_id, namespace)
     else:
+        event_emitter.clear_events(session_id)
         print(f"⚠️ No namespace found for session {session_id}")
         return False
-    return False
+
+def _release_session(session_id: str, namespace: str) -> bool:
+    """Frees everything a removed session held: events, caches and checkpoints; queues its vectors for deletion."""
+    event_emitter.clear_events(session_id)
+    print(f"📦 Found namespace to delete: {namespace}")
+    answer_cache.invalidate(namespace)
+    try:
+        job_checkpoints.clear_namespace(namespace)
+    except Exception as e:
+        print(f"⚠️ Could not clear job checkpoints for {namespace}: {e}")
+    try:
+        if VECTOR_STORAGE_MODE == "shared":
+            # Only remove videos that no other session still references
+            orphaned = video_corpus.release(namespace)
+            for video_id in orphaned:
+                deletion_queue.enqueue_video(SHARED_CORPUS_NAMESPACE, video_id)
+            print(f"✅ Released session {namespace}; queued {len(orphaned)} unreferenced videos for removal from {SHARED_CORPUS_NAMESPACE}")
+            return True
+
+        # Vectors are deleted in the background with retries
+        deletion_queue.enqueue_namespace(namespace)
+        print(f"✅ Queued vector namespace for deletion: {namespace}")
+        return True
+    except Exception as e:
+        print(f"❌ Error queueing deletion of namespace {namespace}: {type(e).__name__}: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
 
 def cleanup_expired_sessions(timeout_seconds: int = DEFAULT_TIMEOUT_SECONDS):
     """
-    Checks for and deletes sessions that haven't been accessed in timeout_seconds.
+    Deletes sessions that haven't been accessed in timeout_seconds.
+    The store hands out only expired sessions (and each to a single worker), so the
+    cost is proportional to the number of expirations, not the number of sessions.
     """
-    current_time = time.time()
-    expired_sessions = []
-    
-    # Identify expired sessions
-    for session_id, last_access in list(_session_last_access.items()):
-        if current_time - last_access > timeout_seconds:
-            expired_sessions.append(session_id)
-            
-    # Delete them
-    for session_id in expired_sessions:
+    expired = _store.pop_expired(time.time() - timeout_seconds)
+    for session_id, namespace in expired:
         print(f"⏰ Session {session_id} expired (inactive > {timeout_seconds}s). Cleaning up...")
-        delete_session(session_id)
+        _release_session(session_id, namespace)
+    if expired:
+        print(f"🗑️ {deletion_queue.pending_count()} vector deletions queued")
 
 def start_cleanup_scheduler(interval_seconds: int = 300, timeout_seconds: int = DEFAULT_TIMEOUT_SECONDS):
     """
@@ -126,6 +132,8 @@ def start_cleanup_scheduler(interval_seconds: int = 300, timeout_seconds: int =
         return  # Already running
         
     _stop_scheduler.clear()
+    # Expired sessions hand their vectors to the deletion queue
+    deletion_queue.start()
     
     def scheduler_loop():
         timeout_hours = timeout_seconds / 3600
@@ -147,4 +155,8 @@ def start_cleanup_scheduler(interval_seconds: int = 300, timeout_seconds: int =
 
 def get_all_sessions() -> Dict[str, str]:
     """Returns all active sessions (for debugging)"""
-    return _sessions.copy()
+    return _store.all_sessions()
+
+def session_count() -> int:
+    """Returns the number of active sessions."""
+    return _store.count()
@@ -0,0 +1,175 @@
+"""
+Session storage backends.
+A session maps a session ID to its vector namespace and a last-access time. The
+in-memory store serves a single worker; the SQLite store is shared by every worker
+process on the host, so a session created by one uvicorn worker is visible to the
+others. Both find expired sessions without scanning all of them: the in-memory store
+keeps a min-heap of access times, the SQLite store an index on last_access.
+Only sessions and video references live here. Status events, the job queue and the
+answer cache stay in the worker process, so multi-worker deployments need sticky
+routing by session (see "Running several workers" in the README).
+"""
+
+import heapq
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from src.utils.sqlite_store import SQLiteStore
+from settings import SESSION_STORE_BACKEND, SESSION_STORE_PATH
+
+
+class SessionStore(ABC):
+
+    @abstractmethod
+    def create(self, session_id: str, namespace: str):
+        pass
+
+    @abstractmethod
+    def get_namespace(self, session_id: str) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    def touch(self, session_id: str):
+        """Refreshes the session's last-access time (no-op for unknown sessions)."""
+        pass
+
+    @abstractmethod
+    def delete(self, session_id: str) -> Optional[str]:
+        """Removes the session and returns its namespace, or None if it didn't exist."""
+        pass
+
+    @abstractmethod
+    def pop_expired(self, cutoff: float) -> List[Tuple[str, str]]:
+        """Removes and returns (session_id, namespace) for sessions last accessed before cutoff."""
+        pass
+
+    @abstractmethod
+    def all_sessions(self) -> Dict[str, str]:
+        pass
+
+    @abstractmethod
+    def count(self) -> int:
+        pass
+
+
+class InMemorySessionStore(SessionStore):
+    """Per-process store; expiry is driven by a lazily cleaned min-heap of access times."""
+
+    def __init__(self):
+        self._sessions: Dict[str, list] = {}  # session_id -> [namespace, last_access]
+        self._heap: List[Tuple[float, str]] = []  # (last_access, session_id); stale entries are skipped
+        self._lock = threading.Lock()
+
+    def create(self, session_id: str, namespace: str):
+        now = time.time()
+        with self._lock:
+            self._sessions[session_id] = [namespace, now]
+            heapq.heappush(self._heap, (now, session_id))
+
+    def get_namespace(self, session_id: str) -> Optional[str]:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return session[0] if session else None
+
+    def touch(self, session_id: str):
+        now = time.time()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return
+            session[1] = now
+            heapq.heappush(self._heap, (now, session_id))
+            # Every touch leaves a stale entry behind; rebuild once they dominate
+            if len(self._heap) > 2 * len(self._sessions) + 64:
+                self._heap = [(last_access, sid) for sid, (_, last_access) in self._sessions.items()]
+                heapq.heapify(self._heap)
+
+    def delete(self, session_id: str) -> Optional[str]:
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+            return session[0] if session else None
+
+    def pop_expired(self, cutoff: float) -> List[Tuple[str, str]]:
+        expired = []
+        with self._lock:
+            while self._heap and self._heap[0][0] < cutoff:
+                last_access, session_id = heapq.heappop(self._heap)
+                session = self._sessions.get(session_id)
+                if session is not None and session[1] == last_access:
+                    del self._sessions[session_id]
+                    expired.append((session_id, session[0]))
+        return expired
+
+    def all_sessions(self) -> Dict[str, str]:
+        with self._lock:
+            return {session_id: session[0] for session_id, session in self._sessions.items()}
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+
+class SQLiteSessionStore(SQLiteStore, SessionStore):
+    """Host-wide store shared by all worker processes; expiry uses an index on last_access."""
+
+    schema = (
+        """
+        CREATE TABLE IF NOT EXISTS sessions (
+            session_id TEXT PRIMARY KEY,
+            namespace TEXT NOT NULL,
+            last_access REAL NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_sessions_last_access ON sessions (last_access)",
+    )
+
+    def __init__(self, path: Path = SESSION_STORE_PATH):
+        super().__init__(path)
+
+    def create(self, session_id: str, namespace: str):
+        self._connection().execute(
+            "INSERT OR REPLACE INTO sessions (session_id, namespace, last_access) VALUES (?, ?, ?)",
+            (session_id, namespace, time.time()),
+        )
+
+    def get_namespace(self, session_id: str) -> Optional[str]:
+        row = self._connection().execute(
+            "SELECT namespace FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def touch(self, session_id: str):
+        self._connection().execute(
+            "UPDATE sessions SET last_access = ? WHERE session_id = ?", (time.time(), session_id)
+        )
+
+    def delete(self, session_id: str) -> Optional[str]:
+        # RETURNING makes the delete a claim: only one worker gets the namespace back
+        row = self._connection().execute(
+            "DELETE FROM sessions WHERE session_id = ? RETURNING namespace", (session_id,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def pop_expired(self, cutoff: float) -> List[Tuple[str, str]]:
+        rows = self._connection().execute(
+            "DELETE FROM sessions WHERE last_access < ? RETURNING session_id, namespace", (cutoff,)
+        ).fetchall()
+        return [(session_id, namespace) for session_id, namespace in rows]
+
+    def all_sessions(self) -> Dict[str, str]:
+        rows = self._connection().execute("SELECT session_id, namespace FROM sessions").fetchall()
+        return dict(rows)
+
+    def count(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+def get_session_store(backend: str = SESSION_STORE_BACKEND) -> SessionStore:
+    """Returns the store for SESSION_STORE_BACKEND ("memory" or "sqlite")."""
+    if backend == "sqlite":
+        return SQLiteSessionStore()
+    if backend != "memory":
+        raise ValueError(f"Unknown SESSION_STORE_BACKEND '{backend}'. Expected 'memory' or 'sqlite'.")
+    return InMemorySessionStore()
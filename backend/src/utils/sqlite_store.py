@@ -0,0 +1,43 @@
+"""
+Shared helpers for the local SQLite-backed stores (caches, checkpoints, queues).
+Each thread gets its own connection; WAL mode lets several worker processes on
+the same host share one database file.
+"""
+
+import sqlite3
+import threading
+from pathlib import Path
+
+
+class SQLiteStore:
+    """Base class that lazily opens per-thread connections and applies the schema once."""
+
+    schema: tuple[str, ...] = ()
+    # (table, column, declaration) added to databases created before the column existed
+    added_columns: tuple[tuple[str, str, str], ...] = ()
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def _connection(self) -> sqlite3.Connection:
+        """Returns this thread's connection, creating the schema on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._init_lock:
+                if not self._initialized:
+                    for statement in self.schema:
+                        conn.execute(statement)
+                    for table, column, declaration in self.added_columns:
+                        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+                        if column not in existing:
+                            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+                    self._initialized = True
+        return conn
@@ -0,0 +1,165 @@
+"""
+Persistent transcript cache keyed by video ID and language.
+Backed by SQLite so it is shared across sessions and worker processes, with TTL
+expiry and size-bounded LRU eviction.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Optional
+from src.utils.sqlite_store import SQLiteStore
+from settings import (
+    TRANSCRIPT_CACHE_PATH,
+    TRANSCRIPT_CACHE_TTL_SECONDS,
+    TRANSCRIPT_CACHE_MAX_BYTES,
+)
+
+# Least recently used rows examined per eviction query
+_EVICT_BATCH_SIZE = 64
+
+
+class TranscriptCache(SQLiteStore):
+    """Thread- and process-safe on-disk transcript cache."""
+
+    schema = (
+        """
+        CREATE TABLE IF NOT EXISTS transcripts (
+            video_id TEXT NOT NULL,
+            language TEXT NOT NULL,
+            payload BLOB NOT NULL,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            last_access REAL NOT NULL,
+            PRIMARY KEY (video_id, language)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_transcripts_last_access ON transcripts (last_access)",
+        # Running entry and byte totals, kept by triggers so eviction and stats never scan the table
+        """
+        CREATE TABLE IF NOT EXISTS transcript_totals (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            entries INTEGER NOT NULL,
+            bytes INTEGER NOT NULL
+        )
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS transcripts_total_insert AFTER INSERT ON transcripts
+        BEGIN UPDATE transcript_totals SET entries = entries + 1, bytes = bytes + new.size WHERE id = 1; END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS transcripts_total_update AFTER UPDATE OF size ON transcripts
+        BEGIN UPDATE transcript_totals SET bytes = bytes + new.size - old.size WHERE id = 1; END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS transcripts_total_delete AFTER DELETE ON transcripts
+        BEGIN UPDATE transcript_totals SET entries = entries - 1, bytes = bytes - old.size WHERE id = 1; END
+        """,
+        # Seeds the totals once for caches created before the totals table existed
+        "INSERT OR IGNORE INTO transcript_totals (id, entries, bytes) "
+        "SELECT 1, COUNT(*), COALESCE(SUM(size), 0) FROM transcripts",
+    )
+
+    def __init__(
+        self,
+        path: Path = TRANSCRIPT_CACHE_PATH,
+        ttl_seconds: int = TRANSCRIPT_CACHE_TTL_SECONDS,
+        max_bytes: int = TRANSCRIPT_CACHE_MAX_BYTES,
+    ):
+        super().__init__(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._stats_lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+
+    def _count(self, key: str, amount: int = 1):
+        with self._stats_lock:
+            self._stats[key] += amount
+
+    def get(self, video_id: str, language: str) -> Optional[dict]:
+        """Returns the cached transcript or None on a miss or expired entry."""
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT payload, created_at FROM transcripts WHERE video_id = ? AND language = ?",
+            (video_id, language),
+        ).fetchone()
+        now = time.time()
+        if row is None:
+            self._count("misses")
+            return None
+        payload, created_at = row
+        if now - created_at > self.ttl_seconds:
+            conn.execute("DELETE FROM transcripts WHERE video_id = ? AND language = ?", (video_id, language))
+            self._count("expired")
+            self._count("misses")
+            return None
+
+        conn.execute(
+            "UPDATE transcripts SET last_access = ? WHERE video_id = ? AND language = ?",
+            (now, video_id, language),
+        )
+        self._count("hits")
+        return json.loads(zlib.decompress(payload))
+
+    def put(self, video_id: str, language: str, transcript: dict):
+        """Stores a transcript and evicts least recently used entries beyond max_bytes."""
+        payload = zlib.compress(json.dumps(transcript).encode("utf-8"))
+        now = time.time()
+        conn = self._connection()
+        # An upsert rather than INSERT OR REPLACE: REPLACE's implicit delete skips the total triggers
+        conn.execute(
+            "INSERT INTO transcripts (video_id, language, payload, size, created_at, last_access) "
+            "VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (video_id, language) DO UPDATE SET payload = excluded.payload, size = excluded.size, "
+            "created_at = excluded.created_at, last_access = excluded.last_access",
+            (video_id, language, payload, len(payload), now, now),
+        )
+        self._evict(conn)
+
+    def _totals(self, conn: sqlite3.Connection) -> tuple[int, int]:
+        return conn.execute("SELECT entries, bytes FROM transcript_totals WHERE id = 1").fetchone()
+
+    def _evict(self, conn: sqlite3.Connection):
+        if self._totals(conn)[1] <= self.max_bytes:
+            return
+
+        evicted = 0
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Re-read under the write lock, then walk the LRU end in small batches
+            total = self._totals(conn)[1]
+            while total > self.max_bytes:
+                rows = conn.execute(
+                    "SELECT video_id, language, size FROM transcripts ORDER BY last_access ASC LIMIT ?",
+                    (_EVICT_BATCH_SIZE,),
+                ).fetchall()
+                if not rows:
+                    break
+                for video_id, language, size in rows:
+                    if total <= self.max_bytes:
+                        break
+                    conn.execute("DELETE FROM transcripts WHERE video_id = ? AND language = ?", (video_id, language))
+                    total -= size
+                    evicted += 1
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if evicted:
+            self._count("evictions", evicted)
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters for this process plus current cache size."""
+        conn = self._connection()
+        entries, size = self._totals(conn)
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats.update({"entries": entries, "bytes": size})
+        return stats
+
+
+# Global transcript cache instance
+transcript_cache = TranscriptCache()
@@ -0,0 +1,141 @@
+"""
+Batched, parallel vector upserts.
+Splits vectors into batches bounded by vector count and serialized size, sends them
+concurrently on a shared bounded pool, retries failed batches with exponential
+backoff and reports per-batch progress through the event emitter.
+"""
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Callable, Iterable, Iterator, Optional
+from src.utils.event_emitter import event_emitter
+from src.utils.pinecone_client import REQUEST_OPTIONS
+from settings import (
+    UPSERT_BATCH_SIZE,
+    UPSERT_MAX_BATCH_BYTES,
+    UPSERT_MAX_WORKERS,
+    UPSERT_MAX_RETRIES,
+    UPSERT_RETRY_BACKOFF_SECONDS,
+)
+
+
+def estimate_vector_bytes(vector: dict) -> int:
+    """Approximates the serialized request size of a single vector record."""
+    return len(json.dumps(vector, separators=(",", ":"), default=str))
+
+
+class UpsertEngine:
+    """Process-wide upsert pool shared by all ingestion jobs."""
+
+    def __init__(
+        self,
+        batch_size: int = UPSERT_BATCH_SIZE,
+        max_batch_bytes: int = UPSERT_MAX_BATCH_BYTES,
+        max_workers: int = UPSERT_MAX_WORKERS,
+        max_retries: int = UPSERT_MAX_RETRIES,
+        retry_backoff_seconds: float = UPSERT_RETRY_BACKOFF_SECONDS,
+    ):
+        self.batch_size = batch_size
+        self.max_batch_bytes = max_batch_bytes
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="upsert")
+        return self._executor
+
+    def make_batches(self, vectors: Iterable[dict]) -> Iterator[list[dict]]:
+        """Yields batches holding at most batch_size vectors and roughly max_batch_bytes of payload."""
+        batch: list[dict] = []
+        batch_bytes = 0
+        for vector in vectors:
+            size = estimate_vector_bytes(vector)
+            if batch and (len(batch) >= self.batch_size or batch_bytes + size > self.max_batch_bytes):
+                yield batch
+                batch, batch_bytes = [], 0
+            batch.append(vector)
+            batch_bytes += size
+        if batch:
+            yield batch
+
+    def _upsert_batch(self, index, batch: list[dict], namespace: str, session_id: str, batch_number: int, total_batches: Optional[int], on_batch: Optional[Callable[[list[str]], None]] = None) -> int:
+        progress = f"{batch_number}/{total_batches}" if total_batches else str(batch_number)
+        for attempt in range(self.max_retries + 1):
+            try:
+                index.upsert(vectors=batch, namespace=namespace, **REQUEST_OPTIONS)
+                if on_batch is not None:
+                    try:
+                        on_batch([vector["id"] for vector in batch])
+                    except Exception as e:
+                        print(f"⚠️ Upsert batch callback failed: {e}")
+                if session_id:
+                    event_emitter.emit(session_id, "upsert_batch_complete", f"Upserted batch {progress} ({len(batch)} vectors)", {
+                        "batch_number": batch_number,
+                        "total_batches": total_batches,
+                        "vector_count": len(batch),
+                        "namespace": namespace
+                    })
+                return len(batch)
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    print(f"❌ Upsert batch {progress} failed after {attempt + 1} attempts: {e}")
+                    if session_id:
+                        event_emitter.emit(session_id, "upsert_batch_failed", f"Upsert batch {progress} failed: {str(e)}", {
+                            "batch_number": batch_number,
+                            "total_batches": total_batches,
+                            "vector_count": len(batch),
+                            "namespace": namespace,
+                            "error": str(e)
+                        })
+                    raise
+                delay = self.retry_backoff_seconds * (2 ** attempt)
+                print(f"⚠️ Upsert batch {progress} failed ({e}); retrying in {delay:.1f}s")
+                time.sleep(delay)
+        return 0
+
+    def upsert(self, index, vectors: Iterable[dict], namespace: str, session_id: str = "", on_batch: Optional[Callable[[list[str]], None]] = None) -> int:
+        """
+        Upserts vectors in concurrent batches and waits for all of them.
+        vectors may be a lazy iterable, so batches start uploading while later vectors
+        are still being produced. on_batch is called with the IDs of every batch that
+        succeeds. Returns the number of upserted vectors and raises if any batch still
+        fails after retries.
+        """
+        batches = self.make_batches(vectors)
+        total_batches = None
+        if isinstance(vectors, list):
+            batches = list(batches)
+            total_batches = len(batches)
+
+        executor = self._get_executor()
+        # Bound the number of batches held in memory while the producer runs ahead
+        in_flight = threading.BoundedSemaphore(self.max_workers * 2)
+        futures: list[Future] = []
+        for batch_number, batch in enumerate(batches, start=1):
+            in_flight.acquire()
+            future = executor.submit(self._upsert_batch, index, batch, namespace, session_id, batch_number, total_batches, on_batch)
+            future.add_done_callback(lambda _: in_flight.release())
+            futures.append(future)
+
+        upserted = 0
+        errors = []
+        for future in futures:
+            try:
+                upserted += future.result()
+            except Exception as e:
+                errors.append(e)
+        if errors:
+            raise RuntimeError(f"{len(errors)} of {len(futures)} upsert batches failed: {errors[0]}")
+        return upserted
+
+
+# Global upsert engine instance
+upsert_engine = UpsertEngine()
@@ -0,0 +1,20 @@
+"""
+Selects the vector index backend configured by VECTOR_INDEX_BACKEND.
+"""
+
+from settings import VECTOR_INDEX_BACKEND
+from src.utils.base import VectorIndexStrategy
+
+
+def get_vector_index(embeddings=None, session_id: str = "") -> VectorIndexStrategy:
+    """Returns a vector index for the configured backend ("pinecone" or "local")."""
+    if VECTOR_INDEX_BACKEND == "local":
+        from src.utils.local_vector_index import LocalVectorIndex
+
+        return LocalVectorIndex(embeddings, session_id=session_id)
+    if VECTOR_INDEX_BACKEND != "pinecone":
+        raise ValueError(f"Unknown VECTOR_INDEX_BACKEND '{VECTOR_INDEX_BACKEND}'. Expected 'pinecone' or 'local'.")
+
+    from src.utils.pinecone_vector_index import PineconeVectorIndex
+
+    return PineconeVectorIndex(embeddings, session_id=session_id)
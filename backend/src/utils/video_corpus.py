@@ -0,0 +1,135 @@
+"""
+Registry for the shared per-video vector corpus.
+Tracks which videos are stored in the shared namespace and which sessions reference
+them, so expiring a session only removes videos no other session still uses.
+With SESSION_STORE_BACKEND=sqlite the registry lives next to the sessions so every
+worker process sees the same references.
+"""
+
+import threading
+from pathlib import Path
+from typing import Dict, List, Set
+from src.utils.sqlite_store import SQLiteStore
+from settings import SESSION_STORE_BACKEND, SESSION_STORE_PATH
+
+
+class VideoCorpusRegistry:
+    """Thread-safe reference counting of videos per session namespace."""
+
+    def __init__(self):
+        self._session_videos: Dict[str, Set[str]] = {}  # session namespace -> video_ids
+        self._refcounts: Dict[str, int] = {}  # video_id -> number of sessions using it
+        self._indexed: Set[str] = set()  # video_ids whose vectors are in the shared corpus
+        self._lock = threading.Lock()
+
+    def is_indexed(self, video_id: str) -> bool:
+        """Returns True if the video's vectors are known to be in the shared corpus."""
+        with self._lock:
+            return video_id in self._indexed
+
+    def mark_indexed(self, video_id: str):
+        """Records that the video's vectors were upserted into the shared corpus."""
+        with self._lock:
+            self._indexed.add(video_id)
+
+    def attach(self, namespace: str, video_ids: List[str]):
+        """Adds videos to a session, incrementing each video's reference count once per session."""
+        with self._lock:
+            videos = self._session_videos.setdefault(namespace, set())
+            for video_id in video_ids:
+                if video_id not in videos:
+                    videos.add(video_id)
+                    self._refcounts[video_id] = self._refcounts.get(video_id, 0) + 1
+
+    def get_videos(self, namespace: str) -> List[str]:
+        """Returns the video IDs a session can query."""
+        with self._lock:
+            return sorted(self._session_videos.get(namespace, ()))
+
+    def release(self, namespace: str) -> List[str]:
+        """
+        Removes a session and decrements its videos' reference counts.
+        Returns the videos no session references anymore (to be deleted from the corpus).
+        """
+        orphaned = []
+        with self._lock:
+            for video_id in self._session_videos.pop(namespace, ()):
+                count = self._refcounts.get(video_id, 0) - 1
+                if count <= 0:
+                    self._refcounts.pop(video_id, None)
+                    self._indexed.discard(video_id)
+                    orphaned.append(video_id)
+                else:
+                    self._refcounts[video_id] = count
+        return orphaned
+
+    def refcount(self, video_id: str) -> int:
+        """Returns how many sessions reference a video."""
+        with self._lock:
+            return self._refcounts.get(video_id, 0)
+
+
+class SQLiteVideoCorpusRegistry(SQLiteStore):
+    """Host-wide registry with the same API; reference counts are derived from session rows."""
+
+    schema = (
+        """
+        CREATE TABLE IF NOT EXISTS session_videos (
+            namespace TEXT NOT NULL,
+            video_id TEXT NOT NULL,
+            PRIMARY KEY (namespace, video_id)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_session_videos_video ON session_videos (video_id)",
+        "CREATE TABLE IF NOT EXISTS indexed_videos (video_id TEXT PRIMARY KEY)",
+    )
+
+    def __init__(self, path: Path = SESSION_STORE_PATH):
+        super().__init__(path)
+
+    def is_indexed(self, video_id: str) -> bool:
+        row = self._connection().execute("SELECT 1 FROM indexed_videos WHERE video_id = ?", (video_id,)).fetchone()
+        return row is not None
+
+    def mark_indexed(self, video_id: str):
+        self._connection().execute("INSERT OR IGNORE INTO indexed_videos (video_id) VALUES (?)", (video_id,))
+
+    def attach(self, namespace: str, video_ids: List[str]):
+        self._connection().executemany(
+            "INSERT OR IGNORE INTO session_videos (namespace, video_id) VALUES (?, ?)",
+            [(namespace, video_id) for video_id in video_ids],
+        )
+
+    def get_videos(self, namespace: str) -> List[str]:
+        rows = self._connection().execute(
+            "SELECT video_id FROM session_videos WHERE namespace = ? ORDER BY video_id", (namespace,)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def release(self, namespace: str) -> List[str]:
+        conn = self._connection()
+        # One writer at a time, so two workers can't both miss each other's references
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            video_ids = [row[0] for row in conn.execute(
+                "DELETE FROM session_videos WHERE namespace = ? RETURNING video_id", (namespace,)
+            ).fetchall()]
+            orphaned = [
+                video_id for video_id in video_ids
+                if conn.execute("SELECT 1 FROM session_videos WHERE video_id = ? LIMIT 1", (video_id,)).fetchone() is None
+            ]
+            conn.executemany("DELETE FROM indexed_videos WHERE video_id = ?", [(video_id,) for video_id in orphaned])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return orphaned
+
+    def refcount(self, video_id: str) -> int:
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM session_videos WHERE video_id = ?", (video_id,)
+        ).fetchone()[0]
+
+
+# Global video corpus registry
+video_corpus = SQLiteVideoCorpusRegistry() if SESSION_STORE_BACKEND == "sqlite" else VideoCorpusRegistry()
@@ -0,0 +1,192 @@
+"""
+Streaming ingestion pipeline.
+Each video flows fetch → chunk/embed → upsert on its own, with bounded queues between
+the stages, so a video becomes queryable (video_indexed event) as soon as its own
+upsert finishes instead of after the whole selection. Per-video progress is
+checkpointed so a resumed or resubmitted job skips work that already finished.
+"""
+
+import queue
+import threading
+from typing import Optional
+from src.agents.youtube_transcript_agent import fetch_transcripts_concurrently, get_transcript_fetch
+from src.tools.pinecone_uploader import resolve_upload_namespace, upload_video_chunks
+from src.utils.embedding_engine import embedding_engine
+from src.utils.semantic_chunker import SentenceEmbeddingChunker
+from src.utils.event_emitter import event_emitter
+from src.utils.answer_cache import answer_cache
+from src.utils.job_checkpoints import job_checkpoints
+from settings import INGEST_QUEUE_SIZE, JOB_CHECKPOINTS_ENABLED
+
+# Sentinel closing a stage queue
+_DONE = object()
+
+
+def ingest_videos(
+    video_ids: list[str],
+    namespace: str,
+    session_id: str = "",
+    transcript_mode: Optional[str] = None,
+    cancel_event: Optional[threading.Event] = None,
+) -> dict[str, str]:
+    """
+    Fetches, chunks, embeds and upserts every video, streaming videos between stages.
+    Returns {video_id: status} where status is "indexed", "already_indexed", "cancelled"
+    or an error message. Setting cancel_event stops the job between videos.
+    """
+    cancel_event = cancel_event or threading.Event()
+    total = len(video_ids)
+    statuses: dict[str, str] = {}
+    statuses_lock = threading.Lock()
+
+    def set_status(video_id: str, status: str):
+        with statuses_lock:
+            statuses[video_id] = status
+
+    def emit(event_type: str, message: str, data: Optional[dict] = None):
+        if session_id:
+            event_emitter.emit(session_id, event_type, message, data)
+
+    def video_error(i: int, video_id: str, stage: str, error: Exception):
+        print(f"❌ {stage} failed for video {video_id}: {error}")
+        set_status(video_id, f"Error ({stage}): {error}")
+        emit("video_error", f"Error processing video {i+1}/{total}: {str(error)}", {
+            "video_id": video_id,
+            "video_number": i + 1,
+            "total_videos": total,
+            "stage": stage,
+            "error": str(error)
+        })
+
+    def checkpoint(method: str, *args):
+        # Checkpoints only save work on resume; never fail the job over them
+        if not JOB_CHECKPOINTS_ENABLED:
+            return None
+        try:
+            return getattr(job_checkpoints, method)(namespace, *args)
+        except Exception as e:
+            print(f"⚠️ Job checkpoint {method} failed: {e}")
+            return None
+
+    def video_indexed(i: int, video_id: str, chunk_count: Optional[int]):
+        # The session can now retrieve this video, so its cached answers are stale
+        answer_cache.invalidate(namespace)
+        emit("video_indexed", f"Video {i+1}/{total} is ready for questions", {
+            "video_id": video_id,
+            "video_number": i + 1,
+            "total_videos": total,
+            "chunk_count": chunk_count
+        })
+
+    fetch = get_transcript_fetch(transcript_mode)
+    chunker = SentenceEmbeddingChunker(embedding_engine)
+    chunk_queue: queue.Queue = queue.Queue(maxsize=INGEST_QUEUE_SIZE)
+    upsert_queue: queue.Queue = queue.Queue(maxsize=INGEST_QUEUE_SIZE)
+
+    def fetch_or_skip(video_id: str) -> dict:
+        # Videos already in the shared corpus skip the network entirely
+        target_namespace = resolve_upload_namespace(video_id, namespace, session_id)
+        if target_namespace is None:
+            return {"video_id": video_id, "already_indexed": True}
+        if checkpoint("get_stage", video_id) == "indexed":
+            print(f"⏭️ Video {video_id} was indexed by an earlier run; skipping")
+            return {"video_id": video_id, "already_indexed": True}
+        transcript = fetch(video_id)
+        transcript["target_namespace"] = target_namespace
+        checkpoint("mark_stage", video_id, "fetched")
+        return transcript
+
+    def fetch_stage():
+        emit("transcript_started", f"Starting transcript extraction for {total} videos")
+        try:
+            for i, video_id, transcript, error in fetch_transcripts_concurrently(video_ids, fetch_or_skip, session_id):
+                if cancel_event.is_set():
+                    # Closing the generator cancels fetches that haven't started
+                    break
+                if error is not None:
+                    video_error(i, video_id, "fetch", error)
+                    continue
+                if transcript.get("already_indexed"):
+                    set_status(video_id, "already_indexed")
+                    video_indexed(i, video_id, None)
+                    continue
+                emit("video_processed", f"Video {i+1}/{total} processed successfully", {
+                    "video_id": video_id,
+                    "video_number": i + 1,
+                    "total_videos": total,
+                    "cached": transcript.get("cached", False)
+                })
+                chunk_queue.put((i, transcript))
+        finally:
+            chunk_queue.put(_DONE)
+            emit("transcript_complete", f"Transcript extraction completed for {total} videos")
+
+    def chunk_stage():
+        try:
+            while True:
+                item = chunk_queue.get()
+                if item is _DONE:
+                    break
+                i, transcript = item
+                if cancel_event.is_set():
+                    continue
+                try:
+                    # Caption snippets are the fallback split units for unpunctuated transcripts
+                    snippet_texts = [snippet.get("text", "") for snippet in transcript.get("snippets") or []]
+                    chunks = chunker.split_and_embed(transcript["text"], units=snippet_texts)
+                    checkpoint("mark_stage", transcript["video_id"], "embedded")
+                    upsert_queue.put((i, transcript, chunks))
+                except Exception as e:
+                    video_error(i, transcript["video_id"], "embed", e)
+        finally:
+            upsert_queue.put(_DONE)
+
+    stages = [
+        threading.Thread(target=fetch_stage, name="ingest-fetch", daemon=True),
+        threading.Thread(target=chunk_stage, name="ingest-chunk", daemon=True),
+    ]
+    for stage in stages:
+        stage.start()
+
+    # Upsert stage runs on the calling thread
+    emit("pinecone_upload_started", f"Starting Pinecone upload to namespace: {namespace}")
+    while True:
+        item = upsert_queue.get()
+        if item is _DONE:
+            break
+        i, transcript, chunks = item
+        video_id = transcript["video_id"]
+        if cancel_event.is_set():
+            continue
+        try:
+            # Chunks stored by an interrupted earlier attempt are not sent again
+            done_ids = checkpoint("upserted_chunks", video_id) or set()
+            upload_video_chunks(
+                video_id, chunks, transcript["target_namespace"], session_id,
+                skip_ids=done_ids,
+                on_batch=lambda ids, video_id=video_id: checkpoint("record_chunks", video_id, ids),
+            )
+            chunk_count = len(chunks.texts)
+            checkpoint("mark_stage", video_id, "indexed", chunk_count)
+            set_status(video_id, "indexed")
+            video_indexed(i, video_id, chunk_count)
+        except Exception as e:
+            video_error(i, video_id, "upsert", e)
+
+    for stage in stages:
+        stage.join()
+
+    if cancel_event.is_set():
+        for video_id in video_ids:
+            statuses.setdefault(video_id, "cancelled")
+        cancelled = [video_id for video_id in video_ids if statuses[video_id] == "cancelled"]
+        emit("processing_cancelled", f"Processing cancelled; {total - len(cancelled)}/{total} videos finished first", {
+            "cancelled_video_ids": cancelled
+        })
+
+    indexed = sum(1 for status in statuses.values() if status in ("indexed", "already_indexed"))
+    emit("pinecone_upload_complete", f"Indexed {indexed}/{total} videos in namespace: {namespace}", {
+        "indexed_videos": indexed,
+        "total_videos": total
+    })
+    return statuses
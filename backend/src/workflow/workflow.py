@@ -2,6 +2,7 @@ from langgraph.graph import StateGraph, START, END
 from src.agents.youtube_retriever_agent import retriever_agent
 from src.agents.youtube_transcript_agent import transcript_agent
 from src.agents.pinecone_uploader_agent import uploader_agent
+from src.agents.ingestion_agent import ingestion_agent
 from src.schemas.response_schema import ResponseSchema
 
 # Full workflow (retriever → transcript → uploader)
@@ -18,15 +19,15 @@ graph.add_edge("uploader", END)
 
 workflow = graph.compile()
 
-# Processing workflow (transcript → uploader) - for when video_ids are already selected
+# Processing workflow (streaming ingest) - for when video_ids are already selected.
+# Each video is fetched, chunked, embedded and upserted independently, so videos become
+# queryable one by one instead of after the whole selection.
 processing_graph = StateGraph(ResponseSchema)
 
-processing_graph.add_node("transcript", transcript_agent)
-processing_graph.add_node("uploader", uploader_agent)
+processing_graph.add_node("ingest", ingestion_agent)
 
-processing_graph.add_edge(START, "transcript")
-processing_graph.add_edge("transcript", "uploader")
-processing_graph.add_edge("uploader", END)
+processing_graph.add_edge(START, "ingest")
+processing_graph.add_edge("ingest", END)
 
 processing_workflow = processing_graph.compile()
 
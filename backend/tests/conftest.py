@@ -0,0 +1,5 @@
+import os
+import tempfile
+
+# Keep the module-level stores (caches, keyword index, queues) out of the working tree
+os.environ.setdefault("CACHE_DIR", tempfile.mkdtemp(prefix="autovoyce-tests-"))
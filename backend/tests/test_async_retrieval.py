@@ -0,0 +1,58 @@
+import asyncio
+
+from src.tools import query_tool
+from src.utils import pinecone_vector_index
+from src.utils.local_vector_index import LocalVectorIndex, LocalVectorStore
+from src.utils.pinecone_vector_index import PineconeVectorIndex
+
+
+class FakeAsyncIndex:
+    def __init__(self):
+        self.calls = []
+
+    async def query(self, **kwargs):
+        self.calls.append(kwargs)
+        return {"matches": [{"id": "v#0", "score": 0.9, "metadata": {"chunk_text": "text", "video_id": "v", "chunk_id": 0}}]}
+
+
+def test_pinecone_aquery_uses_the_async_index(monkeypatch):
+    fake = FakeAsyncIndex()
+
+    async def get_async_index():
+        return fake
+
+    monkeypatch.setattr(pinecone_vector_index, "PINECONE_HOST_URL", "index.example")
+    monkeypatch.setattr(pinecone_vector_index, "get_async_index", get_async_index)
+    monkeypatch.setattr(pinecone_vector_index, "get_index", lambda: (_ for _ in ()).throw(AssertionError("sync index used")))
+
+    matches = asyncio.run(PineconeVectorIndex().aquery([0.1, 0.2], namespace="ns", top_k=3, filter={"video_id": "v"}))
+
+    assert matches == [{"id": "v#0", "score": 0.9, "chunk_text": "text", "video_id": "v", "chunk_id": 0}]
+    assert fake.calls[0]["namespace"] == "ns" and fake.calls[0]["top_k"] == 3
+
+
+def test_backends_without_async_client_run_query_in_a_thread(tmp_path):
+    index = LocalVectorIndex(store=LocalVectorStore(tmp_path))
+    index.upsert_chunks(["alpha"], namespace="ns", chunk_vectors=[[1.0, 0.0]], id_prefix="v", metadata={"video_id": "v"})
+
+    assert asyncio.run(index.aquery([1.0, 0.0], namespace="ns")) == index.query([1.0, 0.0], namespace="ns")
+
+
+def test_aretrieve_chunks_fuses_async_vector_and_keyword_hits(monkeypatch):
+    class FakeIndex:
+        async def aquery(self, vector, namespace=None, top_k=5, filter=None, include_values=False):
+            return [{"id": "a#0", "score": 0.8, "chunk_text": "a", "video_id": "a", "chunk_id": 0}]
+
+    class FakeKeywords:
+        def search(self, namespace, query, top_k=5, filter=None, include_values=False):
+            return [{"id": "b#0", "score": 3.0, "metadata": {"chunk_text": "b", "video_id": "b", "chunk_id": 0}}]
+
+    monkeypatch.setattr(query_tool, "HYBRID_SEARCH_ENABLED", True)
+    monkeypatch.setattr(query_tool, "VECTOR_STORAGE_MODE", "session")
+    monkeypatch.setattr(query_tool.embedding_engine, "embed_query", lambda text: [1.0, 0.0])
+    monkeypatch.setattr(query_tool, "get_vector_index", lambda embeddings=None: FakeIndex())
+    monkeypatch.setattr(query_tool, "keyword_index", FakeKeywords())
+
+    chunks = asyncio.run(query_tool.aretrieve_chunks("question", "ns", top_k=2))
+
+    assert [chunk["id"] for chunk in chunks] == ["a#0", "b#0"]
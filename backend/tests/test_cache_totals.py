@@ -0,0 +1,66 @@
+import sqlite3
+
+from src.utils.embedding_cache import EmbeddingCache
+from src.utils.transcript_cache import TranscriptCache
+
+
+def _scan(path, query):
+    with sqlite3.connect(path) as conn:
+        return conn.execute(query).fetchone()
+
+
+def test_embedding_cache_keeps_a_running_entry_count(tmp_path):
+    path = tmp_path / "embeddings.sqlite3"
+    cache = EmbeddingCache(path, max_entries=3)
+
+    cache.put_many("m", [("a", [1.0]), ("b", [2.0])])
+    cache.put_many("m", [("a", [3.0])])  # replacing an entry keeps the count
+    assert cache.stats()["entries"] == 2
+
+    cache.put_many("m", [("c", [1.0]), ("d", [1.0]), ("e", [1.0])])
+    stats = cache.stats()
+    assert stats["entries"] == 3
+    assert stats["evictions"] == 2
+    assert _scan(path, "SELECT COUNT(*) FROM embeddings") == (3,)
+
+
+def test_transcript_cache_keeps_running_totals(tmp_path):
+    path = tmp_path / "transcripts.sqlite3"
+    cache = TranscriptCache(path, ttl_seconds=3600, max_bytes=10_000)
+
+    cache.put("v1", "en", {"text": "short"})
+    cache.put("v2", "en", {"text": "x" * 50})
+    cache.put("v1", "en", {"text": "a longer replacement " * 5})
+
+    stats = cache.stats()
+    assert (stats["entries"], stats["bytes"]) == _scan(path, "SELECT COUNT(*), SUM(size) FROM transcripts")
+    assert stats["entries"] == 2
+
+
+def test_transcript_cache_evicts_and_expires_against_the_totals(tmp_path):
+    path = tmp_path / "transcripts.sqlite3"
+    cache = TranscriptCache(path, ttl_seconds=3600, max_bytes=200)
+    for index in range(20):
+        cache.put(f"v{index}", "en", {"text": f"transcript {index} " * 10})
+
+    stats = cache.stats()
+    assert stats["evictions"] > 0
+    assert 0 < stats["bytes"] <= 200
+    assert (stats["entries"], stats["bytes"]) == _scan(path, "SELECT COUNT(*), SUM(size) FROM transcripts")
+
+    cache.ttl_seconds = -1
+    assert cache.get("v19", "en") is None
+    assert cache.stats()["entries"] == stats["entries"] - 1
+
+
+def test_totals_are_seeded_from_an_existing_cache(tmp_path):
+    path = tmp_path / "transcripts.sqlite3"
+    with sqlite3.connect(path) as conn:
+        conn.execute(TranscriptCache.schema[0])
+        conn.execute(
+            "INSERT INTO transcripts (video_id, language, payload, size, created_at, last_access) "
+            "VALUES ('v', 'en', x'00', 7, 0, 0)"
+        )
+
+    stats = TranscriptCache(path, ttl_seconds=3600, max_bytes=1000).stats()
+    assert (stats["entries"], stats["bytes"]) == (1, 7)
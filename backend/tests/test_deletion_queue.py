@@ -0,0 +1,66 @@
+from src.utils import pinecone_vector_index, vector_index_factory
+from src.utils.deletion_queue import NamespaceDeletionQueue
+from src.utils.pinecone_vector_index import PineconeVectorIndex
+
+
+class NotFoundException(Exception):
+    status = 404
+
+
+class FailingIndex:
+    def __init__(self):
+        self.calls = 0
+
+    def delete_namespace(self, namespace):
+        self.calls += 1
+        raise RuntimeError("pinecone unavailable")
+
+
+def make_queue(tmp_path, **kwargs):
+    return NamespaceDeletionQueue(tmp_path / "deletions.sqlite3", max_parallel=1, retry_backoff_seconds=0, **kwargs)
+
+
+def run_due(queue):
+    for row in queue._claim(10):
+        queue._run_one(*row)
+
+
+def test_failing_deletion_is_dead_lettered_and_revived(tmp_path, monkeypatch):
+    index = FailingIndex()
+    monkeypatch.setattr(vector_index_factory, "get_vector_index", lambda: index)
+    queue = make_queue(tmp_path, max_attempts=2)
+    queue.enqueue_namespace("session_1")
+
+    run_due(queue)
+    assert queue.stats() == {"pending": 1, "retrying": 1, "dead": 0, "max_parallel": 1}
+    run_due(queue)
+    assert queue.stats()["dead"] == 1
+    assert queue.pending_count() == 0
+
+    # Dead deletions are kept, but no longer claimed
+    run_due(queue)
+    assert index.calls == 2
+    last_error = queue._connection().execute("SELECT last_error FROM pending_deletions").fetchone()[0]
+    assert last_error == "pinecone unavailable"
+
+    queue.enqueue_namespace("session_1")
+    assert queue.stats() == {"pending": 1, "retrying": 0, "dead": 0, "max_parallel": 1}
+
+
+def test_missing_namespace_counts_as_deleted(tmp_path, monkeypatch):
+    class MissingNamespaceIndex:
+        def delete_namespace(self, namespace, **kwargs):
+            raise NotFoundException("Namespace not found")
+
+    deleted_keywords = []
+    monkeypatch.setattr(pinecone_vector_index, "get_index", MissingNamespaceIndex)
+    monkeypatch.setattr(pinecone_vector_index.keyword_index, "delete_namespace", deleted_keywords.append)
+    monkeypatch.setattr(vector_index_factory, "get_vector_index", PineconeVectorIndex)
+    queue = make_queue(tmp_path, max_attempts=3)
+    queue.enqueue_namespace("session_1")
+
+    run_due(queue)
+
+    assert queue.stats()["pending"] == 0
+    assert queue.stats()["dead"] == 0
+    assert deleted_keywords == ["session_1"]
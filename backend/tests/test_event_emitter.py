@@ -0,0 +1,65 @@
+import asyncio
+
+from src.utils.event_emitter import ProcessingEventEmitter
+
+
+def emit_many(emitter, session_id, count):
+    for i in range(count):
+        emitter.emit(session_id, "step", f"step {i}")
+
+
+def test_resume_after_last_seen_event():
+    emitter = ProcessingEventEmitter()
+    emit_many(emitter, "s", 5)
+    last_seen = emitter.sse_id(emitter.get_events("s")[2])
+
+    after = emitter.resume_point("s", last_seen)
+
+    assert after == 3
+    assert [event["id"] for event in emitter.get_events("s", after_seq=after)] == [4, 5]
+
+
+def test_id_from_before_a_restart_replays_the_buffer():
+    before = ProcessingEventEmitter()
+    emit_many(before, "s", 50)
+    stale_id = before.sse_id(before.get_events("s")[-1])
+
+    restarted = ProcessingEventEmitter()
+    emit_many(restarted, "s", 3)
+
+    after = restarted.resume_point("s", stale_id)
+    assert after == 0
+    assert len(restarted.get_events("s", after_seq=after)) == 3
+
+
+def test_unknown_or_ahead_ids_replay_the_buffer():
+    emitter = ProcessingEventEmitter()
+    emit_many(emitter, "s", 2)
+
+    assert emitter.resume_point("s", None) == 0
+    assert emitter.resume_point("s", "7") == 0
+    assert emitter.resume_point("s", f"{emitter.boot_id}-x") == 0
+    assert emitter.resume_point("s", f"{emitter.boot_id}-9") == 0
+    assert emitter.resume_point("s", f"{emitter.boot_id}-2") == 2
+
+
+def test_ring_buffer_keeps_latest_events():
+    emitter = ProcessingEventEmitter(buffer_size=3)
+    emit_many(emitter, "s", 5)
+
+    assert [event["id"] for event in emitter.get_events("s")] == [3, 4, 5]
+    assert emitter.last_event_id("s") == 5
+
+
+def test_async_subscription_overflow_sets_flag():
+    async def run():
+        emitter = ProcessingEventEmitter()
+        subscription = emitter.subscribe_async("s", max_queue=2)
+        emit_many(emitter, "s", 3)
+        await asyncio.sleep(0)
+        overflowed = subscription.overflowed
+        subscription.reset()
+        emitter.unsubscribe("s", subscription)
+        return overflowed, subscription.queue.qsize()
+
+    assert asyncio.run(run()) == (True, 0)
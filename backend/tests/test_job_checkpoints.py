@@ -0,0 +1,60 @@
+import sqlite3
+
+from src.utils import job_checkpoints as checkpoints_module
+from src.utils.job_checkpoints import JobCheckpointStore
+
+
+def save(store, job_id="job-1", status="queued"):
+    store.save_job(job_id, "session", "ns", ["v1", "v2"], None, status=status)
+
+
+def test_live_leases_are_not_claimed(tmp_path):
+    store = JobCheckpointStore(tmp_path / "jobs.sqlite3", lease_seconds=60)
+    save(store)
+
+    assert store.claim_unfinished_jobs() == []
+
+
+def test_expired_lease_is_claimed_exactly_once(tmp_path, monkeypatch):
+    path = tmp_path / "jobs.sqlite3"
+    save(JobCheckpointStore(path, lease_seconds=-1))  # owner died straight away
+    save(JobCheckpointStore(path, lease_seconds=-1), job_id="done", status="completed")
+
+    monkeypatch.setattr(checkpoints_module, "WORKER_ID", "other-worker")
+    other = JobCheckpointStore(path, lease_seconds=60)
+    claimed = other.claim_unfinished_jobs()
+
+    assert [job["job_id"] for job in claimed] == ["job-1"]
+    assert claimed[0]["video_ids"] == ["v1", "v2"]
+    assert other.claim_unfinished_jobs() == []
+    assert other.renew_leases() == 1
+
+
+def test_released_leases_are_claimable_right_away(tmp_path, monkeypatch):
+    path = tmp_path / "jobs.sqlite3"
+    owner = JobCheckpointStore(path, lease_seconds=60)
+    save(owner, "job-1")
+    save(owner, "job-2")
+    owner.release_job("job-1")
+
+    monkeypatch.setattr(checkpoints_module, "WORKER_ID", "other-worker")
+    other = JobCheckpointStore(path, lease_seconds=60)
+    assert [job["job_id"] for job in other.claim_unfinished_jobs()] == ["job-1"]
+
+    monkeypatch.undo()
+    owner.release_leases()
+    monkeypatch.setattr(checkpoints_module, "WORKER_ID", "other-worker")
+    assert [job["job_id"] for job in other.claim_unfinished_jobs()] == ["job-2"]
+
+
+def test_jobs_from_before_leases_are_claimable(tmp_path):
+    path = tmp_path / "jobs.sqlite3"
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "CREATE TABLE jobs (job_id TEXT PRIMARY KEY, session_id TEXT NOT NULL, namespace TEXT NOT NULL, "
+            "video_ids TEXT NOT NULL, transcript_mode TEXT, status TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        conn.execute("INSERT INTO jobs VALUES ('old', 'session', 'ns', '[\"v1\"]', NULL, 'running', 0)")
+
+    claimed = JobCheckpointStore(path, lease_seconds=60).claim_unfinished_jobs()
+    assert [job["job_id"] for job in claimed] == ["old"]
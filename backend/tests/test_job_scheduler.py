@@ -0,0 +1,90 @@
+import threading
+import time
+
+import pytest
+
+from src.utils.job_scheduler import JobScheduler, SchedulerFull
+
+
+def recorder(order, name, release=None, started=None):
+    def run(cancel_event):
+        if started is not None:
+            started.set()
+        if release is not None:
+            assert release.wait(5)
+        order.append(name)
+    return run
+
+
+def wait_for(job, timeout=5):
+    deadline = time.monotonic() + timeout
+    while job.finished_at is None:
+        assert time.monotonic() < deadline, f"job {job.job_id} did not finish"
+        time.sleep(0.01)
+
+
+def test_sessions_are_served_round_robin():
+    scheduler = JobScheduler(max_workers=1, max_queued=10, max_per_session=1, history_size=50)
+    order, release, started = [], threading.Event(), threading.Event()
+    try:
+        scheduler.submit("a", recorder(order, "blocker", release, started))
+        assert started.wait(5)
+        jobs = [scheduler.submit(session, recorder(order, name)) for session, name in
+                (("a", "a1"), ("a", "a2"), ("a", "a3"), ("b", "b1"))]
+        assert scheduler.queue_position(jobs[3].job_id) == 2
+        release.set()
+        wait_for(jobs[2])
+    finally:
+        release.set()
+        scheduler.shutdown()
+
+    assert order == ["blocker", "a1", "b1", "a2", "a3"]
+
+
+def test_per_session_limit_leaves_workers_for_other_sessions():
+    scheduler = JobScheduler(max_workers=2, max_queued=10, max_per_session=1, history_size=50)
+    order, release, started = [], threading.Event(), threading.Event()
+    try:
+        scheduler.submit("a", recorder(order, "a1", release, started))
+        assert started.wait(5)
+        second = scheduler.submit("a", recorder(order, "a2"))
+        other = scheduler.submit("b", recorder(order, "b1"))
+        wait_for(other)
+        assert second.status == "queued"
+        release.set()
+        wait_for(second)
+    finally:
+        release.set()
+        scheduler.shutdown()
+
+    assert order == ["b1", "a1", "a2"]
+
+
+def test_full_queue_raises_scheduler_full():
+    scheduler = JobScheduler(max_workers=1, max_queued=2, max_per_session=1, history_size=50)
+    release, started = threading.Event(), threading.Event()
+    try:
+        scheduler.submit("a", recorder([], "running", release, started))
+        assert started.wait(5)
+        scheduler.submit("a", recorder([], "queued-1"))
+        scheduler.submit("b", recorder([], "queued-2"))
+        with pytest.raises(SchedulerFull) as excinfo:
+            scheduler.submit("c", recorder([], "rejected"))
+        assert (excinfo.value.queued, excinfo.value.max_queued) == (2, 2)
+    finally:
+        release.set()
+        scheduler.shutdown()
+
+
+def test_cancelled_queued_job_frees_its_queue_slot():
+    scheduler = JobScheduler(max_workers=1, max_queued=1, max_per_session=1, history_size=50)
+    release, started = threading.Event(), threading.Event()
+    try:
+        scheduler.submit("a", recorder([], "running", release, started))
+        assert started.wait(5)
+        queued = scheduler.submit("a", recorder([], "queued"))
+        assert scheduler.cancel(queued.job_id).status == "cancelled"
+        scheduler.submit("b", recorder([], "replacement"))
+    finally:
+        release.set()
+        scheduler.shutdown()
@@ -0,0 +1,65 @@
+from src.utils.keyword_index import KeywordIndex
+
+
+def make_index(tmp_path):
+    return KeywordIndex(tmp_path / "keywords.sqlite3")
+
+
+def add_texts(index, namespace, texts):
+    ids = [f"{namespace}-{i}" for i in range(len(texts))]
+    index.add(namespace, ids, [{"chunk_text": text, "video_id": namespace} for text in texts])
+    return ids
+
+
+def test_ranking_uses_only_the_namespace_statistics(tmp_path):
+    index = make_index(tmp_path)
+    add_texts(index, "a", [
+        "camera settings and camera modes",
+        "camera lens guide",
+        "iphone camera review",
+    ])
+    # Another session where "iphone" is everywhere and "camera" is rare
+    add_texts(index, "b", [f"iphone {i} battery" for i in range(50)] + ["camera"])
+
+    hits = index.search("a", "iphone camera", top_k=3)
+
+    assert [hit["id"] for hit in hits][0] == "a-2"
+    assert {hit["id"] for hit in hits} == {"a-0", "a-1", "a-2"}
+    assert hits[0]["score"] > hits[1]["score"]
+
+
+def test_search_is_scoped_to_namespace(tmp_path):
+    index = make_index(tmp_path)
+    add_texts(index, "a", ["pixel camera"])
+    add_texts(index, "b", ["iphone camera"])
+
+    assert index.search("a", "iphone") == []
+    assert [hit["id"] for hit in index.search("b", "iphone")] == ["b-0"]
+
+
+def test_replace_filter_and_delete(tmp_path):
+    index = make_index(tmp_path)
+    index.add("a", ["v1#0", "v2#0"], [
+        {"chunk_text": "iphone camera", "video_id": "v1"},
+        {"chunk_text": "iphone battery", "video_id": "v2"},
+    ], vectors=[[1.0, 0.0], None])
+
+    # Re-adding replaces the text and keeps the stored vector when none is given
+    index.add("a", ["v1#0"], [{"chunk_text": "galaxy camera", "video_id": "v1"}])
+    assert [hit["id"] for hit in index.search("a", "iphone")] == ["v2#0"]
+    hit = index.search("a", "galaxy", include_values=True)[0]
+    assert hit["values"] == [1.0, 0.0]
+    assert hit["metadata"] == {"chunk_text": "galaxy camera", "video_id": "v1"}
+
+    assert index.search("a", "camera battery", filter={"video_id": {"$in": ["v2"]}})[0]["id"] == "v2#0"
+
+    assert index.delete_by_prefix("a", "v1#") == 1
+    assert index.stats() == {"a": {"documents": 1}}
+    index.delete_namespace("a")
+    assert index.stats() == {}
+    assert index.search("a", "iphone") == []
+
+
+def test_postings_persist_across_instances(tmp_path):
+    add_texts(make_index(tmp_path), "a", ["iphone camera"])
+    assert [hit["id"] for hit in make_index(tmp_path).search("a", "iphone")] == ["a-0"]
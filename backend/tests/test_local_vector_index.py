@@ -0,0 +1,128 @@
+import json
+
+import numpy as np
+import pytest
+
+from src.utils.local_vector_index import LocalVectorStore, matches_filter
+
+
+def unit(*values):
+    vector = np.asarray(values, dtype=np.float32)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+def meta(video_id, chunk_id):
+    return {"video_id": video_id, "chunk_id": chunk_id, "chunk_text": f"{video_id}-{chunk_id}"}
+
+
+def ids_of(matches):
+    return [match["id"] for match in matches]
+
+
+def test_upsert_query_overwrite_and_delete(tmp_path):
+    store = LocalVectorStore(tmp_path)
+    store.upsert("ns", ["a#0", "a#1", "b#0"], [unit(1, 0), unit(0, 1), unit(1, 1)], [meta("a", 0), meta("a", 1), meta("b", 0)])
+
+    assert ids_of(store.query("ns", unit(1, 0), top_k=2)) == ["a#0", "b#0"]
+
+    store.upsert("ns", ["a#0"], [unit(0, 1)], [meta("a", 9)])
+    top = store.query("ns", unit(0, 1), top_k=1, include_values=True)[0]
+    assert top["id"] in {"a#0", "a#1"} and top["score"] == pytest.approx(1.0)
+    assert store.query("ns", unit(1, 0), top_k=3, filter={"chunk_id": 9})[0]["metadata"] == meta("a", 9)
+
+    assert store.delete_by_prefix("ns", "a#") == 2
+    assert ids_of(store.query("ns", unit(1, 0), top_k=5)) == ["b#0"]
+    assert store.existing_ids("ns", ["a#0", "b#0"]) == ["b#0"]
+
+
+def test_state_survives_reload(tmp_path):
+    store = LocalVectorStore(tmp_path)
+    store.upsert("ns", ["a#0", "a#1"], [unit(1, 0), unit(0, 1)], [meta("a", 0), meta("a", 1)])
+    store.upsert("ns", ["a#1"], [unit(1, 0.1)], [meta("a", 1)])
+    store.delete_by_prefix("ns", "a#0")
+
+    reloaded = LocalVectorStore(tmp_path)
+    matches = reloaded.query("ns", unit(1, 0), top_k=5)
+    assert ids_of(matches) == ["a#1"]
+    assert matches[0]["score"] > 0.99
+
+
+def test_upserts_append_instead_of_rewriting(tmp_path, monkeypatch):
+    store = LocalVectorStore(tmp_path)
+    rewrites = []
+    original = store._rewrite
+    monkeypatch.setattr(store, "_rewrite", lambda *args: rewrites.append(args) or original(*args))
+
+    rng = np.random.default_rng(0)
+    for batch in range(20):
+        ids = [f"v{batch}#{i}" for i in range(10)]
+        store.upsert("ns", ids, rng.normal(size=(10, 8)), [meta(f"v{batch}", i) for i in range(10)])
+
+    assert rewrites == []
+    path = store._path("ns")
+    assert store._vectors_file(path, 0).stat().st_size == 200 * 8 * 4
+    # One header line plus one record per upserted vector
+    assert len((path / store.META_FILE).read_text().splitlines()) == 201
+    assert store.stats()["namespaces"] == {"ns": 200}
+
+
+def test_deletes_compact_once_dead_rows_dominate(tmp_path):
+    store = LocalVectorStore(tmp_path, compact_min_rows=4)
+    ids = [f"a#{i}" for i in range(8)] + ["b#0", "b#1"]
+    vectors = [unit(1, i) for i in range(10)]
+    store.upsert("ns", ids, vectors, [meta(i.split("#")[0], n) for n, i in enumerate(ids)])
+
+    store.delete_by_prefix("ns", "a#")
+
+    path = store._path("ns")
+    assert [p.name for p in path.glob("vectors.*.f32")] == ["vectors.1.f32"]
+    assert sorted(ids_of(LocalVectorStore(tmp_path).query("ns", unit(1, 0), top_k=5))) == ["b#0", "b#1"]
+
+    store.delete_by_prefix("ns", "b#")
+    assert not path.exists()
+
+
+def test_rows_written_before_a_crash_are_ignored(tmp_path):
+    store = LocalVectorStore(tmp_path)
+    store.upsert("ns", ["a#0"], [unit(1, 0)], [meta("a", 0)])
+    # Vectors appended without their log records, plus half a row
+    with open(store._vectors_file(store._path("ns"), 0), "ab") as f:
+        f.write(np.asarray([unit(0, 1), unit(0, 1)], dtype=np.float32).tobytes() + b"\0\0")
+
+    reloaded = LocalVectorStore(tmp_path)
+    reloaded.upsert("ns", ["b#0"], [unit(0, 1)], [meta("b", 0)])
+    assert ids_of(reloaded.query("ns", unit(0, 1), top_k=5)) == ["b#0", "a#0"]
+    assert ids_of(LocalVectorStore(tmp_path).query("ns", unit(0, 1), top_k=5)) == ["b#0", "a#0"]
+
+
+def test_legacy_namespace_is_converted(tmp_path):
+    store = LocalVectorStore(tmp_path)
+    path = store._path("ns")
+    path.mkdir(parents=True)
+    np.asarray([unit(1, 0), unit(0, 1)], dtype=np.float32).tofile(path / "vectors.f32")
+    (path / "meta.json").write_text(json.dumps({"dim": 2, "ids": ["a#0", "a#1"], "metadata": [meta("a", 0), meta("a", 1)]}))
+
+    assert ids_of(store.query("ns", unit(0, 1), top_k=1)) == ["a#1"]
+    assert not (path / "meta.json").exists()
+    assert ids_of(LocalVectorStore(tmp_path).query("ns", unit(0, 1), top_k=1)) == ["a#1"]
+
+
+@pytest.mark.parametrize("filter", [
+    {"video_id": "a"},
+    {"video_id": {"$in": ["a", "c"]}},
+    {"video_id": {"$nin": ["a"]}},
+    {"chunk_id": {"$gte": 1, "$lt": 3}},
+    {"chunk_id": {"$ne": 2}},
+    {"$or": [{"video_id": "b"}, {"chunk_id": 0}]},
+    {"$and": [{"video_id": {"$in": ["a", "b"]}}, {"chunk_id": {"$gt": 0}}]},
+    {"missing": {"$eq": None}},
+])
+def test_vectorized_filter_matches_reference(tmp_path, filter):
+    store = LocalVectorStore(tmp_path)
+    rows = [(video_id, chunk_id) for video_id in "abc" for chunk_id in range(4)]
+    store.upsert(
+        "ns", [f"{v}#{c}" for v, c in rows], [unit(1, c + 1) for _, c in rows], [meta(v, c) for v, c in rows]
+    )
+
+    expected = {f"{v}#{c}" for v, c in rows if matches_filter(meta(v, c), filter)}
+    assert set(ids_of(store.query("ns", unit(1, 1), top_k=100, filter=filter))) == expected
@@ -0,0 +1,24 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from src.agents import pinecone_query_agent
+
+
+def test_query_agent_rejects_unknown_modes(monkeypatch):
+    monkeypatch.setattr(pinecone_query_agent, "fast_query_agent", lambda query, namespace: "fast answer")
+
+    assert pinecone_query_agent.query_agent("q", namespace="ns", mode="fast") == "fast answer"
+    with pytest.raises(ValueError, match="Unknown query mode"):
+        pinecone_query_agent.query_agent("q", namespace="ns", mode="slow")
+
+
+def test_settings_reject_unknown_query_mode():
+    env = dict(os.environ, QUERY_MODE="slow")
+    result = subprocess.run([sys.executable, "-c", "import settings"], env=env, capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    assert result.returncode != 0
+    assert "QUERY_MODE must be one of fast, agent" in result.stderr
@@ -0,0 +1,33 @@
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from src.utils.semantic_chunker import SentenceEmbeddingChunker
+
+
+class ScaledEmbeddings(Embeddings):
+    """Deterministic, deliberately non-unit-length vectors."""
+
+    def embed_documents(self, texts):
+        return [[3.0 * len(text), 4.0 * (index + 1), 12.0] for index, text in enumerate(texts)]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def _norms(vectors):
+    return np.linalg.norm(np.asarray(vectors), axis=1)
+
+
+def test_single_sentence_vectors_are_normalized():
+    chunks = SentenceEmbeddingChunker(ScaledEmbeddings(), mode="pooled")("Only one sentence here.")
+
+    assert chunks.texts == ["Only one sentence here."]
+    assert np.allclose(_norms(chunks.vectors), 1.0)
+
+
+def test_pooled_vectors_are_normalized():
+    text = "First sentence. Second one is longer. Third! Fourth sentence here? Fifth and last."
+    chunks = SentenceEmbeddingChunker(ScaledEmbeddings(), mode="pooled", buffer_size=1)(text)
+
+    assert " ".join(chunks.texts) == text
+    assert np.allclose(_norms(chunks.vectors), 1.0)
@@ -0,0 +1,60 @@
+import threading
+import time
+
+from src.agents.youtube_transcript_agent import fetch_transcripts_concurrently
+
+
+def hanging_fetcher(hung_ids, release):
+    def fetch(video_id):
+        if video_id in hung_ids:
+            release.wait()
+        return {"video_id": video_id, "text": video_id}
+    return fetch
+
+
+def collect(generator):
+    return {video_id: (transcript, error) for _, video_id, transcript, error in generator}
+
+
+def test_hung_fetch_times_out_and_frees_its_slot():
+    release = threading.Event()
+    try:
+        start = time.monotonic()
+        results = collect(fetch_transcripts_concurrently(
+            ["hung", "a", "b", "c"], hanging_fetcher({"hung"}, release), max_workers=1, timeout_seconds=0.2,
+        ))
+        assert time.monotonic() - start < 5
+    finally:
+        release.set()
+
+    assert isinstance(results["hung"][1], TimeoutError)
+    for video_id in ("a", "b", "c"):
+        assert results[video_id] == ({"video_id": video_id, "text": video_id}, None)
+
+
+def test_too_many_hung_fetches_fail_the_rest_instead_of_hanging():
+    release = threading.Event()
+    try:
+        start = time.monotonic()
+        results = collect(fetch_transcripts_concurrently(
+            ["h1", "h2", "a", "b"], hanging_fetcher({"h1", "h2"}, release),
+            max_workers=1, timeout_seconds=0.2, max_abandoned=1,
+        ))
+        assert time.monotonic() - start < 5
+    finally:
+        release.set()
+
+    assert set(results) == {"h1", "h2", "a", "b"}
+    assert all(transcript is None and isinstance(error, TimeoutError) for transcript, error in results.values())
+
+
+def test_errors_are_reported_per_video():
+    def fetch(video_id):
+        if video_id == "bad":
+            raise ValueError("no transcript")
+        return {"video_id": video_id}
+
+    results = collect(fetch_transcripts_concurrently(["ok", "bad"], fetch, max_workers=2))
+
+    assert results["ok"] == ({"video_id": "ok"}, None)
+    assert isinstance(results["bad"][1], ValueError)
@@ -143,6 +143,11 @@ export default function IngestionPage() {
         }
         break;
 
+      case "video_indexed":
+        // Video is embedded and upserted; it can be queried right away
+        addLog(message, "success");
+        break;
+
       case "transcript_complete":
         addLog(message, "success");
         break;
@@ -172,7 +177,7 @@ export default function IngestionPage() {
         break;
 
       case "processing_complete":
-        addLog(message, "success");
+        addLog(message, data?.failed ? "error" : "success");
         setCurrentStep("complete");
         setIsResearching(false);
         // Close SSE connection